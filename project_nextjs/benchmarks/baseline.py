@@ -0,0 +1,25 @@
+"""
+Load a fixer script as it was at an earlier git revision
+
+Benchmarks use this to time the current code against the code it replaced
+and to check that both produce the same output.
+"""
+
+import subprocess
+import sys
+import types
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+def load_module(name, rev):
+    """Return project_nextjs/<name>.py at git revision rev as a module"""
+    result = subprocess.run(['git', 'show', f'{rev}:./{name}.py'], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, encoding='utf-8')
+    if result.returncode != 0:
+        sys.exit(f"Cannot load {name}.py at {rev}: {result.stderr.strip()}")
+
+    module = types.ModuleType(f'{name}@{rev}')
+    module.__file__ = str(PROJECT_ROOT / f'{name}.py')
+    exec(compile(result.stdout, f'{name}.py@{rev}', 'exec'), module.__dict__)
+    return module
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Microbenchmark the shared line classifier against the old startswith chains
+
+For each rule test the fixers used to spell out as a startswith chain, time
+the chain over every line of src against a lookup in the rule's kind table,
+and check that both give the same answer for every line. Classification
+itself is timed cold (empty memo) and warm.
+
+Usage: python3 benchmarks/bench_classify.py [--repeat 5]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import fix_all_fast
+import fix_orphaned_code
+import fix_safe_fast
+import fix_simple_safe
+from fixers import classify, runner
+
+# The chains as they were written in the fixer loops
+def orphaned_code_orphan(s):
+    if (s.startswith('export ') or
+        s.startswith('function ') or
+        (s.startswith('const ') and '=' in s and '=>' in s) or
+        s.startswith('import ') or
+        s.startswith('type ') or
+        s.startswith('interface ')):
+        return False
+    return (s.startswith('<') or
+            s.startswith('value=') or
+            s.startswith('defaultChecked=') or
+            s.startswith('onChange=') or
+            s.startswith('style={{') or
+            s.startswith('fontSize:') or
+            s.startswith('color:') or
+            (s.startswith('{') and not s.startswith('{/*')))
+
+def all_fast_orphan(s):
+    if (s.startswith('export ') or
+        s.startswith('function ') or
+        (s.startswith('const ') and '=' in s) or
+        s.startswith('import ') or
+        s.startswith('type ') or
+        s.startswith('interface ')):
+        return False
+    return (s.startswith('<') or
+            s.startswith('value=') or
+            s.startswith('defaultChecked=') or
+            s.startswith('onChange=') or
+            s.startswith('style={{') or
+            s.startswith('fontSize:') or
+            s.startswith('color:') or
+            (s.startswith('{') and not s.startswith('{/*')))
+
+def all_fast_after_export(s):
+    return bool(s) and (s.startswith('<') or
+                        s.startswith('value=') or
+                        s.startswith('defaultChecked=') or
+                        s.startswith('fontSize:') or
+                        s.startswith('color:'))
+
+def safe_fast_after_export(s):
+    return (s.startswith('value=') or
+            s.startswith('defaultChecked=') or
+            s.startswith('onChange=') or
+            s.startswith('fontSize:') or
+            s.startswith('color:') or
+            (s.startswith('style={{') and '}}' not in s))
+
+def safe_fast_declaration(s):
+    return (s.startswith('export ') or
+            s.startswith('function ') or
+            s.startswith('import ') or
+            s.startswith('type ') or
+            s.startswith('const ') and '=' in s)
+
+def safe_fast_jsx(s):
+    return not safe_fast_declaration(s) and (s.startswith('<') or
+                                             s.startswith('value=') or
+                                             s.startswith('defaultChecked=') or
+                                             s.startswith('fontSize:') or
+                                             s.startswith('color:') or
+                                             s.startswith('style={{'))
+
+def safe_fast_attribute(s):
+    return not safe_fast_declaration(s) and (s.startswith('value=') or
+                                             s.startswith('defaultChecked=') or
+                                             s.startswith('fontSize:') or
+                                             s.startswith('color:') or
+                                             (s.startswith('style={{') and '}}' not in s))
+
+def simple_safe_after_export(s):
+    return (s.startswith('value=') or
+            s.startswith('defaultChecked=') or
+            s.startswith('fontSize:') or
+            s.startswith('color:') or
+            (s.startswith('style={{') and '}}' not in s))
+
+def simple_safe_attribute(s):
+    if (s.startswith('export ') or
+        s.startswith('function ') or
+        s.startswith('import ')):
+        return False
+    return (s.startswith('value=') or
+            s.startswith('defaultChecked=') or
+            s.startswith('fontSize:') or
+            s.startswith('color:'))
+
+RULES = [
+    ('export default', lambda s: s.startswith('export default'),
+     classify.kind_set(classify.EXPORT_DEFAULT)),
+    ('closing brace', lambda s: s == '}', classify.kind_set(classify.CLOSE_BRACE)),
+    ('orphaned_code orphan', orphaned_code_orphan, fix_orphaned_code.ORPHAN_KINDS),
+    ('all_fast orphan', all_fast_orphan, fix_all_fast.ORPHAN_KINDS),
+    ('all_fast after export', all_fast_after_export, fix_all_fast.AFTER_EXPORT_KINDS),
+    ('safe_fast after export', safe_fast_after_export, fix_safe_fast.AFTER_EXPORT_KINDS),
+    ('safe_fast jsx run', safe_fast_jsx, fix_safe_fast.JSX_KINDS),
+    ('safe_fast attribute run', safe_fast_attribute, fix_safe_fast.ATTRIBUTE_KINDS),
+    ('simple_safe after export', simple_safe_after_export, fix_simple_safe.AFTER_EXPORT_KINDS),
+    ('simple_safe attribute run', simple_safe_attribute, fix_simple_safe.ATTRIBUTE_KINDS),
+]
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark the line classifier')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    lines = []
+    for file_path in runner.source_files(PROJECT_ROOT / 'src'):
+        lines.extend(file_path.read_text(encoding='utf-8').split('\n'))
+    stripped_lines = [line.strip() for line in lines]
+    n = len(lines)
+
+    classify._kinds.clear()
+    start = time.perf_counter()
+    kinds = classify.classify_lines(lines)
+    cold = time.perf_counter() - start
+    warm = best_of(args.repeat, lambda: classify.classify_lines(lines))
+
+    print(f"{n} lines from src")
+    print(f"classify_lines: cold {cold * 1e9 / n:.0f} ns/line, warm {warm * 1e9 / n:.0f} ns/line\n")
+    print(f"{'rule':<27} {'chain ns/line':>14} {'kinds ns/line':>14} {'speedup':>8}")
+
+    for name, chain, table in RULES:
+        for stripped, kind in zip(stripped_lines, kinds):
+            if bool(chain(stripped)) != bool(table[kind]):
+                print(f"Mismatch in {name}: {stripped!r} has kind {kind}")
+                sys.exit(1)
+
+        chain_time = best_of(args.repeat, lambda: [chain(s) for s in stripped_lines])
+        kind_time = best_of(args.repeat, lambda: [table[k] for k in kinds])
+        print(f"{name:<27} {chain_time * 1e9 / n:>14.0f} {kind_time * 1e9 / n:>14.0f} "
+              f"{chain_time / kind_time:>7.1f}x")
+
+    print("\nAll rules agree with their chains")
+
+if __name__ == '__main__':
+    main()
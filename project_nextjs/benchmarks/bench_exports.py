@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the cross-file export index against rescanning the tree
+
+On a synthetic corpus (benchmarks/corpus.py) with some components copied
+into several files, times:
+
+  build     a new index over the whole tree, and saving it
+  refresh   loading the saved index and refreshing it with nothing changed
+  touched   the same after --touched files were edited
+  query     one "who else exports X" lookup in the index
+  rescan    the same question answered by reading every file again
+
+The index must give the same answers as the rescan, before and after the
+edits.
+
+Usage: python3 benchmarks/bench_exports.py [--files 10000] [--touched 50] [--queries 200]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import corpus
+from fixers import exports, runner
+from fix_duplicate_declarations import declaration_key
+
+def rescan(src_dir, query):
+    """{file: [lines]} exporting query, by reading every file"""
+    files = {}
+    for file_path in runner.source_files(src_dir):
+        lines = file_path.read_text(encoding='utf-8').split('\n')
+        for key, number in exports.scan_exports(lines, declaration_key):
+            if key == query or exports.export_name(key) == query:
+                rel = file_path.relative_to(src_dir).as_posix()
+                files.setdefault(rel, []).append(number)
+    return dict(sorted(files.items()))
+
+def add_copies(src_dir, rng, count):
+    """Copy the default export of count files into another file each"""
+    file_paths = runner.source_files(src_dir)
+    for source in rng.sample(file_paths, count):
+        lines = [line for line in source.read_text(encoding='utf-8').split('\n')
+                 if line.startswith('export default')]
+        target = rng.choice(file_paths)
+        with open(target, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the export index')
+    parser.add_argument('--files', type=int, default=10000)
+    parser.add_argument('--touched', type=int, default=50,
+                        help='files edited before the incremental refresh')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory(prefix='bench_exports_') as tmp:
+        corpus.generate(tmp, args.files, args.seed)
+        src_dir = Path(tmp) / 'src'
+        add_copies(src_dir, rng, max(1, args.files // 100))
+        index_path = Path(tmp) / exports.INDEX_NAME
+
+        def build():
+            index = exports.ExportIndex(index_path, src_dir, declaration_key)
+            index.refresh()
+            index.save()
+            return index
+
+        def reload():
+            index = exports.ExportIndex(index_path, src_dir, declaration_key)
+            index.refresh()
+            if index.dirty:
+                index.save()
+            return index
+
+        index_path.unlink(missing_ok=True)
+        build_time, index = timed(build)
+        refresh_time, index = timed(reload)
+
+        def check(index, names):
+            for name in names:
+                if index.exporters(name) != rescan(src_dir, name):
+                    sys.exit(f"Index and rescan disagree on {name}")
+
+        duplicates = index.duplicates()
+        names = sorted({exports.export_name(key) for key in duplicates} - {None})
+        check(index, rng.sample(names, min(5, len(names))))
+
+        for file_path in rng.sample(runner.source_files(src_dir), args.touched):
+            with open(file_path, 'a', encoding='utf-8') as f:
+                f.write(f'export default function Touched{rng.randrange(10 ** 6)}() {{}}\n')
+        touched_time, index = timed(reload)
+        check(index, rng.sample(names, min(5, len(names))))
+
+        queries = [rng.choice(names) for _ in range(args.queries)]
+        query_time, _ = timed(lambda: [index.exporters(name) for name in queries])
+        rescan_time, _ = timed(lambda: rescan(src_dir, queries[0]))
+
+        print(f"{len(index)} files, {len(duplicates)} keys exported from several files")
+        print(f"build    {build_time * 1000:10.1f} ms")
+        print(f"refresh  {refresh_time * 1000:10.1f} ms  (0 changed)")
+        print(f"touched  {touched_time * 1000:10.1f} ms  ({args.touched} changed)")
+        print(f"query    {query_time * 1e6 / len(queries):10.1f} us")
+        print(f"rescan   {rescan_time * 1000:10.1f} ms  per query")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure what the undo journal (fixers.journal) costs and how fast --revert is
+
+The engine's aggressive profile is run through runner.run with
+--no-validate on a fresh copy of a tree, once with --no-journal and once
+journaling, on two trees:
+
+  src       the project's src directory
+  corpus    a synthetic corpus (benchmarks/corpus.py), where most files
+            have something to fix
+
+The fixed tree and its journal are then kept aside, and each revert is
+timed on a fresh copy of them:
+
+  revert    the whole run
+  file      one file (the largest one the run changed)
+  rule      one rule set (comprehensive), keeping the others' edits
+
+After reverting the whole run, and after reverting the rule set and then
+the rest, the tree must be the original again. For comparison, 'copy' is
+the time to put the changed files back from a full backup, and 'tree' the
+time to copy the whole original tree. Times are the best of --repeat
+runs, and 'journ ms' is the time the journal reports for diffing and
+writing, with its share of the journaled run; sizes compare the journal
+with the changed files a copy would have to keep.
+
+Usage: python3 benchmarks/bench_journal.py [--files 2000] [--repeat 3]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import re
+import shutil
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import corpus
+import fix_engine
+from fixers import journal, runner
+
+REPORT = re.compile(r'Journal: \d+ files, \d+ hunks, \d+ lines, ([\d.]+) ms')
+
+def tree_digest(root):
+    """Hash of every file's path and bytes under root"""
+    digest = hashlib.sha1()
+    for path in sorted(root.rglob('*')):
+        if path.is_file():
+            digest.update(path.relative_to(root).as_posix().encode('utf-8'))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+def quiet(func, *args):
+    """Call func with its output swallowed, returning its result and the time it took"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the undo journal and --revert')
+    parser.add_argument('--files', type=int, default=2000, help='synthetic corpus size')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rules = fix_engine.resolve_rules(['aggressive'])
+    fix_func = partial(fix_engine.fix_file, rules=rules)
+    fix_lines = partial(fix_engine.fix_lines, rules=rules)
+
+    with tempfile.TemporaryDirectory(prefix='bench_journal_') as tmp:
+        corpus.generate(Path(tmp) / 'corpus', args.files, args.seed)
+        trees = [('src', PROJECT_ROOT / 'src'), ('corpus', Path(tmp) / 'corpus' / 'src')]
+        project = Path(tmp) / 'project'
+        src_dir = project / 'src'
+        journal_dir = project / journal.JOURNAL_NAME
+        fixed_dir = Path(tmp) / 'fixed'
+
+        def fresh(master):
+            shutil.rmtree(project, ignore_errors=True)
+            shutil.copytree(master, src_dir)
+
+        def fix_run(master, options):
+            fresh(master)
+            buf = io.StringIO()
+            with contextlib.redirect_stdout(buf):
+                start = time.perf_counter()
+                for _ in runner.run(fix_func, src_dir, runner.parse_args('', options),
+                                    fix_lines=fix_lines):
+                    pass
+                elapsed = time.perf_counter() - start
+            report = [REPORT.match(line) for line in buf.getvalue().splitlines()]
+            return elapsed, next((float(match.group(1)) for match in report if match), 0.0)
+
+        def timed_revert(path, files=(), rule_sets=()):
+            shutil.rmtree(project, ignore_errors=True)
+            shutil.copytree(fixed_dir, project)
+            failed, elapsed = quiet(journal.revert, project / path, project, src_dir,
+                                    files, rule_sets)
+            if failed:
+                sys.exit(f"{failed} files could not be reverted")
+            return elapsed
+
+        print(f"{'tree':<7} {'changed':>8} {'plain s':>8} {'journ s':>8} {'journ ms':>9} "
+              f"{'share':>6} "
+              f"{'journal KB':>11} {'changed KB':>11} {'revert ms':>10} {'file ms':>8} "
+              f"{'rule ms':>8} {'copy ms':>8} {'tree ms':>8}")
+        for tree, master in trees:
+            original = tree_digest(master)
+            # Warm-up, so the first timed run does not pay for filling caches
+            fix_run(master, ['--no-validate', '--no-journal'])
+            plain_time = journal_time = journal_ms = float('inf')
+            for _ in range(args.repeat):
+                plain_time = min(plain_time,
+                                 fix_run(master, ['--no-validate', '--no-journal'])[0])
+                elapsed, spent = fix_run(master, ['--no-validate'])
+                journal_time = min(journal_time, elapsed)
+                journal_ms = min(journal_ms, spent)
+
+            shutil.rmtree(fixed_dir, ignore_errors=True)
+            shutil.copytree(project, fixed_dir)
+            path = next(journal_dir.iterdir()).relative_to(project)
+            with open(project / path, encoding='utf-8') as f:
+                entries = json.load(f)['files']
+            changed = {rel: (master.parent / rel).stat().st_size for rel in entries}
+            largest = max(changed, key=changed.get)
+            largest = str(Path(largest).relative_to('src'))
+
+            revert_time = file_time = rule_time = copy_time = tree_time = float('inf')
+            for _ in range(args.repeat):
+                revert_time = min(revert_time, timed_revert(path))
+                if tree_digest(src_dir) != original:
+                    sys.exit(f"{tree}: the revert did not restore the original tree")
+                file_time = min(file_time, timed_revert(path, [largest]))
+                rule_time = min(rule_time, timed_revert(path, (), ['comprehensive']))
+                quiet(journal.revert, project / path, project, src_dir)
+                if tree_digest(src_dir) != original:
+                    sys.exit(f"{tree}: reverting comprehensive and then the rest did not "
+                             f"restore the original tree")
+
+                shutil.rmtree(project, ignore_errors=True)
+                shutil.copytree(fixed_dir, project)
+                start = time.perf_counter()
+                for rel in entries:
+                    shutil.copyfile(master.parent / rel, project / rel)
+                copy_time = min(copy_time, time.perf_counter() - start)
+                shutil.rmtree(src_dir)
+                start = time.perf_counter()
+                shutil.copytree(master, src_dir)
+                tree_time = min(tree_time, time.perf_counter() - start)
+
+            share = journal_ms / 1000 / journal_time
+            journal_kb = (fixed_dir / path).stat().st_size / 1024
+            changed_kb = sum(changed.values()) / 1024
+            print(f"{tree:<7} {len(entries):>8} {plain_time:8.3f} {journal_time:8.3f} "
+                  f"{journal_ms:9.1f} {share:6.0%} {journal_kb:11.1f} {changed_kb:11.1f} "
+                  f"{revert_time * 1000:10.1f} {file_time * 1000:8.1f} {rule_time * 1000:8.1f} "
+                  f"{copy_time * 1000:8.1f} {tree_time * 1000:8.1f}")
+
+if __name__ == '__main__':
+    main()
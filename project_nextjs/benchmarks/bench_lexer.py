@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure lexer throughput on the src tree
+
+Lexes every .ts/.tsx file under src with fixers.lexer and reports MB/s
+cold (empty line memo) and warm, next to the naive per-line
+count('{') - count('}') it replaces in fix_all_fast. Also counts the lines
+where the two disagree about the change in brace depth, i.e. where the
+naive count was wrong.
+
+Usage: python3 benchmarks/bench_lexer.py [--src DIR] [--repeat 5]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from fixers import lexer, runner
+
+def naive_depths(lines):
+    depth = 0
+    depths = []
+    for line in lines:
+        depth += line.count('{') - line.count('}')
+        depths.append(depth)
+    return depths
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure lexer throughput')
+    parser.add_argument('--src', type=Path, default=PROJECT_ROOT / 'src')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    files = [file_path.read_text(encoding='utf-8').split('\n')
+             for file_path in runner.source_files(args.src)]
+    size = sum(len('\n'.join(lines).encode('utf-8')) for lines in files)
+    n = sum(len(lines) for lines in files)
+
+    def lex_all():
+        return [lexer.scan_lines(lines) for lines in files]
+
+    lexer._effects.clear()
+    start = time.perf_counter()
+    results = lex_all()
+    cold = time.perf_counter() - start
+    warm = best_of(args.repeat, lex_all)
+    naive = best_of(args.repeat, lambda: [naive_depths(lines) for lines in files])
+
+    wrong_lines = 0
+    wrong_files = 0
+    for lines, (depths, _) in zip(files, results):
+        before = 0
+        wrong = 0
+        for line, depth in zip(lines, depths):
+            if depth - before != line.count('{') - line.count('}'):
+                wrong += 1
+            before = depth
+        wrong_lines += wrong
+        wrong_files += wrong > 0
+
+    mb = size / 1e6
+    print(f"{len(files)} files, {n} lines, {mb:.2f} MB from {args.src}")
+    print(f"lexer cold:  {cold:.3f} s  {mb / cold:6.1f} MB/s")
+    print(f"lexer warm:  {warm:.3f} s  {mb / warm:6.1f} MB/s")
+    print(f"naive count: {naive:.3f} s  {mb / naive:6.1f} MB/s")
+    print(f"naive count wrong on {wrong_lines} lines in {wrong_files} files")
+
+if __name__ == '__main__':
+    main()
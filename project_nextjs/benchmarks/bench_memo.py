@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark --memo on a tree of copy-pasted files
+
+The src tree is copied --copies times into a scratch project, so every
+file has --copies byte-identical twins, and a fixer is run on a fresh copy
+through runner.run in four ways:
+
+  plain     no memo, every copy goes through the rules
+  memo      the in-run LRU: the first copy runs the rules, the rest reuse it
+  store     --memo-store with an empty store (writes it)
+  warm      --memo-store again, reading the store the previous run wrote
+
+Every run must print the same lines and leave the same files as the plain
+run. The time of the whole run and the memo report are printed.
+
+Usage: python3 benchmarks/bench_memo.py [--fixer fix_all_fast] [--copies 4]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib
+import io
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from fixers import memo, runner
+
+FIXERS = {
+    'fix_all_fast': ('fix_file_fast', 'fix_lines_fast'),
+    'fix_comprehensive': ('fix_file_comprehensive', 'fix_lines_comprehensive'),
+    'fix_duplicate_declarations': ('fix_duplicate_declarations', 'fix_lines_duplicates'),
+    'fix_orphaned_code': ('fix_orphaned_code', 'fix_lines_orphaned'),
+    'fix_safe_fast': ('fix_file_safe', 'fix_lines_safe'),
+    'fix_simple_safe': ('fix_file_simple', 'fix_lines_simple'),
+}
+
+def tree_digest(root):
+    """Hash of every file's path and bytes under root"""
+    digest = hashlib.sha1()
+    for path in sorted(root.rglob('*')):
+        if path.is_file():
+            digest.update(path.relative_to(root).as_posix().encode('utf-8'))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the content memo')
+    parser.add_argument('--fixer', default='fix_all_fast', choices=sorted(FIXERS))
+    parser.add_argument('--copies', type=int, default=4,
+                        help='how many copies of src to process')
+    args = parser.parse_args()
+
+    module = importlib.import_module(args.fixer)
+    file_func_name, lines_func_name = FIXERS[args.fixer]
+    fix_file = getattr(module, file_func_name)
+    fix_lines = getattr(module, lines_func_name)
+
+    with tempfile.TemporaryDirectory(prefix='bench_memo_') as tmp:
+        master = Path(tmp) / 'master'
+        for n in range(args.copies):
+            shutil.copytree(PROJECT_ROOT / 'src', master / f'copy{n}')
+        src_dir = Path(tmp) / 'project' / 'src'
+
+        def timed_run(options):
+            shutil.rmtree(src_dir, ignore_errors=True)
+            shutil.copytree(master, src_dir)
+            buf = io.StringIO()
+            with contextlib.redirect_stdout(buf):
+                start = time.perf_counter()
+                results = list(runner.run(fix_file, src_dir, runner.parse_args('', options),
+                                          fix_lines=fix_lines))
+                elapsed = time.perf_counter() - start
+            lines = buf.getvalue().splitlines()
+            report = [line for line in lines if line.startswith('Memo:')]
+            # The validate and journal summaries hold timings, so they differ by run
+            output = [line for line in lines
+                      if not line.startswith(('Memo:', 'Validate:', 'Journal:'))]
+            return elapsed, results, output, report, tree_digest(src_dir)
+
+        # Warm-up, so the first timed run does not pay for filling caches
+        timed_run([])
+
+        plain_time, plain_results, plain_output, _, plain_tree = timed_run([])
+        fixed = sum(1 for _, changed in plain_results if changed)
+        print(f"{args.fixer}: {len(plain_results)} files ({args.copies} copies), {fixed} fixed")
+        print(f"{'plain':<6} {plain_time:8.3f} s")
+
+        for name, options in [('memo', ['--memo']), ('store', ['--memo-store']),
+                              ('warm', ['--memo-store'])]:
+            elapsed, results, output, report, tree = timed_run(options)
+            if results != plain_results or output != plain_output or tree != plain_tree:
+                sys.exit(f"{name}: results differ from the plain run")
+            print(f"{name:<6} {elapsed:8.3f} s  {plain_time / elapsed:5.2f}x  "
+                  f"{report[0] if report else ''}")
+
+        shutil.rmtree(src_dir.parent / memo.MEMO_NAME, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
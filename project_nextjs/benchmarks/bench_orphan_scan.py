@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark orphaned-run detection on pathological inputs
+
+Times the fix_lines_* functions against the revision that still rescanned
+forward from every closing brace and export line, on inputs that grow in
+size, and checks that both return the same lines and messages.
+
+Usage: python3 benchmarks/bench_orphan_scan.py [--baseline REV] [--sizes 500,1000,2000,4000]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from baseline import load_module
+
+# Last revision with the per-brace lookahead rescans
+BASELINE_REV = '1db55bd4'
+
+FIXERS = [
+    ('fix_all_fast', 'fix_lines_fast'),
+    ('fix_orphaned_code', 'fix_lines_orphaned'),
+    ('fix_safe_fast', 'fix_lines_safe'),
+    ('fix_simple_safe', 'fix_lines_simple'),
+]
+
+def mapped_callbacks(n):
+    """A closed function followed by n JSX lines that each mention a function"""
+    lines = ['function List({ items }) {', '  return null', '}']
+    lines += ['  {items.map(function (x) { return x })}'] * n
+    return lines
+
+def brace_runs(n):
+    """n closing braces, each followed by a long run of attribute lines"""
+    lines = []
+    for _ in range(n):
+        lines.append('}')
+        lines += ['      value={value}', '      defaultChecked={checked}', ''] * 20
+        lines += ['      fontSize: 12,', '      color: "red",'] * 10
+    return lines
+
+def export_runs(n):
+    """n export default lines, each followed by blank lines and JSX"""
+    lines = []
+    for k in range(n):
+        lines.append(f'export default withAuth(Page{k}, {{ roles: ["admin"] }})')
+        lines += [''] * 20
+        lines += ['  <div>', '  {children}', '  </div>'] * 10
+    return lines
+
+INPUTS = [
+    ('mapped_callbacks', mapped_callbacks),
+    ('brace_runs', brace_runs),
+    ('export_runs', export_runs),
+]
+
+def timed(func, lines):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        start = time.perf_counter()
+        result = func(list(lines))
+        elapsed = time.perf_counter() - start
+    return elapsed, result, out.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark orphaned-run detection')
+    parser.add_argument('--baseline', default=BASELINE_REV,
+                        help=f'git revision to compare against (default {BASELINE_REV})')
+    parser.add_argument('--sizes', default='500,1000,2000,4000',
+                        help='comma separated input sizes')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    print(f"{'fixer':<18} {'input':<17} {'size':>6} {'lines':>8} "
+          f"{'baseline s':>11} {'current s':>10} {'speedup':>8}")
+
+    for module_name, func_name in FIXERS:
+        old_func = getattr(load_module(module_name, args.baseline), func_name)
+        new_func = getattr(__import__(module_name), func_name)
+
+        for input_name, make_input in INPUTS:
+            for size in sizes:
+                lines = make_input(size)
+                old_time, old_result, old_output = timed(old_func, lines)
+                new_time, new_result, new_output = timed(new_func, lines)
+
+                if (old_result, old_output) != (new_result, new_output):
+                    print(f"Output differs: {module_name} on {input_name} size {size}")
+                    sys.exit(1)
+
+                print(f"{module_name:<18} {input_name:<17} {size:>6} {len(lines):>8} "
+                      f"{old_time:>11.4f} {new_time:>10.4f} {old_time / new_time:>7.1f}x")
+
+    print("\nOutputs identical")
+
+if __name__ == '__main__':
+    main()
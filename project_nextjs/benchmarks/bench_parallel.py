@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark --jobs: speedup of a fixer against the number of worker processes
+
+The src tree is copied several times into a scratch directory so there is
+enough work to spread. Every run starts from a fresh copy and must report
+the same fixed count as the serial run.
+
+Usage: python3 benchmarks/bench_parallel.py [--fixer fix_all_fast] [--copies 10] [--max-jobs N]
+"""
+
+import argparse
+import contextlib
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from fixers import runner
+
+FIX_FUNCS = {
+    'fix_all_fast': 'fix_file_fast',
+    'fix_comprehensive': 'fix_file_comprehensive',
+    'fix_duplicate_declarations': 'fix_duplicate_declarations',
+    'fix_orphaned_code': 'fix_orphaned_code',
+    'fix_safe_fast': 'fix_file_safe',
+    'fix_simple_safe': 'fix_file_simple',
+}
+
+def make_corpus(dest, copies):
+    """Copy the project src tree into dest `copies` times"""
+    for n in range(copies):
+        shutil.copytree(PROJECT_ROOT / 'src', dest / f'copy{n}')
+
+def job_counts(limit):
+    """1, 2, 4, ... up to limit"""
+    counts = []
+    n = 1
+    while n < limit:
+        counts.append(n)
+        n *= 2
+    counts.append(limit)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parallel fixer runs')
+    parser.add_argument('--fixer', default='fix_all_fast', choices=sorted(FIX_FUNCS))
+    parser.add_argument('--copies', type=int, default=10,
+                        help='how many copies of src to process')
+    parser.add_argument('--max-jobs', type=int, default=os.cpu_count() or 1,
+                        help='largest worker count to try (default: cores)')
+    args = parser.parse_args()
+
+    fix_func = getattr(importlib.import_module(args.fixer), FIX_FUNCS[args.fixer])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pristine = Path(tmp) / 'pristine'
+        make_corpus(pristine, args.copies)
+        total = len(runner.source_files(pristine))
+        print(f"{args.fixer}: {total} files, {os.cpu_count()} cores")
+        print(f"{'jobs':>6} {'seconds':>10} {'files/s':>10} {'speedup':>8}")
+
+        baseline = None
+        expected = None
+        for jobs in job_counts(args.max_jobs):
+            work = Path(tmp) / f'jobs{jobs}'
+            shutil.copytree(pristine, work)
+            files = runner.source_files(work)
+
+            # Per-file messages from the fixer would only skew the timing
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                fixed = sum(1 for _, changed in runner.run_files(fix_func, files, jobs) if changed)
+                elapsed = time.perf_counter() - start
+
+            if expected is None:
+                expected = fixed
+                baseline = elapsed
+            elif fixed != expected:
+                print(f"Mismatch: {fixed} fixed with {jobs} jobs, {expected} serially")
+                sys.exit(1)
+
+            print(f"{jobs:>6} {elapsed:>10.3f} {total / elapsed:>10.0f} {baseline / elapsed:>7.2f}x")
+            shutil.rmtree(work)
+
+if __name__ == '__main__':
+    main()
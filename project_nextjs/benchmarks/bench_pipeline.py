@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark --pipeline on a simulated high-latency filesystem
+
+The src tree is copied --copies times into a scratch directory, and open()
+is patched to sleep --latency milliseconds before each open, as a network
+volume would for each read and each rewrite. A fixer is then run on a fresh
+copy serially (the plain loop) and through fixers.pipeline at each queue
+depth. Every pipelined run must print the same output and leave the same
+files as the serial one. With --latency 0 it shows the pipeline's own
+overhead on a local disk.
+
+Usage: python3 benchmarks/bench_pipeline.py [--fixer fix_all_fast] [--copies 2]
+           [--latency 5] [--depths 1,2,4,8,16,32]
+"""
+
+import argparse
+import builtins
+import contextlib
+import hashlib
+import importlib
+import io
+import shutil
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from fixers import chain, pipeline, runner
+
+FIXERS = {
+    'fix_all_fast': ('fix_file_fast', 'fix_lines_fast'),
+    'fix_comprehensive': ('fix_file_comprehensive', 'fix_lines_comprehensive'),
+    'fix_duplicate_declarations': ('fix_duplicate_declarations', 'fix_lines_duplicates'),
+    'fix_orphaned_code': ('fix_orphaned_code', 'fix_lines_orphaned'),
+    'fix_safe_fast': ('fix_file_safe', 'fix_lines_safe'),
+    'fix_simple_safe': ('fix_file_simple', 'fix_lines_simple'),
+}
+
+_open = builtins.open
+
+def slow_open(latency, *args, **kwargs):
+    time.sleep(latency)
+    return _open(*args, **kwargs)
+
+def tree_digest(root):
+    """Hash of every file's path and bytes under root"""
+    digest = hashlib.sha1()
+    for path in sorted(root.rglob('*')):
+        if path.is_file():
+            digest.update(path.relative_to(root).as_posix().encode('utf-8'))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+def timed_run(results, latency):
+    """Run a (file_path, fixed) iterator with open() slowed; return (seconds, fixed, output)"""
+    buf = io.StringIO()
+    builtins.open = partial(slow_open, latency)
+    try:
+        with contextlib.redirect_stdout(buf):
+            start = time.perf_counter()
+            fixed = sum(1 for _, changed in results if changed)
+            elapsed = time.perf_counter() - start
+    finally:
+        builtins.open = _open
+    return elapsed, fixed, buf.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark --pipeline with injected latency')
+    parser.add_argument('--fixer', default='fix_all_fast', choices=sorted(FIXERS))
+    parser.add_argument('--copies', type=int, default=2,
+                        help='how many copies of src to process')
+    parser.add_argument('--latency', type=float, default=5.0,
+                        help='milliseconds added to every open()')
+    parser.add_argument('--depths', default='1,2,4,8,16,32',
+                        help='comma separated queue depths to try')
+    args = parser.parse_args()
+
+    module = importlib.import_module(args.fixer)
+    file_func_name, lines_func_name = FIXERS[args.fixer]
+    fix_file = getattr(module, file_func_name)
+    fix_lines = getattr(module, lines_func_name)
+    latency = args.latency / 1000
+    depths = [int(depth) for depth in args.depths.split(',')]
+
+    with tempfile.TemporaryDirectory(prefix='bench_pipeline_') as tmp:
+        master = Path(tmp) / 'master'
+        for n in range(args.copies):
+            shutil.copytree(PROJECT_ROOT / 'src', master / f'copy{n}')
+        work_dir = Path(tmp) / 'work'
+
+        def fresh_files():
+            shutil.rmtree(work_dir, ignore_errors=True)
+            shutil.copytree(master, work_dir)
+            return runner.source_files(work_dir)
+
+        # Warm-up, so the serial run does not pay for filling the caches
+        # (classify memo, page cache) that the later runs find full
+        timed_run(runner.run_files(fix_file, fresh_files()), 0)
+
+        file_paths = fresh_files()
+        serial_time, serial_fixed, serial_output = timed_run(
+            runner.run_files(fix_file, file_paths), latency)
+        serial_tree = tree_digest(work_dir)
+
+        print(f"{args.fixer}: {len(file_paths)} files, {serial_fixed} fixed, "
+              f"{args.latency:g} ms per open")
+        print(f"{'mode':<12} {'seconds':>8} {'speedup':>8}")
+        print(f"{'serial':<12} {serial_time:>8.3f} {1.0:>7.2f}x")
+
+        fix = chain.Chain(partial(pipeline.fix_content, fix_lines))
+        for depth in depths:
+            file_paths = fresh_files()
+            results = zip(file_paths, pipeline.run_pipeline(fix, file_paths, depth))
+            elapsed, fixed, output = timed_run(results, latency)
+            if fixed != serial_fixed or output != serial_output:
+                sys.exit(f"depth {depth}: results differ from the serial run")
+            if tree_digest(work_dir) != serial_tree:
+                sys.exit(f"depth {depth}: files differ from the serial run")
+            print(f"{f'depth {depth}':<12} {elapsed:>8.3f} {serial_time / elapsed:>7.2f}x")
+
+if __name__ == '__main__':
+    main()
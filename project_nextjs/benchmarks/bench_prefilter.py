@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark --prefilter against a plain run of each fixer
+
+Each fixer is run through runner.run on a fresh copy of a tree, once
+plainly and once with --prefilter, on two trees:
+
+  src       the project's src directory
+  corpus    a synthetic corpus (benchmarks/corpus.py), where most files
+            have something to fix
+
+The prefiltered run must print the same lines and leave the same files
+as the plain run. The table shows the best of --repeat runs of each, the
+share of files the prefilter skipped, its screening time, and the time
+actually saved against the runner's own estimate.
+
+Usage: python3 benchmarks/bench_prefilter.py [--files 2000] [--repeat 3]
+           [--fixer fix_all_fast]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib
+import io
+import re
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import corpus
+from fixers import runner
+
+FIXERS = {
+    'fix_all_fast': 'fix_file_fast',
+    'fix_comprehensive': 'fix_file_comprehensive',
+    'fix_duplicate_declarations': 'fix_duplicate_declarations',
+    'fix_orphaned_code': 'fix_orphaned_code',
+    'fix_safe_fast': 'fix_file_safe',
+    'fix_simple_safe': 'fix_file_simple',
+}
+
+REPORT = re.compile(r'Prefilter: (\d+) of (\d+) files skipped \(\d+%\), ([\d.]+) ms screening'
+                    r'(?:, about (-?[\d.]+) s saved)?')
+
+def tree_digest(root):
+    """Hash of every file's path and bytes under root"""
+    digest = hashlib.sha1()
+    for path in sorted(root.rglob('*')):
+        if path.is_file():
+            digest.update(path.relative_to(root).as_posix().encode('utf-8'))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the byte-level prefilter')
+    parser.add_argument('--files', type=int, default=2000, help='synthetic corpus size')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fixer', choices=sorted(FIXERS), help='only this fixer')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    names = [args.fixer] if args.fixer else sorted(FIXERS)
+
+    with tempfile.TemporaryDirectory(prefix='bench_prefilter_') as tmp:
+        corpus.generate(Path(tmp) / 'corpus', args.files, args.seed)
+        trees = [('src', PROJECT_ROOT / 'src'), ('corpus', Path(tmp) / 'corpus' / 'src')]
+        src_dir = Path(tmp) / 'project' / 'src'
+
+        def timed_run(master, module, options):
+            shutil.rmtree(src_dir, ignore_errors=True)
+            shutil.copytree(master, src_dir)
+            buf = io.StringIO()
+            with contextlib.redirect_stdout(buf):
+                start = time.perf_counter()
+                results = list(runner.run(getattr(module, FIXERS[module.__name__]), src_dir,
+                                          runner.parse_args('', options),
+                                          prefilter=module.PREFILTER))
+                elapsed = time.perf_counter() - start
+            lines = buf.getvalue().splitlines()
+            report = [line for line in lines if line.startswith('Prefilter:')]
+            # The validate and journal summaries hold timings, so they differ by run
+            output = [line for line in lines
+                      if not line.startswith(('Prefilter:', 'Validate:', 'Journal:'))]
+            return elapsed, results, output, report, tree_digest(src_dir)
+
+        print(f"{'tree':<7} {'fixer':<27} {'plain s':>8} {'pre s':>7} {'skipped':>9} "
+              f"{'screen ms':>10} {'saved s':>8} {'est s':>7}")
+        for tree, master in trees:
+            for name in names:
+                module = importlib.import_module(name)
+                # Warm-up, so the first timed run does not pay for filling caches
+                timed_run(master, module, [])
+                plain_time = pre_time = float('inf')
+                for _ in range(args.repeat):
+                    elapsed, plain_results, plain_output, _, plain_tree = \
+                        timed_run(master, module, [])
+                    plain_time = min(plain_time, elapsed)
+                    elapsed, results, output, report, pre_tree = \
+                        timed_run(master, module, ['--prefilter'])
+                    pre_time = min(pre_time, elapsed)
+                    if results != plain_results or output != plain_output or \
+                            pre_tree != plain_tree:
+                        sys.exit(f"{tree} {name}: --prefilter results differ from the plain run")
+                skipped, files, screen_ms, estimate = REPORT.match(report[0]).groups()
+                share = int(skipped) / int(files) if int(files) else 0.0
+                print(f"{tree:<7} {name:<27} {plain_time:8.3f} {pre_time:7.3f} {share:9.0%} "
+                      f"{float(screen_ms):10.1f} {plain_time - pre_time:8.3f} "
+                      f"{float(estimate or 0):7.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Time the whole-file regular expressions against fixers.patterns on adversarial input
+
+Each case is text that makes the backtracking engine retry at every
+position: a run of blank lines after a closing brace, export lines
+followed by a '<' that is never closed, one line repeating 'export
+default' many times, and the same line at the end of the file with no
+newline. The original re.subn call and its linear-time replacement run on
+the same text; their results must be identical. Doubling --size should
+roughly quadruple the regex times and double the others.
+
+Usage: python3 benchmarks/bench_regex.py [--size 20000] [--repeat 1]
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from fix_all_fast import AFTER_EXPORT_ATTRIBUTES as FAST_ATTRIBUTES
+from fix_comprehensive import AFTER_BRACE_ATTRIBUTES, AFTER_EXPORT_ATTRIBUTES
+from fixers import patterns
+
+# name -> (original pattern, replacement, linear-time function)
+PATTERNS = {
+    'comprehensive.orphaned_after_export': (
+        r'(export default[^\n]+)\n\s*(?:(?:value=|defaultChecked=|onChange=|fontSize:|color:|style=\{\{)[^\n]*)+\n*',
+        r'\1\n', lambda content: patterns.drop_after_export(content, AFTER_EXPORT_ATTRIBUTES)),
+    'comprehensive.orphaned_after_brace': (
+        r'(\}\s*\n)(\s*(?:value=|defaultChecked=|fontSize:|color:)[^\n]*\n)+',
+        r'\1', lambda content: patterns.drop_attributes_after_brace(content, AFTER_BRACE_ATTRIBUTES)),
+    'all_fast.duplicate_export_cleanup': (
+        r'(export default[^\n]+)\n\s*\1',
+        r'\1', patterns.dedupe_export_lines),
+    'all_fast.orphaned_after_export_cleanup': (
+        r'(export default[^\n]+)\n\s*(?:(?:<[^>]+>|value=|defaultChecked=|fontSize:|color:)[^\n]*)+\n*',
+        r'\1\n', lambda content: patterns.drop_after_export(content, FAST_ATTRIBUTES, tags=True)),
+}
+
+def cases(size):
+    """Yield (case, pattern name, text) for a size parameter
+
+    size is the number of blank lines after the brace, the number of lines
+    in the unclosed tag case and four times the number of 'export
+    default's on the repeated line.
+    """
+    yield ('blank lines after a brace', 'comprehensive.orphaned_after_brace',
+           '}\n' + '\n' * size + 'return null\n')
+    yield ('unclosed tags after exports', 'all_fast.orphaned_after_export_cleanup',
+           'export default Page\n<div\n' * (size // 2))
+    repeated = 'export default ' * (size // 4)
+    yield ('repeated exports on a line', 'all_fast.duplicate_export_cleanup',
+           f'{repeated}A\n{repeated}B\n')
+    for name in ('comprehensive.orphaned_after_export', 'all_fast.duplicate_export_cleanup',
+                 'all_fast.orphaned_after_export_cleanup'):
+        yield 'repeated exports, no final newline', name, repeated
+
+def best_of(repeat, func, content):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(content)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the regexes against their replacements')
+    parser.add_argument('--size', type=int, default=20000,
+                        help='scale of the adversarial input, in lines per case')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per timing, best kept')
+    args = parser.parse_args()
+
+    print(f"{'case':<36} {'pattern':<40} {'regex':>9} {'linear':>9}  result")
+    failed = False
+    for case, name, content in cases(args.size):
+        pattern, replacement, linear = PATTERNS[name]
+        compiled = re.compile(pattern, re.MULTILINE)
+        regex_seconds, expected = best_of(args.repeat,
+                                          lambda text: compiled.subn(replacement, text), content)
+        linear_seconds, result = best_of(args.repeat, linear, content)
+        same = result == expected
+        failed |= not same
+        print(f"{case:<36} {name:<40} {regex_seconds * 1000:7.1f}ms "
+              f"{linear_seconds * 1000:7.2f}ms  {'same' if same else 'DIFFERENT'}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Show that classification cost stays flat as line kinds and rules are added
+
+Registers synthetic attribute prefixes (e.g. 'dataFoo=') in steps and, at
+each step, times the trie classifier over every stripped line of src
+against the same kinds written as one ordered regex alternation and as a
+startswith loop, which is what each new prefix used to cost. It also times a
+rule pack that strips runs of all the synthetic kinds. The three
+classifiers must agree on every line.
+
+Usage: python3 benchmarks/bench_rules.py [--steps 0,25,50,100,200] [--repeat 3]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from fixers import classify, rules, runner
+
+def synthetic_prefixes(count, seed=0):
+    """Distinct attribute-like prefixes that no built-in kind starts with"""
+    rng = random.Random(seed)
+    prefixes = set()
+    while len(prefixes) < count:
+        word = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz')
+                       for _ in range(rng.randint(3, 8)))
+        prefixes.add(word + rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') + '=')
+    return sorted(prefixes)
+
+def registered():
+    """(prefix, code, condition) of every kind, longest prefix first"""
+    return sorted(classify._entries, key=lambda entry: -len(entry[0]))
+
+def alternation():
+    """The registered kinds as one ordered regex alternation"""
+    branches = []
+    codes = []
+    for prefix, code, condition in registered():
+        tail = f'(?={condition.pattern})' if condition else ''
+        branches.append(f'({re.escape(prefix)}{tail})')
+        codes.append(code)
+    pattern = re.compile('|'.join(branches) + '|()', re.DOTALL)
+    codes.append(classify.OTHER)
+
+    def match(stripped):
+        return codes[pattern.match(stripped).lastindex - 1]
+    return match
+
+def startswith_loop():
+    """The registered kinds as a loop of startswith tests"""
+    entries = registered()
+
+    def match(stripped):
+        for prefix, code, condition in entries:
+            if stripped.startswith(prefix) and (condition is None or
+                                                condition.match(stripped, len(prefix))):
+                return code
+        return classify.OTHER
+    return match
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Time classification as kinds are added')
+    parser.add_argument('--steps', default='0,25,50,100,200',
+                        help='comma separated numbers of synthetic kinds')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    steps = [int(step) for step in args.steps.split(',')]
+    lines = []
+    for file_path in runner.source_files(PROJECT_ROOT / 'src'):
+        lines.extend(file_path.read_text(encoding='utf-8').split('\n'))
+    # Some lines that start with the synthetic prefixes, so they match too
+    prefixes = synthetic_prefixes(max(steps))
+    rng = random.Random(1)
+    lines.extend(f'    {rng.choice(prefixes)}{{x}}' for _ in range(len(lines) // 50))
+    stripped_lines = [line.strip() for line in lines]
+    n = len(lines)
+
+    print(f"{n} lines, ns per line")
+    print(f"{'kinds':>6} {'trie':>8} {'regex':>8} {'startswith':>11} {'pack':>8}")
+    extra = []
+    for step in steps:
+        while len(extra) < step:
+            prefix = prefixes[len(extra)]
+            extra.append(classify.register_kind(f'synthetic_{len(extra)}', prefix))
+
+        regex_match = alternation()
+        loop_match = startswith_loop()
+        for stripped in stripped_lines:
+            kind = classify.classify(stripped)
+            if regex_match(stripped) != kind or loop_match(stripped) != kind:
+                sys.exit(f"Classifiers disagree on {stripped!r}")
+
+        trie_time = best_of(args.repeat, lambda: [classify.classify(s) for s in stripped_lines])
+        regex_time = best_of(args.repeat, lambda: [regex_match(s) for s in stripped_lines])
+        loop_time = best_of(args.repeat, lambda: [loop_match(s) for s in stripped_lines])
+
+        pack = rules.Pack('bench', [
+            rules.StripRun('synthetic_run', classify.CLOSE_BRACE, extra or classify.VALUE),
+        ])
+
+        def run_pack():
+            classify._kinds.clear()
+            pack.fix_lines(lines)
+        pack_time = best_of(args.repeat, run_pack)
+
+        print(f"{len(classify.KIND_NAMES):>6} {trie_time * 1e9 / n:>8.0f} "
+              f"{regex_time * 1e9 / n:>8.0f} {loop_time * 1e9 / n:>11.0f} "
+              f"{pack_time * 1e9 / n:>8.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure how the fixers scale on synthetic corpora
+
+For each corpus size a reproducible corpus is generated with
+benchmarks/corpus.py (cached in --workdir), and each fixer is run on a
+fresh copy of it in a child process, in three modes:
+
+  split  read all files, run the fix_lines_* rules, write the changed
+         files, timing each phase, to show how time splits between I/O
+         and rules
+  file   the per-file function (fix_file_*) over every file
+  main   the script's main(), including the directory walk
+
+Each run prints one JSON object per line with files/s, MB/s, the child's
+peak RSS and the git revision, so results can be compared across
+versions.
+
+Usage: python3 benchmarks/bench_scale.py [--files 1000,10000,100000] [--seed 0]
+           [--fixers fix_safe_fast,...] [--modes split,file,main]
+           [--workdir DIR] [--output results.jsonl]
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import corpus
+from fixers import runner
+
+# Script -> (per-file function, line transform)
+FIXERS = {
+    'fix_duplicate_declarations': ('fix_duplicate_declarations', 'fix_lines_duplicates'),
+    'fix_orphaned_code': ('fix_orphaned_code', 'fix_lines_orphaned'),
+    'fix_comprehensive': ('fix_file_comprehensive', 'fix_lines_comprehensive'),
+    'fix_safe_fast': ('fix_file_safe', 'fix_lines_safe'),
+    'fix_all_fast': ('fix_file_fast', 'fix_lines_fast'),
+    'fix_simple_safe': ('fix_file_simple', 'fix_lines_simple'),
+}
+MODES = ['split', 'file', 'main']
+
+def git_revision():
+    result = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+def run_child(mode, fixer, run_dir):
+    """Run one measurement in this process and return its record"""
+    module = importlib.import_module(fixer)
+    file_func_name, lines_func_name = FIXERS[fixer]
+    src_dir = run_dir / 'src'
+    record = {}
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        if mode == 'main':
+            # main() looks for src next to the script, or in the cwd
+            module.__file__ = str(run_dir / f'{fixer}.py')
+            os.chdir(run_dir)
+            module.main([])
+        else:
+            file_paths = runner.source_files(src_dir)
+            record['walk_s'] = time.perf_counter() - start
+
+            if mode == 'file':
+                fix_file = getattr(module, file_func_name)
+                start = time.perf_counter()
+                record['fixed'] = sum(bool(fix_file(file_path)) for file_path in file_paths)
+            else:
+                fix_lines = getattr(module, lines_func_name)
+                start = time.perf_counter()
+                contents = []
+                for file_path in file_paths:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        contents.append(f.read())
+                rules_start = time.perf_counter()
+                results = ['\n'.join(fix_lines(content.split('\n'))) for content in contents]
+                write_start = time.perf_counter()
+                fixed = 0
+                for file_path, content, new_content in zip(file_paths, contents, results):
+                    if new_content != content:
+                        with open(file_path, 'w', encoding='utf-8') as f:
+                            f.write(new_content)
+                        fixed += 1
+                end = time.perf_counter()
+                record.update(read_s=rules_start - start, rules_s=write_start - rules_start,
+                              write_s=end - write_start, fixed=fixed)
+        record['seconds'] = time.perf_counter() - start
+
+    return record
+
+def measure(mode, fixer, corpus_dir, run_dir):
+    """Run one measurement in a child process on a fresh copy of the corpus"""
+    if run_dir.exists():
+        shutil.rmtree(run_dir)
+    shutil.copytree(corpus_dir / 'src', run_dir / 'src')
+
+    child = subprocess.Popen([sys.executable, __file__, '--child', mode, fixer, str(run_dir)],
+                             stdout=subprocess.PIPE, text=True)
+    output = child.stdout.read()
+    child.stdout.close()
+    _, status, usage = os.wait4(child.pid, 0)
+    child.returncode = os.waitstatus_to_exitcode(status)
+    if child.returncode != 0:
+        sys.exit(f"{fixer} ({mode}) failed with status {child.returncode}")
+
+    record = json.loads(output)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    record['peak_rss_mb'] = round(usage.ru_maxrss * scale / 1e6, 1)
+    return record
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure how the fixers scale')
+    parser.add_argument('--files', default='1000,10000',
+                        help='comma separated corpus sizes (default 1000,10000)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rates', help='defect rates as name=rate,... (see corpus.py)')
+    parser.add_argument('--fixers', default=','.join(FIXERS),
+                        help='comma separated fixer scripts (default all)')
+    parser.add_argument('--modes', default=','.join(MODES),
+                        help=f"comma separated modes (default {','.join(MODES)})")
+    parser.add_argument('--workdir', type=Path,
+                        help='keep generated corpora here (default a temporary directory)')
+    parser.add_argument('--output', type=Path, help='append JSON lines here instead of stdout')
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'FIXER', 'RUN_DIR'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, fixer, run_dir = args.child
+        print(json.dumps(run_child(mode, fixer, Path(run_dir))))
+        return
+
+    sizes = [int(size) for size in args.files.split(',')]
+    fixers = args.fixers.split(',')
+    modes = args.modes.split(',')
+    for name in fixers:
+        if name not in FIXERS:
+            parser.error(f"Unknown fixer: {name}")
+    for mode in modes:
+        if mode not in MODES:
+            parser.error(f"Unknown mode: {mode}")
+    try:
+        rates = corpus.parse_rates(args.rates)
+    except ValueError as e:
+        parser.error(str(e))
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix='fixer-bench-'))
+    out = open(args.output, 'a', encoding='utf-8') if args.output else sys.stdout
+    common = {'rev': git_revision(), 'python': platform.python_version(),
+              'seed': args.seed, 'rates': rates}
+
+    try:
+        for size in sizes:
+            corpus_dir = workdir / f'corpus-seed{args.seed}-{size}'
+            manifest_path = corpus_dir / 'manifest.json'
+            if manifest_path.exists() and json.loads(manifest_path.read_text())['rates'] == rates:
+                manifest = json.loads(manifest_path.read_text())
+            else:
+                if corpus_dir.exists():
+                    shutil.rmtree(corpus_dir)
+                print(f"Generating {size} files in {corpus_dir}...", file=sys.stderr)
+                manifest = corpus.generate(corpus_dir, size, args.seed, rates)
+
+            for fixer in fixers:
+                for mode in modes:
+                    print(f"{size} files: {fixer} ({mode})", file=sys.stderr)
+                    record = dict(common, files=size, bytes=manifest['bytes'],
+                                  defects=manifest['defects'], fixer=fixer, mode=mode)
+                    record.update(measure(mode, fixer, corpus_dir, workdir / 'run'))
+                    record['files_per_s'] = round(size / record['seconds'], 1)
+                    record['mb_per_s'] = round(manifest['bytes'] / 1e6 / record['seconds'], 2)
+                    print(json.dumps(record), file=out, flush=True)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+        elif (workdir / 'run').exists():
+            shutil.rmtree(workdir / 'run')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Latency client for the fixer server (fix_engine.py --serve)
+
+Four ways of fixing one file, timed per file over the files of src:
+
+  script   what lint-staged did: start python3 fix_simple_safe.py in a
+           scratch project whose src holds just that file
+  cold     start a server, send one fix_text request, read the answer
+  warm     fix_text requests to one server that stays up
+  paths    fix_paths requests (write false) to the same server, one path each
+
+Every fix_text answer is checked against fix_lines_simple run in this
+process. Prints the median, 95th percentile and max latency per mode in
+milliseconds.
+
+Usage: python3 benchmarks/bench_server.py [--files 50] [--rules simple_safe]
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from fixers import runner
+from fix_simple_safe import fix_lines_simple
+
+class Client:
+    """A fixer server subprocess and its request/response pipe"""
+
+    def __init__(self, rules, cwd=PROJECT_ROOT):
+        self.proc = subprocess.Popen(
+            [sys.executable, str(PROJECT_ROOT / 'fix_engine.py'), '--serve', *rules],
+            cwd=cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True, encoding='utf-8')
+        self.next_id = 0
+
+    def call(self, method, **params):
+        self.next_id += 1
+        request = {'jsonrpc': '2.0', 'id': self.next_id, 'method': method, 'params': params}
+        self.proc.stdin.write(json.dumps(request) + '\n')
+        self.proc.stdin.flush()
+        response = json.loads(self.proc.stdout.readline())
+        if 'error' in response:
+            sys.exit(f"Server error: {response['error']}")
+        return response['result']
+
+    def close(self):
+        self.call('shutdown')
+        self.proc.stdin.close()
+        self.proc.wait()
+
+def expected_text(text):
+    return '\n'.join(fix_lines_simple(text.split('\n')))
+
+def summary(name, times):
+    times = sorted(times)
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    print(f"{name:<8} {statistics.median(times) * 1000:8.2f} {p95 * 1000:8.2f} "
+          f"{times[-1] * 1000:8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure fixer server latency')
+    parser.add_argument('--files', type=int, default=50,
+                        help='number of src files to send')
+    parser.add_argument('--rules', default='simple_safe',
+                        help='rule set the server runs (the check assumes simple_safe)')
+    args = parser.parse_args()
+
+    file_paths = runner.source_files(PROJECT_ROOT / 'src')[:args.files]
+    texts = [file_path.read_text(encoding='utf-8') for file_path in file_paths]
+    rules = [args.rules]
+    print(f"{len(file_paths)} files, rules {args.rules}, milliseconds per file")
+    print(f"{'mode':<8} {'median':>8} {'p95':>8} {'max':>8}")
+
+    script_times = []
+    with tempfile.TemporaryDirectory(prefix='bench_server_') as tmp:
+        project = Path(tmp)
+        shutil.copytree(PROJECT_ROOT / 'fixers', project / 'fixers')
+        shutil.copy(PROJECT_ROOT / 'fix_simple_safe.py', project)
+        for file_path in file_paths:
+            shutil.rmtree(project / 'src', ignore_errors=True)
+            target = project / 'src' / file_path.name
+            target.parent.mkdir()
+            shutil.copy(file_path, target)
+            start = time.perf_counter()
+            subprocess.run([sys.executable, 'fix_simple_safe.py'], cwd=project,
+                           stdout=subprocess.DEVNULL, check=True)
+            script_times.append(time.perf_counter() - start)
+    summary('script', script_times)
+
+    cold_times = []
+    for text in texts:
+        start = time.perf_counter()
+        client = Client(rules)
+        result = client.call('fix_text', text=text)
+        cold_times.append(time.perf_counter() - start)
+        client.close()
+        if result['text'] != expected_text(text):
+            sys.exit("Server result differs from fix_lines_simple")
+    summary('cold', cold_times)
+
+    client = Client(rules)
+    try:
+        # Wait until the server is up before timing
+        client.call('rule_sets')
+        warm_times = []
+        for text in texts:
+            start = time.perf_counter()
+            result = client.call('fix_text', text=text)
+            warm_times.append(time.perf_counter() - start)
+            if result['text'] != expected_text(text):
+                sys.exit("Server result differs from fix_lines_simple")
+        summary('warm', warm_times)
+
+        path_times = []
+        for file_path in file_paths:
+            start = time.perf_counter()
+            client.call('fix_paths', paths=[str(file_path)], write=False)
+            path_times.append(time.perf_counter() - start)
+        summary('paths', path_times)
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compare --shard's split with a plain path-hash split
+
+On a synthetic corpus (benchmarks/corpus.py, log-normal file sizes) the
+files are split into N shards two ways:
+
+  hash    sha1(path) mod N, the usual stable split, which balances counts
+  bytes   fixers.shard.assign, the same split rebalanced by bytes
+
+For each split every shard is run in turn on a fresh copy with the
+fixer's per-file function, as a CI node would. The slowest shard is the
+time the sweep takes, so the table shows the largest shard in bytes and
+the slowest shard's time against the ideal (total / N), and how many
+files the rebalancing moved off their hash shard.
+
+Usage: python3 benchmarks/bench_shard.py [--files 5000] [--shards 2,4,8]
+           [--fixer fix_all_fast]
+"""
+
+import argparse
+import hashlib
+import importlib
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import corpus
+from fixers import classify, runner, shard
+
+FIXERS = {
+    'fix_all_fast': 'fix_file_fast',
+    'fix_comprehensive': 'fix_file_comprehensive',
+    'fix_duplicate_declarations': 'fix_duplicate_declarations',
+    'fix_orphaned_code': 'fix_orphaned_code',
+    'fix_safe_fast': 'fix_file_safe',
+    'fix_simple_safe': 'fix_file_simple',
+}
+
+def hash_split(rels, count):
+    return [int(hashlib.sha1(rel.encode('utf-8')).hexdigest(), 16) % count + 1 for rel in rels]
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare shard splits')
+    parser.add_argument('--files', type=int, default=5000)
+    parser.add_argument('--shards', default='2,4,8', help='comma separated shard counts')
+    parser.add_argument('--fixer', default='fix_all_fast', choices=sorted(FIXERS))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    fix_file = getattr(importlib.import_module(args.fixer), FIXERS[args.fixer])
+
+    with tempfile.TemporaryDirectory(prefix='bench_shard_') as tmp:
+        corpus.generate(Path(tmp) / 'master', args.files, args.seed)
+        master = Path(tmp) / 'master' / 'src'
+        work = Path(tmp) / 'work'
+        rels = [file_path.relative_to(master).as_posix()
+                for file_path in runner.source_files(master)]
+        sizes = [(master / rel).stat().st_size for rel in rels]
+        total = sum(sizes)
+
+        def shard_times(shards, count):
+            times = []
+            for number in range(1, count + 1):
+                shutil.rmtree(work, ignore_errors=True)
+                shutil.copytree(master, work)
+                file_paths = [work / rel for rel, s in zip(rels, shards) if s == number]
+                # Each node starts with an empty line kind memo
+                classify._kinds.clear()
+                start = time.perf_counter()
+                for _ in runner.run_files(fix_file, file_paths):
+                    pass
+                times.append(time.perf_counter() - start)
+            return times
+
+        full_time = sum(shard_times([1] * len(rels), 1))
+        print(f"{len(rels)} files, {total} bytes, {args.fixer} {full_time:.2f} s unsharded")
+        print(f"{'N':>3} {'split':<6} {'max MB':>8} {'ideal MB':>9} "
+              f"{'slowest s':>10} {'ideal s':>8} {'moved':>6}")
+        for count in (int(n) for n in args.shards.split(',')):
+            hashed = hash_split(rels, count)
+            for name, shards in [('hash', hashed),
+                                 ('bytes', shard.assign(rels, sizes, count))]:
+                loads = [0] * count
+                for s, size in zip(shards, sizes):
+                    loads[s - 1] += size
+                times = shard_times(shards, count)
+                moved = sum(a != b for a, b in zip(shards, hashed))
+                print(f"{count:>3} {name:<6} {max(loads) / 1e6:>8.3f} {total / count / 1e6:>9.3f} "
+                      f"{max(times):>10.3f} {sum(times) / count:>8.3f} {moved:>6}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure peak memory of the normal and streaming fix paths on large files
+
+Builds single .tsx files of the given sizes by concatenating files from
+benchmarks/corpus.py (so they contain duplicate exports and orphaned JSX
+to remove), then fixes a fresh copy of each with one fixer's per-file
+function and with --stream's fixers.stream.fix_file, each in its own
+child process, and reports the time and the child's peak RSS. The
+streaming peak should stay flat as the file grows.
+
+Usage: python3 benchmarks/bench_stream.py [--sizes 8,32] [--fixer fix_simple_safe]
+           [--workdir DIR]
+"""
+
+import argparse
+import hashlib
+import importlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import corpus
+from fixers import stream
+
+# Script -> (per-file function, generator form of its rules)
+FIXERS = {
+    'fix_duplicate_declarations': ('fix_duplicate_declarations', 'stream_lines_duplicates'),
+    'fix_orphaned_code': ('fix_orphaned_code', 'stream_lines_orphaned'),
+    'fix_safe_fast': ('fix_file_safe', 'stream_lines_safe'),
+    'fix_simple_safe': ('fix_file_simple', 'stream_lines_simple'),
+}
+
+def build_file(path, megabytes, seed=0):
+    """Write a file of about megabytes MB made of concatenated corpus files"""
+    target = megabytes * 1_000_000
+    written = 0
+    index = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < target:
+            _, text, _ = corpus.generate_file(seed, index, corpus.DEFAULT_RATES)
+            f.write(text)
+            written += len(text.encode('utf-8'))
+            index += 1
+    return written
+
+def digest(path):
+    """sha1 of a file, read in chunks
+
+    The parent must stay small: a child's peak RSS starts from the
+    parent's when it is spawned.
+    """
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def run_child(mode, fixer, file_path):
+    module = importlib.import_module(fixer)
+    file_func_name, stream_func_name = FIXERS[fixer]
+    # Keep the rules' messages out of the measurement
+    sys.stdout = io.StringIO()
+    start = time.perf_counter()
+    if mode == 'stream':
+        fixed = stream.fix_file(getattr(module, stream_func_name), file_path)
+    else:
+        fixed = getattr(module, file_func_name)(Path(file_path))
+    seconds = time.perf_counter() - start
+    sys.stdout = sys.__stdout__
+    return {'seconds': seconds, 'fixed': bool(fixed)}
+
+def measure(mode, fixer, source, work_file):
+    shutil.copyfile(source, work_file)
+    child = subprocess.Popen([sys.executable, __file__, '--child', mode, fixer, str(work_file)],
+                             stdout=subprocess.PIPE, text=True)
+    output = child.stdout.read()
+    child.stdout.close()
+    _, status, usage = os.wait4(child.pid, 0)
+    child.returncode = os.waitstatus_to_exitcode(status)
+    if child.returncode != 0:
+        sys.exit(f"{fixer} ({mode}) failed with status {child.returncode}")
+    record = json.loads(output)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    record['peak_rss_mb'] = usage.ru_maxrss * scale / 1e6
+    return record
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure streaming memory use')
+    parser.add_argument('--sizes', default='8,32', help='comma separated file sizes in MB')
+    parser.add_argument('--fixer', default='fix_simple_safe', choices=list(FIXERS))
+    parser.add_argument('--workdir', type=Path, help='where to build the files '
+                        '(default a temporary directory)')
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'FIXER', 'FILE'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, fixer, file_path = args.child
+        print(json.dumps(run_child(mode, fixer, file_path)))
+        return
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix='fixer-stream-'))
+    workdir.mkdir(parents=True, exist_ok=True)
+    print(f"{args.fixer}, one file per size")
+    print(f"{'size':>8}  {'mode':<7} {'time':>8} {'MB/s':>6} {'peak RSS':>10}  output")
+    try:
+        for size in (int(size) for size in args.sizes.split(',')):
+            source = workdir / f'bundle-{size}mb.tsx'
+            total = build_file(source, size)
+            outputs = {}
+            for mode in ('normal', 'stream'):
+                work_file = workdir / f'work-{mode}.tsx'
+                record = measure(mode, args.fixer, source, work_file)
+                outputs[mode] = digest(work_file)
+                print(f"{total / 1e6:6.1f}MB  {mode:<7} {record['seconds']:7.2f}s "
+                      f"{total / 1e6 / record['seconds']:6.1f} {record['peak_rss_mb']:8.1f}MB  "
+                      f"{'fixed' if record['fixed'] else 'unchanged'}")
+            if outputs['normal'] != outputs['stream']:
+                print("  outputs differ")
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
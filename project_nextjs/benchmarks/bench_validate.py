@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure what the post-fix structural check (fixers.validate) costs
+
+Each fixer is run through runner.run on a fresh copy of a tree, once with
+--no-validate and once validating, as a fix script does by default, on
+two trees:
+
+  src       the project's src directory
+  corpus    a synthetic corpus (benchmarks/corpus.py), where most files
+            have something to fix
+
+The line memo is emptied before each run, so every run pays for it as a
+fresh process would. A validated run must leave each file either as the
+unvalidated run did or, if it was not written, as it was. The table shows
+the best of --repeat runs of each, the changed files checked and refused,
+the time spent checking and its throughput over the fixed text, and that
+time as a share of the validated run.
+
+Usage: python3 benchmarks/bench_validate.py [--files 2000] [--repeat 3]
+           [--fixer fix_all_fast]
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import re
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import corpus
+from fixers import lexer, runner
+
+FIXERS = {
+    'fix_all_fast': 'fix_file_fast',
+    'fix_comprehensive': 'fix_file_comprehensive',
+    'fix_duplicate_declarations': 'fix_duplicate_declarations',
+    'fix_orphaned_code': 'fix_orphaned_code',
+    'fix_safe_fast': 'fix_file_safe',
+    'fix_simple_safe': 'fix_file_simple',
+}
+
+REPORT = re.compile(r'Validate: (\d+) changed files checked, (\d+) not written, ([\d.]+) ms'
+                    r'(?: \(([\d.]+) MB/s\))?')
+
+def tree_files(root):
+    """Relative path -> bytes of every file under root"""
+    return {path.relative_to(root).as_posix(): path.read_bytes()
+            for path in root.rglob('*') if path.is_file()}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the post-fix structural check')
+    parser.add_argument('--files', type=int, default=2000, help='synthetic corpus size')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fixer', choices=sorted(FIXERS), help='only this fixer')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    names = [args.fixer] if args.fixer else sorted(FIXERS)
+
+    with tempfile.TemporaryDirectory(prefix='bench_validate_') as tmp:
+        corpus.generate(Path(tmp) / 'corpus', args.files, args.seed)
+        trees = [('src', PROJECT_ROOT / 'src'), ('corpus', Path(tmp) / 'corpus' / 'src')]
+        src_dir = Path(tmp) / 'project' / 'src'
+
+        def timed_run(master, module, options):
+            shutil.rmtree(src_dir, ignore_errors=True)
+            shutil.copytree(master, src_dir)
+            lexer._token_effects.clear()
+            buf = io.StringIO()
+            with contextlib.redirect_stdout(buf):
+                start = time.perf_counter()
+                for _ in runner.run(getattr(module, FIXERS[module.__name__]), src_dir,
+                                    runner.parse_args('', options)):
+                    pass
+                elapsed = time.perf_counter() - start
+            report = [line for line in buf.getvalue().splitlines()
+                      if line.startswith('Validate:')]
+            return elapsed, report, tree_files(src_dir)
+
+        print(f"{'tree':<7} {'fixer':<27} {'plain s':>8} {'valid s':>8} {'checked':>8} "
+              f"{'refused':>8} {'check ms':>9} {'MB/s':>6} {'share':>6}")
+        for tree, master in trees:
+            original = tree_files(master)
+            for name in names:
+                module = importlib.import_module(name)
+                # Warm-up, so the first timed run does not pay for filling caches
+                timed_run(master, module, ['--no-validate'])
+                plain_time = valid_time = float('inf')
+                best = None
+                for _ in range(args.repeat):
+                    elapsed, _, plain_tree = timed_run(master, module, ['--no-validate'])
+                    plain_time = min(plain_time, elapsed)
+                    elapsed, report, valid_tree = timed_run(master, module, [])
+                    if elapsed < valid_time:
+                        valid_time, best = elapsed, report[0]
+                    for rel, data in valid_tree.items():
+                        if data != plain_tree.get(rel) and data != original.get(rel):
+                            sys.exit(f"{tree} {name}: {rel} is neither the fixed nor the "
+                                     f"original file")
+                checked, refused, check_ms, rate = REPORT.match(best).groups()
+                share = float(check_ms) / 1000 / valid_time
+                print(f"{tree:<7} {name:<27} {plain_time:8.3f} {valid_time:8.3f} {checked:>8} "
+                      f"{refused:>8} {float(check_ms):9.1f} {float(rate or 0):6.1f} "
+                      f"{share:6.0%}")
+
+if __name__ == '__main__':
+    main()
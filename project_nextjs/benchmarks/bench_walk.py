@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the source file walk: two rglob passes against one fixers.walk pass
+
+A synthetic corpus (benchmarks/corpus.py) is written to a scratch directory,
+with a generated/ folder of --generated extra files that its .gitignore
+excludes. Each way of listing the files is timed, best of --repeat:
+
+  rglob         src_dir.rglob('*.ts') then src_dir.rglob('*.tsx'), as the
+                fixers used to do (it also lists generated/)
+  walk          runner.source_files with --no-gitignore, the same file list
+  walk+ignore   runner.source_files, which prunes generated/ unentered
+  +stat         the listing plus one stat per file for the cache check:
+                os.stat after rglob, the DirEntry's cached stat after walk
+
+The rglob and walk lists must be identical, and the ignoring walk must give
+the same list less the generated files.
+
+Usage: python3 benchmarks/bench_walk.py [--files 10000] [--generated 10000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import corpus
+from fixers import runner
+
+def rglob_files(src_dir):
+    files = []
+    for ext in runner.EXTENSIONS:
+        files.extend(src_dir.rglob(ext))
+    return files
+
+def rglob_stat(src_dir):
+    return [(file_path, os.stat(file_path)) for file_path in rglob_files(src_dir)]
+
+def walk_stat(src_dir, gitignore):
+    return [(file_path, entry.stat())
+            for file_path, entry in runner.source_entries(src_dir, gitignore=gitignore)]
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def add_generated(src_dir, files):
+    """Write files of generated code under src_dir/generated and ignore it"""
+    for index in range(files):
+        target = src_dir / 'generated' / f'chunk{index // 100}' / f'gen{index}.ts'
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(f'export const gen{index} = {index}\n', encoding='utf-8')
+    (src_dir / '.gitignore').write_text('generated/\n', encoding='utf-8')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the source file walk')
+    parser.add_argument('--files', type=int, default=10000,
+                        help='number of corpus files')
+    parser.add_argument('--generated', type=int, default=10000,
+                        help='number of ignored files under generated/')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench_walk_') as tmp:
+        corpus.generate(tmp, args.files)
+        src_dir = Path(tmp) / 'src'
+        add_generated(src_dir, args.generated)
+
+        expected = rglob_files(src_dir)
+        walked = runner.source_files(src_dir, gitignore=False)
+        if walked != expected:
+            sys.exit("walk and rglob list different files")
+        generated = src_dir / 'generated'
+        kept = [file_path for file_path in expected if generated not in file_path.parents]
+        if runner.source_files(src_dir) != kept:
+            sys.exit("walk with .gitignore does not list exactly the non-generated files")
+
+        print(f"{len(expected)} files, {len(expected) - len(kept)} of them ignored, "
+              f"best of {args.repeat}")
+        timings = [
+            ('rglob', lambda: rglob_files(src_dir)),
+            ('walk', lambda: runner.source_files(src_dir, gitignore=False)),
+            ('walk+ignore', lambda: runner.source_files(src_dir)),
+            ('rglob+stat', lambda: rglob_stat(src_dir)),
+            ('walk+stat', lambda: walk_stat(src_dir, False)),
+            ('walk+ignore+stat', lambda: walk_stat(src_dir, True)),
+        ]
+        base = None
+        for name, func in timings:
+            elapsed = best_of(args.repeat, func)
+            if name.startswith('rglob'):
+                base = elapsed
+            print(f"{name:<17} {elapsed * 1000:9.1f} ms  {base / elapsed:5.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generate a reproducible synthetic .ts/.tsx corpus for the fixer benchmarks
+
+Files look like the ones in src: client components with useState hooks
+and styled JSX forms, withAuth-wrapped pages, and plain .ts data/action
+modules, with sizes spread roughly log-normally. A share of the files is
+seeded with the defects the fixers exist for:
+
+  duplicate_export    the export default line repeated
+  orphaned_jsx        JSX attribute lines left after the closing }
+  withauth_duplicate  export default withAuth(...) repeated on a page
+
+File i depends only on the seed and i, so a smaller corpus is a prefix
+of a larger one with the same seed. A manifest.json next to src records
+the seed, rates and the defects actually injected.
+
+Usage: python3 benchmarks/corpus.py OUT_DIR [--files 1000] [--seed 0]
+           [--rates duplicate_export=0.03,orphaned_jsx=0.05,withauth_duplicate=0.02]
+"""
+
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+
+DEFAULT_RATES = {
+    'duplicate_export': 0.03,
+    'orphaned_jsx': 0.05,
+    'withauth_duplicate': 0.02,
+}
+
+# Share of files of each kind (src has about 1 .ts for every 2 .tsx)
+FILE_KINDS = [('component', 0.45), ('page', 0.25), ('module', 0.30)]
+
+# Files per generated directory
+DIR_SIZE = 200
+
+NOUNS = ['Submission', 'Review', 'Journal', 'Issue', 'Article', 'Author', 'Editor',
+         'Reviewer', 'Subscription', 'Payment', 'Galley', 'Query', 'Announcement',
+         'Section', 'Category', 'Publication', 'Discussion', 'Notification']
+FIELDS = ['title', 'abstract', 'keywords', 'email', 'name', 'affiliation', 'country',
+          'status', 'comment', 'reason', 'language', 'license', 'doi', 'pages', 'volume']
+ROLES = ['admin', 'manager', 'editor', 'section-editor', 'reviewer', 'author',
+         'subscription-manager']
+COLORS = ['#002C40', '#006798', '#333', '#666', '#fff', '#dee2e6', '#00B24E']
+SIZES = ['0.75rem', '0.875rem', '1rem', '1.25rem']
+
+def parse_rates(text):
+    """Parse name=rate,... on top of DEFAULT_RATES"""
+    rates = dict(DEFAULT_RATES)
+    if text:
+        for item in text.split(','):
+            name, _, value = item.partition('=')
+            if name not in DEFAULT_RATES:
+                raise ValueError(f"Unknown defect: {name}")
+            rates[name] = float(value)
+    return rates
+
+def _field_count(rng):
+    """Number of form fields in a component; sets the file size"""
+    return min(60, int(rng.lognormvariate(1.3, 0.8)) + 1)
+
+def _field_jsx(rng, field, indent):
+    pad = ' ' * indent
+    setter = 'set' + field[0].upper() + field[1:]
+    lines = [
+        f'{pad}<div className="form-row" style={{{{ marginBottom: \'1rem\' }}}}>',
+        f'{pad}  <label',
+        f'{pad}    htmlFor="{field}"',
+        f'{pad}    style={{{{',
+        f'{pad}      fontSize: \'{rng.choice(SIZES)}\',',
+        f'{pad}      fontWeight: 600,',
+        f'{pad}      color: \'{rng.choice(COLORS)}\'',
+        f'{pad}    }}}}',
+        f'{pad}  >',
+        f'{pad}    {field.capitalize()}',
+        f'{pad}  </label>',
+        f'{pad}  <input',
+        f'{pad}    id="{field}"',
+        f'{pad}    type="text"',
+        f'{pad}    value={{{field}}}',
+        f'{pad}    onChange={{(e) => {setter}(e.target.value)}}',
+        f'{pad}    style={{{{',
+        f'{pad}      fontSize: \'{rng.choice(SIZES)}\',',
+        f'{pad}      color: \'{rng.choice(COLORS)}\',',
+        f'{pad}      padding: \'0.5rem\'',
+        f'{pad}    }}}}',
+        f'{pad}  />',
+        f'{pad}</div>',
+    ]
+    if rng.random() < 0.3:
+        lines[15:15] = [f'{pad}    defaultChecked={{{field} === \'yes\'}}']
+    return lines
+
+def _orphaned_attributes(rng, fields):
+    """Attribute lines of a form field, as a bad merge leaves them"""
+    field = rng.choice(fields)
+    setter = 'set' + field[0].upper() + field[1:]
+    lines = [
+        f'        value={{{field}}}',
+        f'        onChange={{(e) => {setter}(e.target.value)}}',
+        '        style={{',
+        f'          fontSize: \'{rng.choice(SIZES)}\',',
+        f'          color: \'{rng.choice(COLORS)}\'',
+        '        }}',
+        '      />',
+    ]
+    return lines[:rng.randint(2, len(lines))]
+
+def _component(rng, name, fields, function_name):
+    lines = ["'use client'", '', "import { useState } from 'react'",
+             "import { Button } from '@/components/ui/button'", '']
+    lines += [f'type {name}Props = {{', '  id: string', '  title?: string', '}', '']
+    lines.append(f'function {function_name}({{ id, title }}: {name}Props) {{')
+    for field in fields:
+        setter = 'set' + field[0].upper() + field[1:]
+        lines.append(f"  const [{field}, {setter}] = useState('')")
+    lines += ['', '  const handleSubmit = async () => {',
+              f"    const payload = {{ id, {', '.join(fields)} }}",
+              f"    await fetch(`/api/{name.lower()}/${{id}}`, {{ method: 'POST', body: JSON.stringify(payload) }})",
+              '  }', '', '  return (',
+              '    <form className="pkp_form" onSubmit={handleSubmit}>',
+              '      {/* Form fields */}',
+              '      <h2 style={{ fontSize: \'1.25rem\', color: \'#002C40\' }}>{title}</h2>']
+    for field in fields:
+        lines += _field_jsx(rng, field, 6)
+    lines += ['      <Button type="submit">Save</Button>', '    </form>', '  )', '}']
+    return lines
+
+def _module(rng, name, fields):
+    lines = [f"import type {{ {name} }} from '@/features/{name.lower()}/types'", '']
+    lines += [f'export type {name}Input = {{']
+    lines += [f'  {field}: string' for field in fields]
+    lines += ['}', '']
+    lines += [f'export const {name.upper()}_DEFAULTS: {name}Input = {{']
+    lines += [f"  {field}: ''," for field in fields]
+    lines += ['}', '']
+    lines += [f'export async function list{name}s(journalId: string): Promise<{name}[]> {{',
+              f'  const res = await fetch(`/api/journals/${{journalId}}/{name.lower()}s`)',
+              '  if (!res.ok) {',
+              f"    throw new Error('Failed to load {name.lower()}s')",
+              '  }', '  return res.json()', '}', '']
+    lines += [f'const {name[0].lower() + name[1:]}Api = {{ list{name}s }}', '']
+    return lines, f'export default {name[0].lower() + name[1:]}Api'
+
+def generate_file(seed, index, rates):
+    """Return (relative path, text, defects) for file index of the corpus"""
+    rng = random.Random(f'{seed}:{index}')
+    kind = rng.choices([k for k, _ in FILE_KINDS], [w for _, w in FILE_KINDS])[0]
+    name = rng.choice(NOUNS) + rng.choice(['Form', 'Panel', 'Editor', 'Settings', 'Card'])
+    names = rng.sample(FIELDS, k=len(FIELDS))
+    fields = [names[k % len(names)] + (str(k // len(names)) if k >= len(names) else '')
+              for k in range(_field_count(rng))]
+    area = f'area{index // DIR_SIZE}'
+    defects = []
+
+    if kind == 'module':
+        path = f'src/features/{area}/{name[0].lower() + name[1:]}-{index}.ts'
+        lines, export_line = _module(rng, name, fields)
+        lines.append(export_line)
+    elif kind == 'page':
+        path = f'src/app/({area})/{name.lower()}-{index}/page.tsx'
+        lines = _component(rng, name, fields, f'{name}Page')
+        roles = rng.sample(ROLES, k=rng.randint(1, 3))
+        export_line = f"export default withAuth({name}Page, {json.dumps(roles)})"
+        lines[2:2] = ["import { withAuth } from '@/lib/auth-client'"]
+        lines += ['', export_line]
+    else:
+        path = f'src/features/{area}/components/{name.lower()}-{index}.tsx'
+        lines = _component(rng, name, fields, name)
+        export_line = f'export default {name}'
+        lines += ['', export_line]
+
+    if rng.random() < rates['orphaned_jsx']:
+        # After the function's closing brace, before the export
+        at = len(lines) - 2
+        lines[at:at] = _orphaned_attributes(rng, fields)
+        defects.append('orphaned_jsx')
+    if kind == 'page' and rng.random() < rates['withauth_duplicate']:
+        lines += [''] * rng.randint(0, 1) + [export_line]
+        defects.append('withauth_duplicate')
+    elif rng.random() < rates['duplicate_export']:
+        lines += [''] * rng.randint(0, 1) + [export_line]
+        defects.append('duplicate_export')
+
+    return path, '\n'.join(lines) + '\n', defects
+
+def generate(out_dir, files, seed=0, rates=None):
+    """Write a corpus of files under out_dir/src and return its manifest"""
+    rates = dict(DEFAULT_RATES if rates is None else rates)
+    out_dir = Path(out_dir)
+    counts = dict.fromkeys(DEFAULT_RATES, 0)
+    total_bytes = 0
+    made = set()
+    for index in range(files):
+        path, text, defects = generate_file(seed, index, rates)
+        target = out_dir / path
+        if target.parent not in made:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            made.add(target.parent)
+        data = text.encode('utf-8')
+        target.write_bytes(data)
+        total_bytes += len(data)
+        for defect in defects:
+            counts[defect] += 1
+
+    manifest = {'seed': seed, 'files': files, 'bytes': total_bytes,
+                'rates': rates, 'defects': counts}
+    with open(out_dir / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic fixer corpus')
+    parser.add_argument('out_dir', type=Path)
+    parser.add_argument('--files', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rates', help='defect rates as name=rate,...')
+    args = parser.parse_args()
+
+    if (args.out_dir / 'src').exists():
+        sys.exit(f"{args.out_dir / 'src'} already exists")
+    try:
+        rates = parse_rates(args.rates)
+    except ValueError as e:
+        parser.error(str(e))
+
+    manifest = generate(args.out_dir, args.files, args.seed, rates)
+    print(json.dumps(manifest))
+
+if __name__ == '__main__':
+    main()
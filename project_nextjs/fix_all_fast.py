@@ -4,22 +4,52 @@
 Fast and aggressive fix for all duplicate/orphaned code issues
 """
 
-import os
-import re
 from pathlib import Path
 
-def fix_file_fast(file_path):
-    """Aggressively fix all issues in a file"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except Exception as e:
-        return False
-    
-    original = content
-    lines = content.split('\n')
+from fixers import classify, lexer, patterns, prefilter, profile, runner, scan, validate
+
+# Orphaned JSX after a closed function ({/* comments */} excepted). Each
+# line has one kind, so the start of a new declaration is never in this set.
+ORPHAN_KINDS = classify.kind_set(
+    classify.JSX_TAG, classify.VALUE, classify.DEFAULT_CHECKED, classify.ON_CHANGE,
+    classify.STYLE_OPEN, classify.STYLE, classify.FONT_SIZE, classify.COLOR, classify.BRACE)
+
+# Orphaned JSX directly after export default
+AFTER_EXPORT_KINDS = classify.kind_set(
+    classify.JSX_TAG, classify.VALUE, classify.DEFAULT_CHECKED, classify.FONT_SIZE,
+    classify.COLOR)
+
+# The same after export default in the whole-file cleanup, which also drops
+# JSX tags (<...>, possibly over several lines)
+AFTER_EXPORT_ATTRIBUTES = ('value=', 'defaultChecked=', 'fontSize:', 'color:')
+
+PREFILTER = prefilter.Prefilter('all_fast', [
+    prefilter.Repeated(b'export default'),
+    prefilter.LineAfter(prefilter.kind_starts(AFTER_EXPORT_KINDS),
+                        trigger_contains=(b'export default',)),
+    # Before any export the line loop takes line -1 for the last export
+    prefilter.FirstLine(prefilter.kind_starts(AFTER_EXPORT_KINDS)),
+    # Any line at or below the depth of the last function or arrow
+    # function can end it, so only the order is known
+    prefilter.LineFollowing(prefilter.kind_starts(ORPHAN_KINDS), (b'function', b'=>')),
+])
+
+def fix_lines_fast(lines):
+    """Return lines with all duplicate/orphaned code aggressively removed"""
+    timer = profile.timer('all_fast')
     new_lines = []
     
+    # Real brace depth after each line (braces in strings, comments and
+    # JSX text don't count); lines inside comments and literals are text
+    depths, states = lexer.scan_lines(lines)
+    
+    # Kind of every line, and the next non-empty line from each position
+    # instead of rescanning after each closed brace
+    kinds = lexer.mask_literal_lines(classify.classify_lines(lines), states, classify.OTHER)
+    next_line = scan.next_nonblank(kinds)
+    if timer:
+        timer.lap('scan', examined=len(lines))
+    
     i = 0
     seen_exports = set()
     in_function = False
@@ -28,88 +58,85 @@ def fix_file_fast(file_path):
     
     while i < len(lines):
         line = lines[i]
-        stripped = line.strip()
+        kind = kinds[i]
         
         # Track exports
-        if stripped.startswith('export default'):
-            export_key = stripped[:150]  # Use first 150 chars as key
+        if kind == classify.EXPORT_DEFAULT:
+            export_key = line.strip()[:150]  # Use first 150 chars as key
             if export_key in seen_exports:
                 # Skip duplicate export
+                if timer:
+                    timer.hit('duplicate_export', removed=1)
                 i += 1
                 continue
             seen_exports.add(export_key)
             last_export_line = i
         
         # Track function braces
-        if 'function' in stripped or (stripped.startswith('const ') and '=>' in stripped):
+        if 'function' in line or kind == classify.CONST_ARROW:
             in_function = True
             brace_count = 0
         
-        brace_count += line.count('{') - line.count('}')
+        brace_count += depths[i] - (depths[i - 1] if i else 0)
         
         # If we just closed a function and next lines are orphaned JSX
         if brace_count <= 0 and in_function and i > 0:
-            # Check next non-empty lines
-            j = i + 1
-            orphaned_start = None
-            while j < len(lines):
-                next_stripped = lines[j].strip()
-                if not next_stripped:
-                    j += 1
-                    continue
-                # Check if it's a new declaration
-                if (next_stripped.startswith('export ') or 
-                    next_stripped.startswith('function ') or 
-                    (next_stripped.startswith('const ') and '=' in next_stripped) or
-                    next_stripped.startswith('import ') or
-                    next_stripped.startswith('type ') or
-                    next_stripped.startswith('interface ')):
-                    break
-                # Check if orphaned JSX
-                if (next_stripped.startswith('<') or 
-                    next_stripped.startswith('value=') or 
-                    next_stripped.startswith('defaultChecked=') or
-                    next_stripped.startswith('onChange=') or
-                    next_stripped.startswith('style={{') or
-                    next_stripped.startswith('fontSize:') or
-                    next_stripped.startswith('color:') or
-                    (next_stripped.startswith('{') and not next_stripped.startswith('{/*'))):
-                    if orphaned_start is None:
-                        orphaned_start = j
-                    j += 1
-                else:
-                    break
-            if orphaned_start:
+            # Check next non-empty line
+            orphaned_start = next_line[i + 1]
+            if orphaned_start < len(lines) and ORPHAN_KINDS[kinds[orphaned_start]]:
+                if timer:
+                    timer.hit('orphaned_after_function', removed=orphaned_start - i)
                 i = orphaned_start
                 in_function = False
                 continue
         
         # Check for orphaned code after export default
-        if last_export_line == i - 1 and stripped:
-            if (stripped.startswith('<') or 
-                stripped.startswith('value=') or 
-                stripped.startswith('defaultChecked=') or
-                stripped.startswith('fontSize:') or
-                stripped.startswith('color:')):
-                # Skip orphaned JSX after export
-                i += 1
-                continue
+        if last_export_line == i - 1 and AFTER_EXPORT_KINDS[kind]:
+            # Skip orphaned JSX after export
+            if timer:
+                timer.hit('orphaned_after_export', removed=1)
+            i += 1
+            continue
         
         new_lines.append(line)
         i += 1
     
+    if timer:
+        timer.lap('line_loop', examined=len(lines))
+    
     # Additional cleanup: remove duplicate export patterns
     new_content = '\n'.join(new_lines)
     
     # Remove duplicate export default patterns
-    pattern = r'(export default[^\n]+)\n\s*\1'
-    new_content = re.sub(pattern, r'\1', new_content, flags=re.MULTILINE)
+    new_content, matches = patterns.dedupe_export_lines(new_content)
+    if timer:
+        examined = new_content.count('\n') + 1
+        timer.lap('duplicate_export_cleanup', examined=len(new_lines), matches=matches,
+                  removed=len(new_lines) - examined)
     
     # Remove orphaned JSX after export default (more aggressive)
-    pattern2 = r'(export default[^\n]+)\n\s*(?:(?:<[^>]+>|value=|defaultChecked=|fontSize:|color:)[^\n]*)+\n*'
-    new_content = re.sub(pattern2, r'\1\n', new_content, flags=re.MULTILINE)
+    new_content, matches = patterns.drop_after_export(new_content, AFTER_EXPORT_ATTRIBUTES,
+                                                      tags=True)
+    
+    new_lines = new_content.split('\n')
+    if timer:
+        timer.lap('orphaned_after_export_cleanup', examined=examined, matches=matches,
+                  removed=examined - len(new_lines))
+    
+    return new_lines
+
+def fix_file_fast(file_path):
+    """Aggressively fix all issues in a file"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except Exception as e:
+        return False
+    
+    original = content
+    new_content = '\n'.join(fix_lines_fast(content.split('\n')))
     
-    if new_content != original:
+    if new_content != original and validate.accepts(file_path, original, new_content):
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(new_content)
@@ -119,7 +146,8 @@ def fix_file_fast(file_path):
     
     return False
 
-def main():
+def main(argv=None):
+    args = runner.parse_args(__doc__.strip(), argv)
     project_root = Path(__file__).parent
     src_dir = project_root / 'src'
     
@@ -132,12 +160,13 @@ def main():
     
     print("Fast fixing all files...")
     
-    for ext in ['*.ts', '*.tsx']:
-        for file_path in src_dir.rglob(ext):
-            total_files += 1
-            if fix_file_fast(file_path):
-                fixed_count += 1
-                print(f"Fixed: {file_path.relative_to(project_root)}")
+    for file_path, changed in runner.run(fix_file_fast, src_dir, args,
+                                         fix_lines=fix_lines_fast,
+                                         prefilter=PREFILTER):
+        total_files += 1
+        if changed:
+            fixed_count += 1
+            print(f"Fixed: {file_path.relative_to(project_root)}")
     
     print(f"\nFixed {fixed_count} out of {total_files} files")
 
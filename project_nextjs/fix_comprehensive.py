@@ -7,18 +7,30 @@ Comprehensive but safe fix - handles multiple patterns at once
 import re
 from pathlib import Path
 
-def fix_file_comprehensive(file_path):
-    """Comprehensively fix all common issues safely"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except:
-        return False
-    
-    original = content
+from fixers import patterns, prefilter, profile, runner, validate
+
+# JSX attributes left behind after export default (Fix 2)
+AFTER_EXPORT_ATTRIBUTES = ('value=', 'defaultChecked=', 'onChange=', 'fontSize:', 'color:',
+                           'style={{')
+
+# JSX attributes left behind after a closing brace (Fix 3)
+AFTER_BRACE_ATTRIBUTES = ('value=', 'defaultChecked=', 'fontSize:', 'color:')
+
+PREFILTER = prefilter.Prefilter('comprehensive', [
+    prefilter.Repeated(b'export default'),
+    prefilter.LineAfter(prefilter.markers(AFTER_EXPORT_ATTRIBUTES),
+                        trigger_contains=(b'export default',)),
+    prefilter.LineAfter(prefilter.markers(AFTER_BRACE_ATTRIBUTES), trigger_ends=(b'}',)),
+    # Fix 4 looks at the 9 lines after the declaration for JSX
+    prefilter.LineWithin((b'<', b'{'), (b'export default function ',
+                                        b'export default async function '), 9),
+])
+
+def fix_lines_comprehensive(lines):
+    """Return lines with all common issues comprehensively fixed"""
+    timer = profile.timer('comprehensive')
     
     # Fix 1: Remove duplicate export default (consecutive exact duplicates)
-    lines = content.split('\n')
     new_lines = []
     prev_export = None
     
@@ -39,21 +51,30 @@ def fix_file_comprehensive(file_path):
         new_lines.append(line)
         i += 1
     
+    if timer:
+        removed = len(lines) - len(new_lines)
+        timer.lap('duplicate_exports', examined=len(lines), matches=removed, removed=removed)
+    
     content = '\n'.join(new_lines)
     
     # Fix 2: Remove orphaned JSX after export default (specific pattern)
     # Pattern: export default ... followed by JSX attributes
-    pattern1 = r'(export default[^\n]+)\n\s*(?:(?:value=|defaultChecked=|onChange=|fontSize:|color:|style=\{\{)[^\n]*)+\n*'
-    content = re.sub(pattern1, r'\1\n', content, flags=re.MULTILINE)
+    content, matches = patterns.drop_after_export(content, AFTER_EXPORT_ATTRIBUTES)
+    if timer:
+        examined = content.count('\n') + 1
+        timer.lap('orphaned_after_export', examined=len(new_lines), matches=matches,
+                  removed=len(new_lines) - examined)
     
     # Fix 3: Remove orphaned code after function closing brace
     # Only if followed by JSX attributes (very specific)
-    pattern2 = r'(\}\s*\n)(\s*(?:value=|defaultChecked=|fontSize:|color:)[^\n]*\n)+'
-    content = re.sub(pattern2, r'\1', content)
+    content, matches = patterns.drop_attributes_after_brace(content, AFTER_BRACE_ATTRIBUTES)
     
     # Fix 4: Fix incomplete function declarations (missing return/body)
     # This is more complex, so we'll do it line by line
     lines = content.split('\n')
+    if timer:
+        timer.lap('orphaned_after_brace', examined=examined, matches=matches,
+                  removed=examined - len(lines))
     fixed_lines = []
     i = 0
     
@@ -85,6 +106,8 @@ def fix_file_comprehensive(file_path):
             
             # If we found JSX but no return, add return
             if found_jsx and not found_return:
+                if timer:
+                    timer.hit('missing_return')
                 fixed_lines.append(line)
                 # Check if function declaration has opening brace
                 if '{' not in stripped:
@@ -97,9 +120,23 @@ def fix_file_comprehensive(file_path):
         fixed_lines.append(line)
         i += 1
     
-    content = '\n'.join(fixed_lines)
+    if timer:
+        timer.lap('missing_return', examined=len(lines))
+    
+    return fixed_lines
+
+def fix_file_comprehensive(file_path):
+    """Comprehensively fix all common issues safely"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except:
+        return False
+    
+    original = content
+    content = '\n'.join(fix_lines_comprehensive(content.split('\n')))
     
-    if content != original:
+    if content != original and validate.accepts(file_path, original, content):
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(content)
@@ -109,7 +146,8 @@ def fix_file_comprehensive(file_path):
     
     return False
 
-def main():
+def main(argv=None):
+    args = runner.parse_args(__doc__.strip(), argv)
     project_root = Path(__file__).parent
     src_dir = project_root / 'src'
     
@@ -123,12 +161,13 @@ def main():
     print("Comprehensive safe fixing...")
     print("=" * 50)
     
-    for ext in ['*.ts', '*.tsx']:
-        for file_path in src_dir.rglob(ext):
-            total_files += 1
-            if fix_file_comprehensive(file_path):
-                fixed_count += 1
-                print(f"✓ {file_path.relative_to(project_root)}")
+    for file_path, changed in runner.run(fix_file_comprehensive, src_dir, args,
+                                         fix_lines=fix_lines_comprehensive,
+                                         prefilter=PREFILTER):
+        total_files += 1
+        if changed:
+            fixed_count += 1
+            print(f"✓ {file_path.relative_to(project_root)}")
     
     print("=" * 50)
     print(f"Fixed {fixed_count}/{total_files} files")
@@ -2,11 +2,56 @@
 # -*- coding: utf-8 -*-
 """
 Fix duplicate function/export declarations
+
+With --cross-file or --who-exports it reports default exports shared
+between files instead, from the export index (fixers/exports.py).
 """
 
+import argparse
 import re
 from pathlib import Path
 
+from fixers import classify, exports, prefilter, rules, runner, validate
+
+def declaration_key(stripped):
+    """Key under which two export default lines count as the same declaration"""
+    # For "export default function Name" or "export default withAuth(...)"
+    declaration_key = stripped
+    
+    # Normalize: extract key parts for comparison
+    if 'function' in stripped:
+        match = re.search(r'export default function\s+(\w+)', stripped)
+        if match:
+            declaration_key = f'export default function {match.group(1)}'
+    elif 'withAuth' in stripped:
+        # Extract component name from withAuth(ComponentName, ...)
+        match = re.search(r'withAuth\((\w+)', stripped)
+        if match:
+            declaration_key = f'export default withAuth({match.group(1)}'
+        else:
+            # Use full line as key
+            declaration_key = stripped[:100]  # Limit length
+    else:
+        # Other export default, use first part
+        declaration_key = stripped[:100]
+    return declaration_key
+
+RULES = rules.Pack('duplicate_declarations', [
+    # Also drops the empty lines after a duplicate
+    rules.Dedupe('duplicate_export', classify.EXPORT_DEFAULT, declaration_key, blanks=True,
+                 message="  Removing duplicate export default at line {line}"),
+])
+
+PREFILTER = prefilter.for_pack(RULES)
+
+def fix_lines_duplicates(lines):
+    """Return lines with duplicate export default declarations removed"""
+    return RULES.fix_lines(lines)
+
+def stream_lines_duplicates(lines):
+    """Yield the lines fix_lines_duplicates would return, one at a time"""
+    return RULES.stream_lines(lines)
+
 def fix_duplicate_declarations(file_path):
     """Remove duplicate function/export declarations"""
     try:
@@ -17,57 +62,9 @@ def fix_duplicate_declarations(file_path):
         return False
     
     original_content = content
-    lines = content.split('\n')
-    new_lines = []
+    new_content = '\n'.join(fix_lines_duplicates(content.split('\n')))
     
-    i = 0
-    seen_declarations = set()
-    
-    while i < len(lines):
-        line = lines[i]
-        stripped = line.strip()
-        
-        # Check for export default declarations (function, withAuth, etc)
-        if stripped.startswith('export default'):
-            # Extract the full declaration for comparison
-            # For "export default function Name" or "export default withAuth(...)"
-            declaration_key = stripped
-            
-            # Normalize: extract key parts for comparison
-            if 'function' in stripped:
-                match = re.search(r'export default function\s+(\w+)', stripped)
-                if match:
-                    declaration_key = f'export default function {match.group(1)}'
-            elif 'withAuth' in stripped:
-                # Extract component name from withAuth(ComponentName, ...)
-                match = re.search(r'withAuth\((\w+)', stripped)
-                if match:
-                    declaration_key = f'export default withAuth({match.group(1)}'
-                else:
-                    # Use full line as key
-                    declaration_key = stripped[:100]  # Limit length
-            else:
-                # Other export default, use first part
-                declaration_key = stripped[:100]
-            
-            if declaration_key in seen_declarations:
-                # This is a duplicate, skip it
-                print(f"  Removing duplicate export default at line {i+1}")
-                # Skip this line and any following empty lines
-                j = i + 1
-                while j < len(lines) and not lines[j].strip():
-                    j += 1
-                i = j
-                continue
-            else:
-                seen_declarations.add(declaration_key)
-        
-        new_lines.append(line)
-        i += 1
-    
-    new_content = '\n'.join(new_lines)
-    
-    if new_content != original_content:
+    if new_content != original_content and validate.accepts(file_path, original_content, new_content):
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(new_content)
@@ -78,25 +75,57 @@ def fix_duplicate_declarations(file_path):
     
     return False
 
-def main():
+def report_exports(src_dir, args):
+    """Print the default exports found in several files, or the files exporting a name"""
+    index = exports.open_index(src_dir, declaration_key, args.exclude, args.gitignore)
+    if args.who_exports:
+        files = index.exporters(args.who_exports)
+        print(f"{args.who_exports}: exported from {len(files)} "
+              f"file{'' if len(files) == 1 else 's'}")
+        for rel, lines in files.items():
+            print(f"  {rel}:{','.join(map(str, lines))}")
+        return
+
+    duplicates = index.duplicates()
+    for key, files in duplicates.items():
+        print(f"{key}")
+        for rel, lines in files.items():
+            print(f"  {rel}:{','.join(map(str, lines))}")
+    print(f"\n{len(duplicates)} default exports found in more than one file")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    queries = parser.add_mutually_exclusive_group()
+    queries.add_argument('--cross-file', action='store_true',
+                         help='list default exports found in more than one file')
+    queries.add_argument('--who-exports', metavar='NAME',
+                         help='list the files that default-export a component name or key')
+    runner.add_arguments(parser)
+    args = parser.parse_args(argv)
     project_root = Path(__file__).parent
     src_dir = project_root / 'src'
     
     if not src_dir.exists():
         print(f"Source directory not found: {src_dir}")
         return
+
+    if args.cross_file or args.who_exports:
+        report_exports(src_dir, args)
+        return
     
     fixed_count = 0
     total_files = 0
     
     print("Scanning for duplicate declarations...")
     
-    for ext in ['*.ts', '*.tsx']:
-        for file_path in src_dir.rglob(ext):
-            total_files += 1
-            if fix_duplicate_declarations(file_path):
-                fixed_count += 1
-                print(f"Fixed: {file_path.relative_to(project_root)}")
+    for file_path, changed in runner.run(fix_duplicate_declarations, src_dir, args,
+                                         fix_lines=fix_lines_duplicates,
+                                         stream_lines=stream_lines_duplicates,
+                                         prefilter=PREFILTER):
+        total_files += 1
+        if changed:
+            fixed_count += 1
+            print(f"Fixed: {file_path.relative_to(project_root)}")
     
     print(f"\nFixed {fixed_count} out of {total_files} files")
 
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unified fixer - runs the rules of several fix_*.py scripts in a single pass
+
+Each file is read once, the chosen rule sets run over one shared line
+buffer in order, and the file is written at most once. The result is the
+same as running the chosen scripts one after another.
+
+Usage: python3 fix_engine.py [-j N] [--diff | --check] [--stream] [safe | aggressive | RULE_SET ...]
+       python3 fix_engine.py --serve [RULE_SET ...]   (JSON-RPC on stdin/stdout, see fixers.server)
+"""
+
+import argparse
+from functools import partial
+from pathlib import Path
+
+from fixers import journal, prefilter, runner, server, validate
+
+import fix_all_fast
+import fix_comprehensive
+import fix_duplicate_declarations
+import fix_orphaned_code
+import fix_safe_fast
+import fix_simple_safe
+from fix_all_fast import fix_lines_fast
+from fix_comprehensive import fix_lines_comprehensive
+from fix_duplicate_declarations import fix_lines_duplicates, stream_lines_duplicates
+from fix_orphaned_code import fix_lines_orphaned, stream_lines_orphaned
+from fix_safe_fast import fix_lines_safe, stream_lines_safe
+from fix_simple_safe import fix_lines_simple, stream_lines_simple
+
+# Rule sets in the order the scripts have always been run
+RULE_SETS = {
+    'duplicate_declarations': fix_lines_duplicates,
+    'orphaned_code': fix_lines_orphaned,
+    'comprehensive': fix_lines_comprehensive,
+    'safe_fast': fix_lines_safe,
+    'all_fast': fix_lines_fast,
+    'simple_safe': fix_lines_simple,
+}
+
+# Generator forms for --stream; comprehensive and all_fast end in passes
+# over the whole file text and cannot stream
+STREAM_RULE_SETS = {
+    'duplicate_declarations': stream_lines_duplicates,
+    'orphaned_code': stream_lines_orphaned,
+    'safe_fast': stream_lines_safe,
+    'simple_safe': stream_lines_simple,
+}
+
+# Byte-level prefilters of the rule sets (--prefilter)
+PREFILTERS = {
+    'duplicate_declarations': fix_duplicate_declarations.PREFILTER,
+    'orphaned_code': fix_orphaned_code.PREFILTER,
+    'comprehensive': fix_comprehensive.PREFILTER,
+    'safe_fast': fix_safe_fast.PREFILTER,
+    'all_fast': fix_all_fast.PREFILTER,
+    'simple_safe': fix_simple_safe.PREFILTER,
+}
+
+PROFILES = {
+    'safe': ['duplicate_declarations', 'safe_fast', 'simple_safe'],
+    'aggressive': list(RULE_SETS),
+}
+
+def resolve_rules(names):
+    """Expand profile names and script names into a list of rule sets"""
+    rules = []
+    for name in names:
+        if name in PROFILES:
+            rules.extend(PROFILES[name])
+            continue
+        # Accept script names too, e.g. fix_safe_fast.py
+        key = name[:-3] if name.endswith('.py') else name
+        key = key[4:] if key.startswith('fix_') else key
+        if key not in RULE_SETS:
+            raise ValueError(f"Unknown rule set: {name}")
+        rules.append(key)
+    return rules
+
+def fix_lines(lines, rules):
+    """Run each rule set over the line buffer in order
+
+    A journaled file gets each rule set's edits recorded apart.
+    """
+    steps = journal.steps()
+    for name in rules:
+        new_lines = RULE_SETS[name](lines)
+        if steps is not None:
+            steps.append((name, lines, new_lines))
+        lines = new_lines
+    return lines
+
+def stream_lines(lines, rules):
+    """Chain the generator forms of the rule sets over a stream of lines"""
+    for name in rules:
+        lines = STREAM_RULE_SETS[name](lines)
+    return lines
+
+def fix_file(file_path, rules):
+    """Apply the rule sets to a file, reading and writing it at most once"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except Exception as e:
+        print(f"Error reading {file_path}: {e}")
+        return False
+
+    original = content
+    new_content = '\n'.join(fix_lines(content.split('\n'), rules))
+
+    if new_content != original and validate.accepts(file_path, original, new_content):
+        try:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(new_content)
+            return True
+        except Exception as e:
+            print(f"Error writing {file_path}: {e}")
+            return False
+
+    return False
+
+def serve(rules):
+    """Answer JSON-RPC fix requests on stdin/stdout until shutdown"""
+    catalog = {'rule_sets': list(RULE_SETS), 'profiles': PROFILES, 'default': rules}
+    server.Server(lambda names: partial(fix_lines, rules=resolve_rules(names)),
+                  rules, catalog).serve()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run several fixers in one pass')
+    parser.add_argument('rules', nargs='*', default=['safe'],
+                        help=f"profiles ({', '.join(PROFILES)}) or rule sets "
+                             f"({', '.join(RULE_SETS)}), applied in order")
+    parser.add_argument('--serve', action='store_true',
+                        help='keep the rules loaded and answer JSON-RPC requests '
+                             'on stdin/stdout (see fixers/server.py)')
+    runner.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        rules = resolve_rules(args.rules)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.serve:
+        serve(rules)
+        return
+
+    if args.stream:
+        unsupported = [name for name in rules if name not in STREAM_RULE_SETS]
+        if unsupported:
+            parser.error(f"Cannot stream {', '.join(unsupported)}")
+
+    project_root = Path(__file__).parent
+    src_dir = project_root / 'src'
+
+    if not src_dir.exists():
+        print(f"Source directory not found: {src_dir}")
+        return
+
+    fixed_count = 0
+    total_files = 0
+
+    print(f"Running {', '.join(rules)}...")
+
+    fix_func = partial(fix_file, rules=rules)
+    for file_path, changed in runner.run(fix_func, src_dir, args,
+                                         fix_lines=partial(fix_lines, rules=rules),
+                                         stream_lines=partial(stream_lines, rules=rules),
+                                         prefilter=prefilter.combine(
+                                             'engine', [PREFILTERS[name] for name in rules])):
+        total_files += 1
+        if changed:
+            fixed_count += 1
+            print(f"Fixed: {file_path.relative_to(project_root)}")
+
+    print(f"\nFixed {fixed_count} out of {total_files} files")
+
+if __name__ == '__main__':
+    main()
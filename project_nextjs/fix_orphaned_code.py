@@ -5,126 +5,133 @@ Fix orphaned code blocks after function/export statements
 Simple and direct approach
 """
 
-import os
-import re
 from pathlib import Path
 
-def fix_orphaned_code(file_path):
-    """Remove orphaned code after function/export statements"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        return False
-    
-    original_content = content
-    lines = content.split('\n')
+from fixers import classify, lexer, prefilter, profile, runner, scan, stream, validate
+
+# Orphaned JSX/attributes ({/* comments */} excepted). Each line has one
+# kind, so a new export/function/const declaration is never in this set.
+ORPHAN_KINDS = classify.kind_set(
+    classify.JSX_TAG, classify.VALUE, classify.DEFAULT_CHECKED, classify.ON_CHANGE,
+    classify.STYLE_OPEN, classify.STYLE, classify.FONT_SIZE, classify.COLOR, classify.BRACE)
+
+PREFILTER = prefilter.Prefilter('orphaned_code', [
+    # An export default line is written twice unless orphaned code follows it
+    prefilter.Present(b'export default'),
+    prefilter.LineAfter(prefilter.kind_starts(ORPHAN_KINDS),
+                        trigger_lines=prefilter.kind_lines(classify.kind_set(classify.CLOSE_BRACE))),
+])
+
+def fix_lines_orphaned(lines):
+    """Return lines with orphaned code after function/export statements removed"""
+    timer = profile.timer('orphaned_code')
     new_lines = []
     
+    # Kind of every line, and the next non-empty line from each position
+    kinds = classify.classify_lines(lines)
+    next_line = scan.next_nonblank(kinds)
+    # Lines that start inside a comment or string/template literal are text
+    # whatever they look like; only asked about lines a rule would act on
+    in_literal = lexer.LiteralLines(lines)
+    if timer:
+        timer.lap('scan', examined=len(lines))
+    
     i = 0
     while i < len(lines):
         line = lines[i]
-        stripped = line.strip()
+        kind = kinds[i]
         
         # Check if this is an export default statement (especially withAuth)
-        if stripped.startswith('export default'):
+        if kind == classify.EXPORT_DEFAULT and not in_literal[i]:
             new_lines.append(line)
             i += 1
             
-            # Check if next non-empty lines are orphaned JSX
-            j = i
-            orphaned_start = None
-            while j < len(lines):
-                next_line = lines[j]
-                next_stripped = next_line.strip()
-                
-                if not next_stripped:
-                    j += 1
-                    continue
-                
-                # Check if it's a new export/function/const declaration - not orphaned
-                if (next_stripped.startswith('export ') or 
-                    next_stripped.startswith('function ') or 
-                    (next_stripped.startswith('const ') and '=' in next_stripped and '=>' in next_stripped) or
-                    next_stripped.startswith('import ') or
-                    next_stripped.startswith('type ') or
-                    next_stripped.startswith('interface ')):
-                    break
-                
-                # Check if it looks like orphaned JSX/attributes
-                if (next_stripped.startswith('<') or 
-                    next_stripped.startswith('value=') or 
-                    next_stripped.startswith('defaultChecked=') or
-                    next_stripped.startswith('onChange=') or
-                    next_stripped.startswith('style={{') or
-                    next_stripped.startswith('fontSize:') or
-                    next_stripped.startswith('color:') or
-                    (next_stripped.startswith('{') and not next_stripped.startswith('{/*'))):
-                    if orphaned_start is None:
-                        orphaned_start = j
-                    j += 1
-                    continue
-                else:
-                    # Not orphaned, break
-                    break
-            
-            if orphaned_start is not None:
+            # Check if next non-empty line is orphaned JSX
+            orphaned_start = next_line[i]
+            if (orphaned_start < len(lines) and ORPHAN_KINDS[kinds[orphaned_start]] and
+                    not in_literal[orphaned_start]):
                 print(f"  Removing orphaned code from line {orphaned_start+1}")
+                if timer:
+                    timer.hit('orphaned_after_export', removed=orphaned_start - i)
                 i = orphaned_start
                 continue
         
         # Check if this is a function closing brace
-        if stripped == '}' and i > 0:
+        if kind == classify.CLOSE_BRACE and i > 0 and not in_literal[i]:
             # Look ahead to see if there's orphaned JSX
-            j = i + 1
-            orphaned_start = None
-            
-            while j < len(lines):
-                next_line = lines[j]
-                next_stripped = next_line.strip()
-                
-                if not next_stripped:
-                    j += 1
-                    continue
-                
-                # Check if it's a new export/function/const - not orphaned
-                if (next_stripped.startswith('export ') or 
-                    next_stripped.startswith('function ') or 
-                    (next_stripped.startswith('const ') and '=' in next_stripped and '=>' in next_stripped) or
-                    next_stripped.startswith('import ') or
-                    next_stripped.startswith('type ') or
-                    next_stripped.startswith('interface ')):
-                    break
-                
-                # Check if it looks like orphaned JSX
-                if (next_stripped.startswith('<') or 
-                    next_stripped.startswith('value=') or 
-                    next_stripped.startswith('defaultChecked=') or
-                    next_stripped.startswith('onChange=') or
-                    next_stripped.startswith('style={{') or
-                    next_stripped.startswith('fontSize:') or
-                    next_stripped.startswith('color:') or
-                    (next_stripped.startswith('{') and not next_stripped.startswith('{/*'))):
-                    if orphaned_start is None:
-                        orphaned_start = j
-                    j += 1
-                    continue
-                else:
-                    break
-            
-            if orphaned_start is not None:
+            orphaned_start = next_line[i + 1]
+            if (orphaned_start < len(lines) and ORPHAN_KINDS[kinds[orphaned_start]] and
+                    not in_literal[orphaned_start]):
                 new_lines.append(line)
                 print(f"  Removing orphaned code after function end at line {orphaned_start+1}")
+                if timer:
+                    timer.hit('orphaned_after_function', removed=orphaned_start - i - 1)
                 i = orphaned_start
                 continue
         
         new_lines.append(line)
         i += 1
     
-    new_content = '\n'.join(new_lines)
+    if timer:
+        timer.lap('line_loop', examined=len(lines))
+    
+    return new_lines
+
+def stream_lines_orphaned(lines):
+    """Yield the lines fix_lines_orphaned would return, reading ahead only over blanks"""
+    items = ((i, line, classify.classify_line(line), in_literal)
+             for i, (line, in_literal) in enumerate(lexer.literal_flags(lines)))
+    held = None             # a line read ahead, still to be processed
+    
+    while True:
+        item = held or next(items, None)
+        held = None
+        if item is None:
+            return
+        i, line, kind, in_literal = item
+        
+        # Check if this is an export default statement (especially withAuth)
+        if kind == classify.EXPORT_DEFAULT and not in_literal:
+            yield line
+            blanks, held = stream.next_nonblank(items)
+            if held is not None and ORPHAN_KINDS[held[2]] and not held[3]:
+                print(f"  Removing orphaned code from line {held[0]+1}")
+                continue
+            # As in fix_lines_orphaned, the export line is repeated and the
+            # line after it dropped
+            yield line
+            if blanks:
+                blanks.drop_first()
+                yield from blanks
+            else:
+                held = None
+            continue
+        
+        # Check if this is a function closing brace
+        if kind == classify.CLOSE_BRACE and i > 0 and not in_literal:
+            yield line
+            blanks, held = stream.next_nonblank(items)
+            if held is not None and ORPHAN_KINDS[held[2]] and not held[3]:
+                print(f"  Removing orphaned code after function end at line {held[0]+1}")
+            else:
+                yield from blanks
+            continue
+        
+        yield line
+
+def fix_orphaned_code(file_path):
+    """Remove orphaned code after function/export statements"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except Exception as e:
+        print(f"Error reading {file_path}: {e}")
+        return False
+    
+    original_content = content
+    new_content = '\n'.join(fix_lines_orphaned(content.split('\n')))
     
-    if new_content != original_content:
+    if new_content != original_content and validate.accepts(file_path, original_content, new_content):
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(new_content)
@@ -135,7 +142,8 @@ def fix_orphaned_code(file_path):
     
     return False
 
-def main():
+def main(argv=None):
+    args = runner.parse_args(__doc__.strip(), argv)
     project_root = Path(__file__).parent
     src_dir = project_root / 'src'
     
@@ -149,12 +157,14 @@ def main():
     print("Scanning for orphaned code...")
     
     # Process all TypeScript/TSX files
-    for ext in ['*.ts', '*.tsx']:
-        for file_path in src_dir.rglob(ext):
-            total_files += 1
-            if fix_orphaned_code(file_path):
-                fixed_count += 1
-                print(f"Fixed: {file_path.relative_to(project_root)}")
+    for file_path, changed in runner.run(fix_orphaned_code, src_dir, args,
+                                         fix_lines=fix_lines_orphaned,
+                                         stream_lines=stream_lines_orphaned,
+                                         prefilter=PREFILTER):
+        total_files += 1
+        if changed:
+            fixed_count += 1
+            print(f"Fixed: {file_path.relative_to(project_root)}")
     
     print(f"\nFixed {fixed_count} out of {total_files} files")
 
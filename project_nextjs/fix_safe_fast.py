@@ -4,10 +4,45 @@
 Safe and fast fix for duplicate/orphaned code - only fixes clear patterns
 """
 
-import os
-import re
 from pathlib import Path
 
+from fixers import classify, prefilter, rules, runner, validate
+
+# Orphaned JSX attribute directly after export default
+AFTER_EXPORT_KINDS = classify.kind_set(
+    classify.VALUE, classify.DEFAULT_CHECKED, classify.ON_CHANGE, classify.FONT_SIZE,
+    classify.COLOR, classify.STYLE_OPEN)
+
+# Clearly orphaned JSX - continues a run after export default. Each line
+# has one kind, so the next export/function/import is never in these sets.
+JSX_KINDS = classify.kind_set(
+    classify.JSX_TAG, classify.VALUE, classify.DEFAULT_CHECKED, classify.FONT_SIZE,
+    classify.COLOR, classify.STYLE_OPEN, classify.STYLE)
+
+# Clearly orphaned attribute - continues a run after a closing brace
+ATTRIBUTE_KINDS = classify.kind_set(
+    classify.VALUE, classify.DEFAULT_CHECKED, classify.FONT_SIZE, classify.COLOR,
+    classify.STYLE_OPEN)
+
+RULES = rules.Pack('safe_fast', [
+    rules.Dedupe('duplicate_export', classify.EXPORT_DEFAULT, rules.normalized, blanks=True,
+                 message="    Removing duplicate export at line {line}"),
+    rules.StripNext('orphaned_after_export', classify.EXPORT_DEFAULT, AFTER_EXPORT_KINDS,
+                    run=JSX_KINDS, message="    Removing orphaned code after export at line {line}"),
+    rules.StripRun('orphaned_after_function', classify.CLOSE_BRACE, ATTRIBUTE_KINDS,
+                   message="    Removing orphaned code after function end at line {line}"),
+])
+
+PREFILTER = prefilter.for_pack(RULES)
+
+def fix_lines_safe(lines):
+    """Return lines with clear duplicate/orphaned code patterns removed"""
+    return RULES.fix_lines(lines)
+
+def stream_lines_safe(lines):
+    """Yield the lines fix_lines_safe would return, reading ahead only over blanks"""
+    return RULES.stream_lines(lines)
+
 def fix_file_safe(file_path):
     """Safely fix clear duplicate/orphaned code patterns"""
     try:
@@ -17,125 +52,9 @@ def fix_file_safe(file_path):
         return False
     
     original = content
-    lines = content.split('\n')
-    new_lines = []
-    
-    i = 0
-    seen_exports = {}
-    
-    while i < len(lines):
-        line = lines[i]
-        stripped = line.strip()
-        
-        # Pattern 1: Duplicate export default (exact match)
-        if stripped.startswith('export default'):
-            # Create a normalized key (remove extra spaces)
-            normalized = re.sub(r'\s+', ' ', stripped)
-            
-            if normalized in seen_exports:
-                # This is a duplicate - skip it
-                print(f"    Removing duplicate export at line {i+1}")
-                i += 1
-                # Skip empty lines after duplicate
-                while i < len(lines) and not lines[i].strip():
-                    i += 1
-                continue
-            else:
-                seen_exports[normalized] = i
-        
-        # Pattern 2: Orphaned JSX after export default (very specific pattern)
-        if i > 0 and lines[i-1].strip().startswith('export default'):
-            # Check if current line is orphaned JSX attribute
-            if (stripped.startswith('value=') or 
-                stripped.startswith('defaultChecked=') or
-                stripped.startswith('onChange=') or
-                stripped.startswith('fontSize:') or
-                stripped.startswith('color:') or
-                (stripped.startswith('style={{') and '}}' not in stripped)):
-                # This is orphaned - skip until next valid line
-                print(f"    Removing orphaned code after export at line {i+1}")
-                while i < len(lines):
-                    next_stripped = lines[i].strip()
-                    if not next_stripped:
-                        i += 1
-                        continue
-                    # Stop at next export/function/import
-                    if (next_stripped.startswith('export ') or 
-                        next_stripped.startswith('function ') or 
-                        next_stripped.startswith('import ') or
-                        next_stripped.startswith('type ') or
-                        next_stripped.startswith('const ') and '=' in next_stripped):
-                        break
-                    # Stop if it's not clearly orphaned JSX
-                    if not (next_stripped.startswith('<') or 
-                           next_stripped.startswith('value=') or 
-                           next_stripped.startswith('defaultChecked=') or
-                           next_stripped.startswith('fontSize:') or
-                           next_stripped.startswith('color:') or
-                           next_stripped.startswith('style={{')):
-                        break
-                    i += 1
-                continue
-        
-        # Pattern 3: Orphaned code after function closing brace
-        if stripped == '}' and i > 0:
-            # Look ahead for orphaned JSX
-            j = i + 1
-            found_orphaned = False
-            
-            while j < len(lines):
-                next_stripped = lines[j].strip()
-                if not next_stripped:
-                    j += 1
-                    continue
-                # Check if it's a new declaration
-                if (next_stripped.startswith('export ') or 
-                    next_stripped.startswith('function ') or 
-                    next_stripped.startswith('import ') or
-                    next_stripped.startswith('type ') or
-                    (next_stripped.startswith('const ') and '=' in next_stripped)):
-                    break
-                # Check if clearly orphaned
-                if (next_stripped.startswith('value=') or 
-                    next_stripped.startswith('defaultChecked=') or
-                    next_stripped.startswith('fontSize:') or
-                    next_stripped.startswith('color:') or
-                    (next_stripped.startswith('style={{') and '}}' not in next_stripped)):
-                    if not found_orphaned:
-                        print(f"    Removing orphaned code after function end at line {j+1}")
-                        found_orphaned = True
-                    j += 1
-                else:
-                    break
-            
-            if found_orphaned:
-                new_lines.append(line)
-                i = j
-                continue
-        
-        new_lines.append(line)
-        i += 1
-    
-    new_content = '\n'.join(new_lines)
-    
-    # Additional safe cleanup: remove exact duplicate export lines
-    # Only if they appear on consecutive lines
-    lines_final = new_content.split('\n')
-    final_lines = []
-    prev_line = None
-    
-    for line in lines_final:
-        stripped = line.strip()
-        if stripped.startswith('export default'):
-            if prev_line and prev_line.strip() == stripped:
-                # Skip exact duplicate on consecutive lines
-                continue
-        final_lines.append(line)
-        prev_line = line
-    
-    new_content = '\n'.join(final_lines)
+    new_content = '\n'.join(fix_lines_safe(content.split('\n')))
     
-    if new_content != original:
+    if new_content != original and validate.accepts(file_path, original, new_content):
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(new_content)
@@ -146,7 +65,8 @@ def fix_file_safe(file_path):
     
     return False
 
-def main():
+def main(argv=None):
+    args = runner.parse_args(__doc__.strip(), argv)
     project_root = Path(__file__).parent
     src_dir = project_root / 'src'
     
@@ -160,12 +80,14 @@ def main():
     print("Safe fast fixing all files...")
     print("=" * 50)
     
-    for ext in ['*.ts', '*.tsx']:
-        for file_path in src_dir.rglob(ext):
-            total_files += 1
-            if fix_file_safe(file_path):
-                fixed_count += 1
-                print(f"✓ Fixed: {file_path.relative_to(project_root)}")
+    for file_path, changed in runner.run(fix_file_safe, src_dir, args,
+                                         fix_lines=fix_lines_safe,
+                                         stream_lines=stream_lines_safe,
+                                         prefilter=PREFILTER):
+        total_files += 1
+        if changed:
+            fixed_count += 1
+            print(f"✓ Fixed: {file_path.relative_to(project_root)}")
     
     print("=" * 50)
     print(f"\nFixed {fixed_count} out of {total_files} files")
@@ -4,9 +4,36 @@
 Simple and safe - only removes duplicates and orphaned code, never adds
 """
 
-import re
 from pathlib import Path
 
+from fixers import classify, prefilter, rules, runner, validate
+
+# Orphaned JSX attribute directly after export default
+AFTER_EXPORT_KINDS = classify.kind_set(
+    classify.VALUE, classify.DEFAULT_CHECKED, classify.FONT_SIZE, classify.COLOR,
+    classify.STYLE_OPEN)
+
+# Orphaned attributes after a closing brace. Each line has one kind, so a
+# new export/function/import is never in this set.
+ATTRIBUTE_KINDS = classify.kind_set(
+    classify.VALUE, classify.DEFAULT_CHECKED, classify.FONT_SIZE, classify.COLOR)
+
+RULES = rules.Pack('simple_safe', [
+    rules.Dedupe('duplicate_export', classify.EXPORT_DEFAULT, rules.normalized),
+    rules.StripNext('orphaned_after_export', classify.EXPORT_DEFAULT, AFTER_EXPORT_KINDS),
+    rules.StripRun('orphaned_after_function', classify.CLOSE_BRACE, ATTRIBUTE_KINDS),
+])
+
+PREFILTER = prefilter.for_pack(RULES)
+
+def fix_lines_simple(lines):
+    """Return lines with duplicates and orphaned code removed - never adds anything"""
+    return RULES.fix_lines(lines)
+
+def stream_lines_simple(lines):
+    """Yield the lines fix_lines_simple would return, reading ahead only over blanks"""
+    return RULES.stream_lines(lines)
+
 def fix_file_simple(file_path):
     """Simply remove duplicates and orphaned code - never add anything"""
     try:
@@ -16,68 +43,9 @@ def fix_file_simple(file_path):
         return False
     
     original = content
-    lines = content.split('\n')
-    new_lines = []
-    
-    i = 0
-    seen_exports = set()
-    
-    while i < len(lines):
-        line = lines[i]
-        stripped = line.strip()
-        
-        # Remove duplicate export default (exact match on consecutive lines)
-        if stripped.startswith('export default'):
-            normalized = re.sub(r'\s+', ' ', stripped)
-            if normalized in seen_exports:
-                # Skip duplicate
-                i += 1
-                continue
-            seen_exports.add(normalized)
-        
-        # Remove orphaned JSX after export default
-        if i > 0 and lines[i-1].strip().startswith('export default'):
-            if (stripped.startswith('value=') or 
-                stripped.startswith('defaultChecked=') or
-                stripped.startswith('fontSize:') or
-                stripped.startswith('color:') or
-                (stripped.startswith('style={{') and '}}' not in stripped)):
-                # Skip orphaned
-                i += 1
-                continue
-        
-        # Remove orphaned code after function closing brace
-        if stripped == '}' and i > 0:
-            j = i + 1
-            orphaned = False
-            while j < len(lines):
-                next_stripped = lines[j].strip()
-                if not next_stripped:
-                    j += 1
-                    continue
-                if (next_stripped.startswith('export ') or 
-                    next_stripped.startswith('function ') or 
-                    next_stripped.startswith('import ')):
-                    break
-                if (next_stripped.startswith('value=') or 
-                    next_stripped.startswith('defaultChecked=') or
-                    next_stripped.startswith('fontSize:') or
-                    next_stripped.startswith('color:')):
-                    orphaned = True
-                    j += 1
-                else:
-                    break
-            if orphaned:
-                new_lines.append(line)
-                i = j
-                continue
-        
-        new_lines.append(line)
-        i += 1
-    
-    new_content = '\n'.join(new_lines)
+    new_content = '\n'.join(fix_lines_simple(content.split('\n')))
     
-    if new_content != original:
+    if new_content != original and validate.accepts(file_path, original, new_content):
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(new_content)
@@ -87,19 +55,22 @@ def fix_file_simple(file_path):
     
     return False
 
-def main():
+def main(argv=None):
+    args = runner.parse_args(__doc__.strip(), argv)
     src_dir = Path('src')
     fixed = 0
     total = 0
     
     print("Simple safe fixing (removes only, never adds)...")
     
-    for ext in ['*.ts', '*.tsx']:
-        for file_path in src_dir.rglob(ext):
-            total += 1
-            if fix_file_simple(file_path):
-                fixed += 1
-                print(f"✓ {file_path}")
+    for file_path, changed in runner.run(fix_file_simple, src_dir, args,
+                                         fix_lines=fix_lines_simple,
+                                         stream_lines=stream_lines_simple,
+                                         prefilter=PREFILTER):
+        total += 1
+        if changed:
+            fixed += 1
+            print(f"✓ {file_path}")
     
     print(f"\nFixed {fixed}/{total} files")
 
@@ -0,0 +1,137 @@
+"""
+Persistent record of files already known to be clean for a fixer
+
+The manifest (.fixer-cache next to src) stores, per fixer, the mtime, size
+and content hash of every file the fixer left unchanged. A file whose
+mtime and size still match is skipped without being opened; if only the
+mtime moved, the content hash decides. Each fixer section also stores a
+version hash of the Python sources that make up its rules, so editing a
+rule throws away that fixer's entries.
+"""
+
+import hashlib
+import json
+import os
+import sys
+from functools import partial
+from pathlib import Path
+
+CACHE_NAME = '.fixer-cache'
+FORMAT_VERSION = 1
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+def file_digest(file_path):
+    """Return the sha1 hex digest of a file's bytes"""
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def fixer_name(fix_func):
+    """Name a fix function by script and function, e.g. fix_all_fast.fix_file_fast"""
+    extra = ''
+    if isinstance(fix_func, partial):
+        extra = repr(sorted(fix_func.keywords.items())) if fix_func.keywords else ''
+        extra += repr(fix_func.args) if fix_func.args else ''
+        fix_func = fix_func.func
+    module = sys.modules[fix_func.__module__]
+    script = Path(getattr(module, '__file__', fix_func.__module__)).stem
+    return f"{script}.{fix_func.__name__}{extra}"
+
+def rules_version():
+    """Hash the project Python sources that are currently loaded
+
+    Every rule lives in a fix_*.py script or the fixers package, so any edit
+    to a loaded module gives a new version.
+    """
+    sources = set()
+    for module in list(sys.modules.values()):
+        module_file = getattr(module, '__file__', None)
+        if not module_file or not module_file.endswith('.py'):
+            continue
+        path = Path(module_file).resolve()
+        if PROJECT_ROOT in path.parents:
+            sources.add(path)
+
+    digest = hashlib.sha1()
+    for path in sorted(sources):
+        digest.update(str(path.relative_to(PROJECT_ROOT)).encode('utf-8'))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+class FixerCache:
+    """Clean-file manifest for one fixer"""
+
+    def __init__(self, path, fixer, version):
+        self.path = Path(path)
+        self.fixer = fixer
+        self.hits = 0
+        self.misses = 0
+        self._base = self.path.resolve().parent
+        self._data = self._load()
+
+        section = self._data['fixers'].get(fixer)
+        if not section or section.get('rules') != version:
+            section = {'rules': version, 'files': {}}
+            self._data['fixers'][fixer] = section
+        self._files = section['files']
+
+    @classmethod
+    def for_fixer(cls, path, fix_func, validate=True):
+        """The cache of fix_func, apart for runs with and without validation"""
+        fixer = fixer_name(fix_func)
+        if not validate:
+            fixer += ' --no-validate'
+        return cls(path, fixer, rules_version())
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if not isinstance(data, dict) or data.get('format') != FORMAT_VERSION:
+            data = {'format': FORMAT_VERSION, 'fixers': {}}
+        return data
+
+    def _key(self, file_path):
+        return os.path.relpath(os.path.abspath(file_path), self._base)
+
+    def is_clean(self, file_path, st=None):
+        """True if file_path is unchanged since the fixer last left it alone
+
+        st is the file's stat result if the caller already has it.
+        """
+        entry = self._files.get(self._key(file_path))
+        if entry is not None:
+            try:
+                if st is None:
+                    st = os.stat(file_path)
+                if st.st_mtime_ns == entry[0] and st.st_size == entry[1]:
+                    self.hits += 1
+                    return True
+                if st.st_size == entry[1] and file_digest(file_path) == entry[2]:
+                    entry[0] = st.st_mtime_ns
+                    self.hits += 1
+                    return True
+            except OSError:
+                pass
+        self.misses += 1
+        return False
+
+    def mark_clean(self, file_path):
+        """Record that the fixer made no change to file_path"""
+        try:
+            st = os.stat(file_path)
+            self._files[self._key(file_path)] = [st.st_mtime_ns, st.st_size, file_digest(file_path)]
+        except OSError:
+            self.forget(file_path)
+
+    def forget(self, file_path):
+        self._files.pop(self._key(file_path), None)
+
+    def save(self):
+        """Write the manifest atomically"""
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
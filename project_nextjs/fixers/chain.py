@@ -0,0 +1,122 @@
+"""
+The per-file function of a run: the fix function wrapped in its stages
+
+runner.run builds one Chain for a run from the stages its options ask for
+(shard.Timing, profile.Profiling, prefilter.Screening, journal.Journaling,
+validate.Validating, memo.Recalling, outermost first) and hands it to the
+serial loop, the process pool, --watch or --pipeline alike. Each call
+fills in one Result; the runner passes it to the collectors of the same
+options (the report, the profiler and the stats) and yields the plain
+fixed value.
+
+While a call runs, current() is its Result, so code deep inside the fix
+function (profile.timer(), journal.steps(), validate.accepts()) finds
+what its stage asked for without being handed it.
+"""
+
+from functools import partial
+
+# Result of the file being fixed in this process, or None
+_current = None
+
+def current():
+    """The Result of the file being fixed, or None outside a Chain"""
+    return _current
+
+def changing():
+    """Note that the fix is about to write the file being fixed
+
+    Write sites that do not go through validate.accepts() call it before
+    writing, so a file whose write then fails is not taken for one with
+    nothing to fix.
+    """
+    if _current is not None:
+        _current.changed = True
+
+class Result:
+    """What a run learned about one file
+
+    fixed is what the fix function returned; the stages fill in the rest,
+    and the fields of a stage that did not run keep their defaults. True
+    if the file was fixed, like the plain result.
+    """
+
+    def __init__(self, fixed=False):
+        self.fixed = fixed
+        # The fix had a new text for the file, whether or not it was
+        # written (validate.accepts() and changing() set it)
+        self.changed = False
+        # shard.Timing: time of the whole call and what it printed
+        self.seconds = 0.0
+        self.output = ''
+        # profile.Profiling: rule stats, and the time of the fix
+        self.rules = None
+        self.profile_seconds = 0.0
+        # prefilter.Screening: bytes screened (None if not), whether the
+        # fix was skipped, and the time of the screen and of the fix
+        self.size = None
+        self.skipped = False
+        self.screen_seconds = 0.0
+        self.fix_seconds = 0.0
+        # journal.Journaling: rule set steps while the fix runs, the texts
+        # before and after a write validate.accepts() let through, the
+        # file's journal entry if it was written, and the time spent
+        self.steps = None
+        self.images = None
+        self.entry = None
+        self.journal_seconds = 0.0
+        # validate.Validating: time and bytes of the check (None if not
+        # checking), and why the fixed text was refused
+        self.validate_seconds = None
+        self.validated_bytes = 0
+        self.rejected = None
+        # memo.Recalling: where the memo found the result, or None
+        self.source = None
+
+    def __bool__(self):
+        return bool(self.fixed)
+
+class Stage:
+    """One concern wrapped around the fix function
+
+    around() gets the file's Result, its path, its text in a --pipeline
+    chain (else None) and proceed, which runs the rest of the chain and
+    returns the new text to write (None if there is none). A stage that
+    rules the file out returns None without calling proceed.
+    """
+
+    def around(self, result, file_path, content, proceed):
+        return proceed()
+
+class Chain:
+    """A fix function and its stages, called like the fix function
+
+    Called as chain(file_path) for a per-file fix function, which returns
+    the Result, or as chain(file_path, content) for a pipeline one
+    (fixers.pipeline), which returns (Result, new content or None).
+    """
+
+    def __init__(self, fix, stages=()):
+        self.fix = fix
+        self.stages = list(stages)
+
+    def __call__(self, file_path, *content):
+        global _current
+        result = _current = Result()
+        try:
+            new_content = self._run(0, result, file_path, content)
+        finally:
+            _current = None
+        if content:
+            return result, new_content
+        return result
+
+    def _run(self, k, result, file_path, content):
+        if k < len(self.stages):
+            return self.stages[k].around(result, file_path, content[0] if content else None,
+                                         partial(self._run, k + 1, result, file_path, content))
+        if content:
+            result.fixed, new_content = self.fix(file_path, *content)
+            return new_content
+        result.fixed = self.fix(file_path)
+        return None
@@ -0,0 +1,174 @@
+"""
+Shared line classifier for the fixer rules
+
+Every line is labelled with a small int kind code by one walk down a
+trie of all the registered line prefixes, so rules test kinds against
+lookup tables instead of repeating their own startswith chains, and a
+new prefix (register_kind) adds no work per line. Kinds are memoised per
+raw line text: source files repeat the same lines (closing braces, closing tags,
+style props) over and over, and the engine passes the same line objects
+through every rule set, so most lookups are a single dict hit.
+"""
+
+import re
+
+# Registered kinds: code -> name, and the trie the prefixes compile into
+KIND_NAMES = []
+_entries = []
+_trie = None
+
+def _add_kind(name, prefix, condition):
+    global _trie
+    if len(KIND_NAMES) >= 256:
+        raise ValueError(f"Too many line kinds to add {name}")
+    code = len(KIND_NAMES)
+    KIND_NAMES.append(name)
+    if prefix is not None:
+        if condition is not None:
+            condition = re.compile(condition, re.DOTALL)
+        _entries.append((prefix, code, condition))
+    _trie = None
+    _kinds.clear()
+    return code
+
+def register_kind(name, prefix, condition=None):
+    """Add a line kind and return its code
+
+    A stripped line has the kind of the longest registered prefix it starts
+    with whose condition (a regular expression matched right after the
+    prefix, if given) holds; kinds sharing a prefix are tried in the order
+    they were added. Lines no kind matches are OTHER.
+    """
+    return _add_kind(name, prefix, condition)
+
+def _build_trie():
+    """Compile the prefixes into one trie of {char: node} dicts
+
+    Classification is anchored at the start of the line, so the
+    Aho-Corasick automaton reduces to its goto trie: one dict lookup per
+    character of the longest matching prefix, however many kinds there
+    are. Kinds ending at a node are kept under the '' key.
+    """
+    global _trie
+    root = {}
+    for prefix, code, condition in _entries:
+        node = root
+        for ch in prefix:
+            node = node.setdefault(ch, {})
+        node.setdefault('', []).append((code, condition))
+    _trie = root
+    return root
+
+class _KindCache(dict):
+    def __missing__(self, line):
+        if len(self) >= _CACHE_LIMIT:
+            self.clear()
+        kind = self[line] = classify(line.strip())
+        return kind
+
+# Memo of raw line -> kind; cleared when it grows past this many entries
+# and whenever a kind is added
+_CACHE_LIMIT = 1 << 16
+_kinds = _KindCache()
+
+# Built-in kind codes; a longer prefix wins over its own prefixes
+BLANK = _add_kind('blank', '', r'\Z')
+EXPORT_DEFAULT = _add_kind('export_default', 'export default', None)
+EXPORT = _add_kind('export', 'export ', None)
+FUNCTION = _add_kind('function', 'function ', None)
+CONST_ARROW = _add_kind('const_arrow', 'const ', r'.*=>')          # const ... = ... => ...
+CONST_ASSIGN = _add_kind('const_assign', 'const ', r'.*=')         # const ... = ...
+CONST = _add_kind('const', 'const ', None)                         # const ... (no '=')
+IMPORT = _add_kind('import', 'import ', None)
+TYPE = _add_kind('type', 'type ', None)
+INTERFACE = _add_kind('interface', 'interface ', None)
+JSX_TAG = _add_kind('jsx_tag', '<', None)
+VALUE = _add_kind('value', 'value=', None)
+DEFAULT_CHECKED = _add_kind('default_checked', 'defaultChecked=', None)
+ON_CHANGE = _add_kind('on_change', 'onChange=', None)
+STYLE_OPEN = _add_kind('style_open', 'style={{', r'(?!.*\}\})')   # without a closing }}
+STYLE = _add_kind('style', 'style={{', None)                       # style={{ ... }}
+FONT_SIZE = _add_kind('font_size', 'fontSize:', None)
+COLOR = _add_kind('color', 'color:', None)
+JSX_COMMENT = _add_kind('jsx_comment', '{/*', None)
+BRACE = _add_kind('brace', '{', None)                              # any other line starting with {
+CLOSE_BRACE = _add_kind('close_brace', '}', r'\Z')                 # a line that is just }
+OTHER = _add_kind('other', None, None)
+
+def classify(stripped):
+    """Return the kind code of one stripped line"""
+    node = _trie or _build_trie()
+    matched = []
+    kinds = node.get('')
+    if kinds:
+        matched.append((0, kinds))
+    pos = 0
+    for ch in stripped:
+        node = node.get(ch)
+        if node is None:
+            break
+        pos += 1
+        kinds = node.get('')
+        if kinds:
+            matched.append((pos, kinds))
+    while matched:
+        pos, kinds = matched.pop()
+        for code, condition in kinds:
+            if condition is None or condition.match(stripped, pos):
+                return code
+    return OTHER
+
+def classify_line(line):
+    """Return the kind code of one raw (unstripped) line"""
+    return _kinds[line]
+
+def classify_lines(lines):
+    """Return the kind codes of raw (unstripped) lines as a bytearray"""
+    return bytearray(map(_kinds.__getitem__, lines))
+
+def kind_set(*kinds):
+    """Lookup table for a set of kinds: table[kind] is 1 for members, else 0
+
+    The table is 256 bytes long so it also works with bytes.translate.
+    """
+    table = bytearray(256)
+    for kind in kinds:
+        table[kind] = 1
+    return bytes(table)
+
+def kind_prefixes(table):
+    """Prefixes every stripped line of a kind in table starts with
+
+    None if a kind in table can match a line without a non-empty prefix
+    (BLANK, OTHER), so nothing about such lines is known in advance.
+    """
+    prefixes = {}
+    for code in range(len(KIND_NAMES)):
+        if table[code]:
+            prefixes[code] = None
+    for prefix, code, _ in _entries:
+        if code in prefixes:
+            prefixes[code] = prefix
+    if not all(prefixes.values()):
+        return None
+    return tuple(sorted(set(prefixes.values())))
+
+def kind_lines(table):
+    """The stripped lines of the kinds in table, if each kind is one exact line
+
+    CLOSE_BRACE is the line '}' and nothing else; None if a kind in table
+    also matches longer lines.
+    """
+    lines = set()
+    for prefix, code, condition in _entries:
+        if table[code]:
+            if condition is None or condition.pattern != r'\Z':
+                return None
+            lines.add(prefix)
+    return tuple(sorted(lines))
+
+# Commonly used groups of kinds
+EXPORT_KINDS = (EXPORT_DEFAULT, EXPORT)
+CONST_WITH_ASSIGNMENT = (CONST_ARROW, CONST_ASSIGN)
+STYLE_KINDS = (STYLE_OPEN, STYLE)
+NON_BLANK = kind_set(*range(1, 256))
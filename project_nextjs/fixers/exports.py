@@ -0,0 +1,241 @@
+"""
+Tree-wide index of default exports, kept up to date incrementally
+
+fix_duplicate_declarations removes a repeated export default within one
+file, but the same component default-exported from several route files
+(a common leftover of bad merges) is only visible across the tree. The
+index maps each normalized export key (the fixer's declaration_key) to the
+files and lines that export it, and each component name to its keys, so
+"who else exports X" is a dict lookup.
+
+The index (.fixer-exports next to src) is built in one walk and saved
+with the mtime and size of every file. refresh() walks the tree again but
+only rereads files whose mtime or size moved, and drops deleted ones;
+update() and remove() change single files. Once an index exists, every
+fixer run that writes files loads it (for_run()) and rescans the files
+it wrote as they are written, so the next query finds them current and
+rereads nothing. The index names its key function for that. Like the
+fixer cache, the index is thrown away when the sources of the key
+function or the classifier change.
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+from fixers import classify, runner
+from fixers.cache import fixer_name
+
+INDEX_NAME = '.fixer-exports'
+FORMAT_VERSION = 2
+
+# Component name in a declaration key
+_NAME = re.compile(r'export default (?:async\s+)?(?:function\s+|class\s+|\w+\()?(\w+)')
+
+def export_name(key):
+    """Component name a key exports, e.g. 'Page' for 'export default withAuth(Page', or None"""
+    match = _NAME.match(key)
+    return match.group(1) if match else None
+
+def key_version(key):
+    """Hash of the sources of the key function's module and this one"""
+    digest = hashlib.sha1()
+    module = sys.modules.get(getattr(key, '__module__', None))
+    for source in (getattr(module, '__file__', None), __file__, classify.__file__):
+        if source:
+            with open(source, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+def scan_exports(lines, key):
+    """[key, line number] of each export default line"""
+    classify_line = classify.classify_line
+    return [[key(line.strip()), number]
+            for number, line in enumerate(lines, 1)
+            if classify_line(line) == classify.EXPORT_DEFAULT]
+
+class ExportIndex:
+    """Normalized export key -> files, for every source file under src_dir"""
+
+    def __init__(self, path, src_dir, key, version=None, data=None):
+        self.path = Path(path)
+        self.src_dir = Path(src_dir)
+        self._prefix = os.path.join(os.fspath(src_dir), '')
+        self.key = key
+        self.version = key_version(key) if version is None else version
+        self.scanned = 0
+        self.dirty = False
+        # Relative path -> [mtime_ns, size, [[key, line], ...]]
+        # data is the saved index, if the caller has read it already
+        self._files = self._load(data)
+        self._by_key = {}
+        self._by_name = {}
+        for rel, record in self._files.items():
+            self._link(rel, record[2])
+
+    def _load(self, data):
+        if data is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = None
+        if not isinstance(data, dict) or data.get('format') != FORMAT_VERSION \
+                or data.get('rules') != self.version:
+            return {}
+        return data['files']
+
+    def add(self, file_path, result):
+        """Rescan a file a fix wrote, given its fixers.chain.Result"""
+        if result.fixed:
+            self.update(file_path)
+
+    def _link(self, rel, exports):
+        for key, line in exports:
+            self._by_key.setdefault(key, {}).setdefault(rel, []).append(line)
+            name = export_name(key)
+            if name:
+                self._by_name.setdefault(name, set()).add(key)
+
+    def _unlink(self, rel):
+        record = self._files.pop(rel, None)
+        if record is None:
+            return
+        self.dirty = True
+        for key, _ in record[2]:
+            files = self._by_key.get(key)
+            if files is None or files.pop(rel, None) is None or files:
+                continue
+            del self._by_key[key]
+            name = export_name(key)
+            keys = self._by_name.get(name)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_name[name]
+
+    def _rel(self, file_path):
+        file_path = os.fspath(file_path)
+        if file_path.startswith(self._prefix):
+            rel = file_path[len(self._prefix):]
+        else:
+            rel = os.path.relpath(file_path, self.src_dir)
+        return rel.replace(os.sep, '/')
+
+    def update(self, file_path, st=None, lines=None):
+        """Rescan one file; lines are its contents if the caller has them"""
+        rel = self._rel(file_path)
+        try:
+            if st is None:
+                st = os.stat(file_path)
+            if lines is None:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    lines = f.read().split('\n')
+        except (OSError, UnicodeDecodeError):
+            self.remove(file_path)
+            return
+        self._unlink(rel)
+        exports = scan_exports(lines, self.key)
+        self._files[rel] = [st.st_mtime_ns, st.st_size, exports]
+        self._link(rel, exports)
+        self.scanned += 1
+        self.dirty = True
+
+    def remove(self, file_path):
+        """Drop a file from the index"""
+        self._unlink(self._rel(file_path))
+
+    def refresh(self, exclude=(), gitignore=True):
+        """Bring the index up to date with the tree; return the number of files reread"""
+        scanned = self.scanned
+        present = set()
+        for file_path, entry in runner.source_entries(self.src_dir, exclude, gitignore):
+            rel = self._rel(entry.path)
+            present.add(rel)
+            record = self._files.get(rel)
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if record is None or record[0] != st.st_mtime_ns or record[1] != st.st_size:
+                self.update(file_path, st)
+        for rel in [rel for rel in self._files if rel not in present]:
+            self._unlink(rel)
+        return self.scanned - scanned
+
+    def exporters(self, query):
+        """{file: [lines]} exporting a key, or any key of a component name"""
+        files = dict(self._by_key.get(query, {}))
+        if not files:
+            for key in self._by_name.get(query, ()):
+                for rel, lines in self._by_key[key].items():
+                    files.setdefault(rel, []).extend(lines)
+        return {rel: sorted(lines) for rel, lines in sorted(files.items())}
+
+    def duplicates(self):
+        """{key: {file: [lines]}} for the keys exported from more than one file"""
+        return {key: dict(sorted(files.items()))
+                for key, files in sorted(self._by_key.items()) if len(files) > 1}
+
+    def __len__(self):
+        return len(self._files)
+
+    def save(self):
+        """Write the index atomically"""
+        data = {'format': FORMAT_VERSION, 'rules': self.version, 'key': fixer_name(self.key),
+                'files': self._files}
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+def open_index(src_dir, key, exclude=(), gitignore=True):
+    """Load the index next to src_dir, refresh it, save it and report the time"""
+    start = time.perf_counter()
+    index = ExportIndex(Path(src_dir).parent / INDEX_NAME, src_dir, key)
+    scanned = index.refresh(exclude, gitignore)
+    if index.dirty:
+        index.save()
+    print(f"Export index: {len(index)} files, {scanned} rescanned in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+    return index
+
+def _key_function(name):
+    """The function fixer_name() gave name to, e.g. fix_duplicate_declarations.declaration_key"""
+    script, _, function = name.partition('.')
+    main = sys.modules.get('__main__')
+    if Path(getattr(main, '__file__', '')).stem == script:
+        module = main
+    else:
+        try:
+            module = importlib.import_module(script)
+        except ImportError:
+            return None
+    return getattr(module, function, None)
+
+def for_run(src_dir):
+    """The index next to src_dir, for a fixer run to keep up to date, or None
+
+    None if there is no index yet (no query was made) or it would be
+    rebuilt anyway.
+    """
+    path = Path(src_dir).parent / INDEX_NAME
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('format') != FORMAT_VERSION \
+            or not isinstance(data.get('key'), str):
+        return None
+    key = _key_function(data['key'])
+    if key is None:
+        return None
+    index = ExportIndex(path, src_dir, key, data=data)
+    return index if len(index) else None
@@ -0,0 +1,426 @@
+"""
+Undo journal of the files a run wrote, and --revert
+
+An aggressive run that removes too much used to leave a full git checkout
+as the only way back, losing unrelated local edits. Each run that writes
+files now leaves a journal in .fixer-journal next to src: per file, the
+sha1 of its text before and after and, per rule set, the edits as
+[start, deleted lines, inserted lines] hunks against the text that rule
+set saw. Only changed lines are kept, not copies of the files. The texts
+are the ones the write site had in hand (validate.accepts() passes them
+on), read and written the way the fixers do it, as UTF-8 with '\n' line
+breaks; a file that had '\r\n' ones, which the fix wrote back with '\n',
+is reverted with '\n' too.
+
+fix_engine.py runs several rule sets over one line buffer and records
+each of them through steps(); a single fix script, or a file the memo
+answered, has one step named after the script (all_fast, ...) or
+'engine'.
+
+--revert undoes the script's last journaled run, or the journal given,
+touching only the files in it. A file is only reverted if its text still
+hashes to what the run wrote, and the text rebuilt from the hunks must
+hash to what it was before. --revert-file and --revert-rule pick files
+and rule sets; the steps that stay are moved onto the reverted text, each
+kept hunk deleting the same lines wherever they now are (lines only a
+reverted rule set wrote are gone already) and inserting its lines in
+their place. What was reverted is dropped from the journal, and an empty
+journal is deleted, so --revert again goes on to the run before.
+"""
+
+import difflib
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from fixers import chain
+
+JOURNAL_NAME = '.fixer-journal'
+FORMAT_VERSION = 1
+
+# Journals kept; a run that writes one deletes the oldest beyond this
+KEEP_RUNS = 20
+
+# Lines hunks() looks ahead for where the texts meet again: after a
+# replacement, and after a deletion or insertion
+_WINDOW = 32
+_REACH = 4096
+
+def steps():
+    """List for (rule set, lines before, lines after) if a file is being journaled
+
+    Returns None otherwise, so callers pay one test per file.
+    """
+    result = chain.current()
+    return None if result is None else result.steps
+
+def rule_name(name):
+    """Rule set name of a script or rule name: fix_all_fast.py -> all_fast"""
+    name = name[:-3] if name.endswith('.py') else name
+    return name[4:] if name.startswith('fix_') else name
+
+def _digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def _resync(before, after, i, j):
+    """(skipped in before, skipped in after) to the nearest equal pair past i, j, or None"""
+    best = None
+    # A deletion or an insertion, searched for in C
+    try:
+        best = before.index(after[j], i + 1, i + _REACH) - i, 0
+    except ValueError:
+        pass
+    try:
+        skipped = after.index(before[i], j + 1, j + _REACH) - j
+    except ValueError:
+        pass
+    else:
+        if best is None or skipped < best[0]:
+            best = 0, skipped
+    # A replacement: where in after's window each line of before's first is
+    first = {}
+    for dj, line in enumerate(after[j + 1:j + 1 + _WINDOW], 1):
+        first.setdefault(line, dj)
+    for di, line in enumerate(before[i + 1:i + 1 + _WINDOW], 1):
+        if best is not None and di + 1 >= sum(best):
+            break
+        dj = first.get(line)
+        if dj is not None and (best is None or di + dj < sum(best)):
+            best = di, dj
+    return best
+
+def hunks(before, after):
+    """[start, deleted lines, inserted lines] edits that turn before into after
+
+    start indexes before; the hunks are in order and do not overlap. The
+    rules delete, insert or replace a few lines at a time, so the texts
+    are walked together and, where they part, the nearest pair of equal
+    lines picks them up again; difflib only gets what is left past a
+    change longer than _resync() can see across.
+    """
+    n, m = len(before), len(after)
+    edits = []
+    i = j = 0
+    while True:
+        # Equal lines a slice at a time, compared in C
+        step = _WINDOW
+        while step:
+            if i + step <= n and j + step <= m and before[i:i + step] == after[j:j + step]:
+                i += step
+                j += step
+            else:
+                step >>= 1
+        if i == n or j == m:
+            if i < n or j < m:
+                edits.append([i, before[i:], after[j:]])
+            return edits
+        resync = _resync(before, after, i, j)
+        if resync is None:
+            break
+        di, dj = resync
+        edits.append([i, before[i:i + di], after[j:j + dj]])
+        i += di
+        j += dj
+
+    hi = 0
+    while hi < n - i and hi < m - j and before[n - 1 - hi] == after[m - 1 - hi]:
+        hi += 1
+    if n - hi - i <= _WINDOW + 1 and m - hi - j <= _WINDOW + 1:
+        # _resync() compared every line of these with every other
+        return edits + [[i, before[i:n - hi], after[j:m - hi]]]
+    matcher = difflib.SequenceMatcher(None, before[i:n - hi], after[j:m - hi])
+    return edits + [[i + i1, before[i + i1:i + i2], after[j + j1:j + j2]]
+                    for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+class Conflict(Exception):
+    """Hunks that do not fit the text they are applied to"""
+
+def apply(lines, edits):
+    """Return lines with the hunks applied, checking the lines they delete"""
+    out = []
+    pos = 0
+    for start, deleted, inserted in edits:
+        if start < pos or lines[start:start + len(deleted)] != deleted:
+            raise Conflict(f"line {start + 1} is not what the journal recorded")
+        out += lines[pos:start]
+        out += inserted
+        pos = start + len(deleted)
+    out += lines[pos:]
+    return out
+
+def inverse(edits):
+    """Hunks that undo edits, positioned against the text edits produce"""
+    undo = []
+    shift = 0
+    for start, deleted, inserted in edits:
+        undo.append([start + shift, inserted, deleted])
+        shift += len(inserted) - len(deleted)
+    return undo
+
+def replay(original, recorded, keep):
+    """Rebuild a file from its original lines with only the kept steps
+
+    recorded is the run's [rule, hunks] steps and keep says which of them
+    stay. Each hunk is positioned against the text the whole run had at
+    that step, so a map from those lines to the lines being rebuilt (None
+    for lines a reverted step inserted) moves it to its place. A kept hunk
+    deletes the same lines, skipping any a reverted step put there (they
+    are gone already), and inserts its lines where its first deleted line
+    was, or after the nearest line above that both texts have. The map
+    keeps the order of the lines, so the moved hunks stay in order.
+    Returns the lines and the kept steps with their hunks against the
+    rebuilt text.
+    """
+    current = original[:]
+    where = list(range(len(original)))
+    kept_steps = []
+    for (rule, edits), kept in zip(recorded, keep):
+        if kept:
+            moved = []
+            owners = []
+            for k, (start, deleted, inserted) in enumerate(edits):
+                targets = [index for index in where[start:start + len(deleted)]
+                           if index is not None]
+                if not targets:
+                    above = start - 1
+                    while above >= 0 and where[above] is None:
+                        above -= 1
+                    at = where[above] + 1 if above >= 0 else 0
+                    moved.append([at, [], inserted])
+                    owners.append(k)
+                    continue
+                # One hunk per run of adjacent lines, the insertion with the first
+                first = len(moved)
+                for index in targets:
+                    if len(moved) > first and moved[-1][0] + len(moved[-1][1]) == index:
+                        moved[-1][1].append(current[index])
+                    else:
+                        moved.append([index, [current[index]], []])
+                        owners.append(k)
+                moved[first][2] = inserted
+
+            # Apply them, noting where each line and insertion ends up
+            new_current = []
+            remap = [None] * len(current)
+            inserted_at = {}
+            pos = 0
+            for (at, deleted, inserted), k in zip(moved, owners):
+                if at < pos:
+                    raise Conflict(f"{rule} edits overlap once moved")
+                for index in range(pos, at):
+                    remap[index] = len(new_current)
+                    new_current.append(current[index])
+                if inserted:
+                    inserted_at[k] = len(new_current)
+                    new_current += inserted
+                pos = at + len(deleted)
+            for index in range(pos, len(current)):
+                remap[index] = len(new_current)
+                new_current.append(current[index])
+            current = new_current
+            kept_steps.append([rule, moved])
+
+        # Map the run's next text onto the rebuilt one
+        new_where = []
+        pos = 0
+        for k, (start, deleted, inserted) in enumerate(edits):
+            lines = where[pos:start]
+            if kept:
+                new_where += [None if index is None else remap[index] for index in lines]
+                if inserted:
+                    new_where += range(inserted_at[k], inserted_at[k] + len(inserted))
+            else:
+                new_where += lines
+                new_where += [None] * len(inserted)
+            pos = start + len(deleted)
+        lines = where[pos:]
+        new_where += [None if index is None else remap[index] for index in lines] if kept \
+            else lines
+        where = new_where
+    return current, kept_steps
+
+def _entry(rule, text, new_text, recorded):
+    """Journal entry for a file that went from text to new_text
+
+    recorded is what steps() collected; it is used if it is the whole
+    story, else the change is one step named rule.
+    """
+    lines = text.split('\n')
+    new_lines = new_text.split('\n')
+    if not (recorded and recorded[0][1] == lines and recorded[-1][2] == new_lines):
+        recorded = [(rule, lines, new_lines)]
+    return {
+        'old': _digest(text),
+        'new': _digest(new_text),
+        'steps': [[name, hunks(before, after)] for name, before, after in recorded
+                  if before != after],
+    }
+
+class Journaling(chain.Stage):
+    """Records what the fix wrote to each file
+
+    The texts come from validate.accepts(), which the write sites call with
+    both in hand, so nothing is read for the journal. rule names the
+    single step of a file whose rule sets did not record their own through
+    steps().
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+
+    def around(self, result, file_path, content, proceed):
+        result.steps = []
+        new_content = proceed()
+        recorded, result.steps = result.steps, None
+        images, result.images = result.images, None
+        if result.fixed and images is not None:
+            start = time.perf_counter()
+            result.entry = _entry(self.rule, *images, recorded)
+            result.journal_seconds = time.perf_counter() - start
+        return new_content
+
+class Journal:
+    """Collects the journal entries of a run and writes the journal"""
+
+    def __init__(self, fixer, base):
+        self.fixer = fixer
+        self.base = base
+        self.directory = base / JOURNAL_NAME
+        self.files = {}
+        self.seconds = 0.0
+
+    def add(self, file_path, result):
+        """Record the entry of one fixers.chain.Result, if the file was written"""
+        self.seconds += result.journal_seconds
+        if result.fixed and result.entry is not None:
+            rel = os.path.relpath(file_path, self.base).replace(os.sep, '/')
+            self.files[rel] = result.entry
+
+    def write(self):
+        """Write the journal, if any file was written, and print a one-line summary"""
+        if not self.files:
+            return
+        start = time.perf_counter()
+        self.directory.mkdir(exist_ok=True)
+        now = time.time()
+        name = (time.strftime('%Y%m%d-%H%M%S', time.localtime(now))
+                + f".{int(now * 1e6) % 1000000:06d}-{self.fixer.split('.')[0]}.json")
+        path = self.directory / name
+        journal = {'format': FORMAT_VERSION, 'fixer': self.fixer, 'files': self.files}
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(journal, separators=(',', ':')))
+        os.replace(tmp_path, path)
+        for old in _journals(self.directory)[:-KEEP_RUNS]:
+            old.unlink()
+        edits = [edit for entry in self.files.values() for _, step in entry['steps']
+                 for edit in step]
+        lines = sum(len(deleted) + len(inserted) for _, deleted, inserted in edits)
+        self.seconds += time.perf_counter() - start
+        print(f"Journal: {len(self.files)} files, {len(edits)} hunks, {lines} lines, "
+              f"{self.seconds * 1000:.1f} ms, written to {path.relative_to(self.base)}")
+
+def _journals(directory):
+    """Journal files in directory, oldest first"""
+    try:
+        return sorted(path for path in directory.iterdir()
+                      if path.name.endswith('.json') and path.is_file())
+    except OSError:
+        return []
+
+def find(base, fixer, path=None):
+    """The journal to revert: path, or the fixer script's latest one"""
+    if path is not None:
+        return Path(path)
+    script = fixer.split('.')[0]
+    for candidate in reversed(_journals(base / JOURNAL_NAME)):
+        if candidate.name.endswith(f"-{script}.json"):
+            return candidate
+    sys.exit(f"No {JOURNAL_NAME} journal of {script} to revert")
+
+def _selected(rel, src_rel, patterns):
+    return not patterns or any(fnmatch.fnmatchcase(rel, pattern) or
+                               fnmatch.fnmatchcase(src_rel, pattern) for pattern in patterns)
+
+def revert(path, base, src_dir, files=(), rules=()):
+    """Undo the journal at path, or only the files and rule sets chosen
+
+    files are fnmatch patterns against the paths relative to src (or to
+    base); rules are rule set names. Prints a line per file and a summary;
+    returns the number of files that could not be reverted.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            journal = json.load(f)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Cannot read journal {path}: {e}")
+    if not isinstance(journal, dict) or journal.get('format') != FORMAT_VERSION:
+        sys.exit(f"{path} is not a fixer journal")
+    rules = {rule_name(rule) for rule in rules}
+
+    reverted = failed = 0
+    start = time.perf_counter()
+    entries = journal['files']
+    for rel in list(entries):
+        entry = entries[rel]
+        file_path = base / rel
+        src_rel = os.path.relpath(file_path, src_dir).replace(os.sep, '/')
+        keep = [bool(rules) and rule not in rules for rule, _ in entry['steps']]
+        if not _selected(rel, src_rel, files) or all(keep):
+            continue
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Not reverted: {rel}: {e}")
+            failed += 1
+            continue
+        if _digest(text) != entry['new']:
+            print(f"Not reverted: {rel}: changed since the run")
+            failed += 1
+            continue
+        try:
+            lines = text.split('\n')
+            for _, edits in reversed(entry['steps']):
+                lines = apply(lines, inverse(edits))
+            original = '\n'.join(lines)
+            if _digest(original) != entry['old']:
+                raise Conflict("the rebuilt text does not match the journal")
+            if any(keep):
+                lines, kept_steps = replay(lines, entry['steps'], keep)
+                new_text = '\n'.join(lines)
+            else:
+                kept_steps, new_text = [], original
+        except Conflict as e:
+            print(f"Not reverted: {rel}: {e}")
+            failed += 1
+            continue
+        try:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(new_text)
+        except OSError as e:
+            print(f"Not reverted: {rel}: {e}")
+            failed += 1
+            continue
+        reverted += 1
+        print(f"Reverted: {rel}")
+        if kept_steps:
+            entry['new'] = _digest(new_text)
+            entry['steps'] = kept_steps
+        else:
+            del entries[rel]
+
+    if entries:
+        tmp_path = Path(path).with_name(Path(path).name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(journal, separators=(',', ':')))
+        os.replace(tmp_path, path)
+    else:
+        os.unlink(path)
+    print(f"Revert: {reverted} files reverted, {failed} not, in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms from {os.path.relpath(path, base)}")
+    return failed
@@ -0,0 +1,504 @@
+"""
+Incremental TS/TSX lexer for brace depth and line boundaries
+
+Counting '{' and '}' characters miscounts braces inside strings, template
+literals, regexes, comments and JSX text. The Lexer is fed one line at a
+time and tracks just enough of the syntax to know which braces are real:
+quoted strings, template literals (with nested ${...}), line and block
+comments, regex literals, and JSX tags, attributes and children. Between
+those it jumps with a compiled pattern to the next token, so a file is
+walked once at regex speed.
+
+Source lines repeat a lot, so the effect of a line (depth change, frames
+replaced on top of the context stack, open comment or string) is memoised
+per raw line and the top two frames it started in, like the line kinds in
+fixers.classify. Lines that reach further down the stack are lexed as
+usual.
+
+Regexes and JSX are told apart from division and less-than by the previous
+significant character, the way most editors do it. The fixers run on
+broken code, so the lexer never fails: an unterminated string ends at the
+end of its line, an unmatched '}' makes the depth negative, and unclosed
+JSX is dropped at the next line that starts in column 0 with a
+declaration or a '}'.
+
+feed_tokens() also lists the structural tokens of each line, in order,
+for checks that have to match them up (fixers.validate):
+
+  ( [ { ${ ) ] }    brackets in code, '{' also opening a JSX expression
+  <name  >  />      an opening tag (<name, or < for a fragment), its end,
+                    and the end of a self-closing one
+  </name            a closing tag
+  </*               unclosed JSX dropped at a top-level line
+  "                 a string left unterminated at the end of its line
+
+Token lists are memoised like the effects, in a memo of their own, so
+feed() and scan_lines() do not pay for them.
+"""
+
+import copy
+import re
+
+# Lexer state at the start of a line
+CODE = 0
+JSX = 1             # inside a JSX tag or between JSX tags
+STRING = 2          # quoted string continued with a trailing backslash
+TEMPLATE = 3        # template literal
+COMMENT = 4         # block comment
+
+# Frames on the context stack
+_ROOT = 0
+_BRACE = 1          # { ... } in code
+_TEMPLATE_EXPR = 2  # ${ ... } in a template literal
+_JSX_EXPR = 3       # { ... } in JSX
+_TEMPLATE = 4
+_JSX_TAG = 5        # <name attr=... > or />
+_JSX_CLOSE = 6      # </name>
+_JSX_CHILDREN = 7
+# Stands for the unknown frames below the top two while memoising a line
+_UNKNOWN = 8
+
+_CODE_FRAMES = (_ROOT, _BRACE, _TEMPLATE_EXPR, _JSX_EXPR)
+_FRAME_STATE = [CODE, CODE, CODE, CODE, TEMPLATE, JSX, JSX, JSX, CODE]
+
+# One token per match, anchored at the current position; the number of
+# the group that matched (lastindex) says which token it was, and no
+# group (lastindex None) means the rest of the line has no token
+_CODE_TOKEN = re.compile(
+    r'[^{}\'"`/<]*(?:(\{)|(\})'
+    r'|(\'[^\'\\]*(?:\\.[^\'\\]*)*\'|"[^"\\]*(?:\\.[^"\\]*)*")'
+    r'|([\'"])|(`)|(/)|(<)|\Z)')
+_OPEN, _CLOSE, _QUOTED, _QUOTE, _BACKTICK, _SLASH, _LESS = range(1, 8)
+_TEMPLATE_TOKEN = re.compile(r'[^`\\$]*(?:(?:\\.?|\$(?!\{))[^`\\$]*)*(?:(`)|(\$\{)|\Z)')
+_JSX_CHILDREN_TOKEN = re.compile(r'[^{<]*(?:(\{)|(</)|(<)|\Z)')
+_JSX_TAG_TOKEN = re.compile(r'[^{\'">/]*(?:(\{)|(>)|(/>)|(\'[^\']*\'|"[^"]*")|([\'"/])|\Z)')
+# Rest of a quoted string continued from the previous line
+_STRING_END = {
+    "'": re.compile(r"[^'\\]*(?:\\.[^'\\]*)*'"),
+    '"': re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"'),
+}
+_REGEX = re.compile(r'/(?![*/])(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*')
+_TRAILING_WORD = re.compile(r'[A-Za-z_$][\w$]*\Z')
+_TAG_START = re.compile(r'[A-Za-z>]')
+_TAG_NAME = re.compile(r'\s*([A-Za-z_$][\w$.:-]*)?')
+_BRACKETS = re.compile(r'[()\[\]]')
+# A line that can only be code: broken JSX is abandoned when one turns up
+_TOP_LEVEL = re.compile(r'\}|(?:import|export|function|const|let|type|interface|class)\b')
+
+# Keywords after which an expression (so a regex or JSX) can start
+_EXPRESSION_KEYWORDS = frozenset([
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+])
+
+# Memo of (line, top frames[, tail]) -> effect, and the same with the
+# line's tokens; each is cleared past this many entries
+_CACHE_LIMIT = 1 << 16
+_effects = {}
+_token_effects = {}
+# Effect placeholder for lines whose lexing looked at the previous line
+_NEEDS_TAIL = object()
+
+class _Unknown(Exception):
+    """Lexing a line needs frames below the ones it was memoised with"""
+
+class Lexer:
+    """Feed lines in order; depth is the brace depth after the last one"""
+
+    def __init__(self):
+        self.depth = 0
+        self._stack = [_ROOT]
+        self._comment = False
+        self._string = None
+        # Last non-blank line that ended in code, for regex/JSX detection
+        self._tail = ''
+        self._used_tail = False
+
+    @property
+    def state(self):
+        """State at the start of the next line"""
+        if self._comment:
+            return COMMENT
+        if self._string:
+            return STRING
+        return _FRAME_STATE[self._stack[-1]]
+
+    def copy(self):
+        """A lexer in the same state, to go on with another text from here"""
+        other = copy.copy(self)
+        other._stack = self._stack[:]
+        return other
+
+    def same_state(self, other):
+        """True if the rest of a text would lex the same on both (depth aside)"""
+        return (self._stack == other._stack and self._comment == other._comment
+                and self._string == other._string
+                and self._tail_expects_expression() == other._tail_expects_expression())
+
+    def _tail_expects_expression(self):
+        return self._expression_expected('', 0)
+
+    def _expression_expected(self, line, pos):
+        """True if an expression can start at line[pos] (not after a value)"""
+        text = line[:pos].rstrip()
+        if not text:
+            self._used_tail = True
+            text = self._tail.rstrip()
+            if not text:
+                return True
+        ch = text[-1]
+        if ch.isalnum() or ch in '_$':
+            word = _TRAILING_WORD.search(text)
+            return word is not None and word.group() in _EXPRESSION_KEYWORDS
+        return ch not in ')]}\'"`'
+
+    def feed(self, line):
+        """Lex one line (without its newline)"""
+        self._feed(line, _effects, None)
+
+    def feed_tokens(self, line):
+        """Lex one line like feed() and return its tokens (see above) as a tuple"""
+        return tuple(self._feed(line, _token_effects, []))
+
+    def feed_lines_tokens(self, lines, start, stop, states):
+        """feed_tokens() each of lines[start:stop] and return their tokens
+
+        The state at the start of each line is appended to states. As in
+        scan_lines(), the memo hit path is inlined.
+        """
+        stack = self._stack
+        get = _token_effects.get
+        add_state = states.append
+        tokens = []
+        add_tokens = tokens.append
+        depth = self.depth
+        comment = self._comment
+        string = self._string
+        tail = self._tail
+        for line in lines[start:stop]:
+            if not (comment or string):
+                top = stack[-2:]
+                effect = get((line, *top))
+                if effect is not None and effect is not _NEEDS_TAIL:
+                    add_state(_FRAME_STATE[top[-1]])
+                    delta, frames, comment, string, code, line_tokens = effect
+                    depth += delta
+                    stack[-len(top):] = frames
+                    if code and stack[-1] in _CODE_FRAMES:
+                        tail = line
+                    add_tokens(line_tokens)
+                    continue
+            self.depth = depth
+            self._comment = comment
+            self._string = string
+            self._tail = tail
+            add_state(self.state)
+            add_tokens(self.feed_tokens(line))
+            depth = self.depth
+            comment = self._comment
+            string = self._string
+            tail = self._tail
+        self.depth = depth
+        self._comment = comment
+        self._string = string
+        self._tail = tail
+        return tokens
+
+    def _feed(self, line, effects, tokens):
+        stack = self._stack
+        effect = None
+        if not (self._comment or self._string):
+            top = stack[-2:]
+            key = (line, *top)
+            effect = effects.get(key)
+            if effect is _NEEDS_TAIL:
+                key = (key, self._tail_expects_expression())
+                effect = effects.get(key)
+            if effect is None:
+                effect = self._memoise(line, top, key, effects, tokens)
+
+        if effect is None:
+            delta = self._lex(line, stack, tokens)
+            if delta is None:
+                return tokens
+            self.depth += delta
+            code = line and not line.isspace()
+        else:
+            delta, frames, self._comment, self._string, code, tokens = effect
+            self.depth += delta
+            del stack[-len(top):]
+            stack += frames
+
+        if code and stack[-1] in _CODE_FRAMES:
+            self._tail = line
+        return tokens
+
+    def _memoise(self, line, top, key, effects, tokens):
+        """Lex line on top of a stand-in stack and remember its effect
+
+        Returns None (and leaves the lexer and tokens as they were) if the
+        line needs the frames under the top two.
+        """
+        sandbox = [_UNKNOWN, *top]
+        self._used_tail = False
+        try:
+            delta = self._lex(line, sandbox, tokens)
+        except _Unknown:
+            self._comment = False
+            self._string = None
+            if tokens:
+                tokens.clear()
+            return None
+
+        effect = (delta, sandbox[1:], self._comment, self._string,
+                  bool(line) and not line.isspace(),
+                  None if tokens is None else tuple(tokens))
+        if len(effects) >= _CACHE_LIMIT:
+            effects.clear()
+        if self._used_tail and isinstance(key[0], str):
+            # The effect depends on the line before; key it on that too
+            effects[key] = _NEEDS_TAIL
+            key = (key, self._tail_expects_expression())
+        effects[key] = effect
+        return effect
+
+    def _lex(self, line, stack, tokens=None):
+        """Lex one line on stack and return the change in brace depth
+
+        Returns None for a line that is all inside a comment or string.
+        The line's tokens are added to tokens, unless it is None.
+        """
+        n = len(line)
+        pos = 0
+        depth = 0
+
+        if self._comment:
+            end = line.find('*/')
+            if end < 0:
+                return None
+            self._comment = False
+            pos = end + 2
+        elif self._string:
+            m = _STRING_END[self._string].match(line)
+            if m is None:
+                if not line.endswith('\\'):
+                    self._string = None
+                    if tokens is not None:
+                        tokens.append('"')
+                return None
+            self._string = None
+            pos = m.end()
+        elif _JSX_TAG <= stack[-1] <= _JSX_CHILDREN and _TOP_LEVEL.match(line):
+            while stack[-1] not in _CODE_FRAMES:
+                if stack[-1] == _UNKNOWN:
+                    raise _Unknown
+                stack.pop()
+            if tokens is not None:
+                tokens.append('</*')
+
+        while pos < n:
+            frame = stack[-1]
+
+            if frame in _CODE_FRAMES:
+                m = _CODE_TOKEN.match(line, pos)
+                token = m.lastindex
+                if tokens is not None:
+                    tokens += _BRACKETS.findall(line, pos, m.start(token) if token else n)
+                if token is None:
+                    break
+                pos = m.end()
+                if token == _OPEN:
+                    stack.append(_BRACE)
+                    depth += 1
+                    if tokens is not None:
+                        tokens.append('{')
+                elif token == _CLOSE:
+                    depth -= 1
+                    if frame != _ROOT:
+                        stack.pop()
+                    if tokens is not None:
+                        tokens.append('}')
+                elif token == _QUOTED:
+                    pass
+                elif token == _QUOTE:
+                    # Unterminated: the string ends with the line
+                    if line.endswith('\\'):
+                        self._string = m.group(_QUOTE)
+                    elif tokens is not None:
+                        tokens.append('"')
+                    break
+                elif token == _BACKTICK:
+                    stack.append(_TEMPLATE)
+                elif token == _SLASH:
+                    nxt = line[pos:pos + 1]
+                    if nxt == '/':
+                        break
+                    if nxt == '*':
+                        end = line.find('*/', pos + 1)
+                        if end < 0:
+                            self._comment = True
+                            break
+                        pos = end + 2
+                    elif self._expression_expected(line, pos - 1):
+                        m = _REGEX.match(line, pos - 1)
+                        if m is not None:
+                            pos = m.end()
+                elif (_TAG_START.match(line, pos) is not None and
+                        self._expression_expected(line, pos - 1)):
+                    stack.append(_JSX_TAG)
+                    if tokens is not None:
+                        tokens.append('<' + (_TAG_NAME.match(line, pos).group(1) or ''))
+
+            elif frame == _TEMPLATE:
+                m = _TEMPLATE_TOKEN.match(line, pos)
+                if m.lastindex is None:
+                    break
+                pos = m.end()
+                if m.lastindex == 1:
+                    stack.pop()
+                else:
+                    stack.append(_TEMPLATE_EXPR)
+                    depth += 1
+                    if tokens is not None:
+                        tokens.append('${')
+
+            elif frame == _JSX_CHILDREN:
+                m = _JSX_CHILDREN_TOKEN.match(line, pos)
+                token = m.lastindex
+                if token is None:
+                    break
+                pos = m.end()
+                if token == 1:
+                    stack.append(_JSX_EXPR)
+                    depth += 1
+                    if tokens is not None:
+                        tokens.append('{')
+                elif token == 2:
+                    stack[-1] = _JSX_CLOSE
+                    if tokens is not None:
+                        tokens.append('</' + (_TAG_NAME.match(line, pos).group(1) or ''))
+                else:
+                    stack.append(_JSX_TAG)
+                    if tokens is not None:
+                        tokens.append('<' + (_TAG_NAME.match(line, pos).group(1) or ''))
+
+            elif frame == _JSX_TAG:
+                m = _JSX_TAG_TOKEN.match(line, pos)
+                token = m.lastindex
+                if token is None:
+                    break
+                pos = m.end()
+                if token == 1:
+                    stack.append(_JSX_EXPR)
+                    depth += 1
+                    if tokens is not None:
+                        tokens.append('{')
+                elif token == 2:
+                    stack[-1] = _JSX_CHILDREN
+                    if tokens is not None:
+                        tokens.append('>')
+                elif token == 3:
+                    stack.pop()
+                    if tokens is not None:
+                        tokens.append('/>')
+                elif token == 5 and m.group(5) != '/':
+                    # Attribute string running past the end of the line
+                    break
+
+            elif frame == _JSX_CLOSE:
+                end = line.find('>', pos)
+                if end < 0:
+                    break
+                stack.pop()
+                pos = end + 1
+
+            else:
+                raise _Unknown
+
+        return depth
+
+def scan_lines(lines):
+    """Lex lines in one pass
+
+    Returns (depths, states): the brace depth after each line, and the
+    lexer state at the start of each line as a bytearray. This is the same
+    as feeding the lines to a Lexer, with the memo hit path inlined.
+    """
+    lexer = Lexer()
+    stack = lexer._stack
+    get = _effects.get
+    depth = 0
+    depths = []
+    states = bytearray()
+    for line in lines:
+        if not (lexer._comment or lexer._string):
+            top = stack[-2:]
+            effect = get((line, *top))
+            if effect is not None and effect is not _NEEDS_TAIL:
+                states.append(_FRAME_STATE[stack[-1]])
+                delta, frames, lexer._comment, lexer._string, code, _ = effect
+                depth += delta
+                del stack[-len(top):]
+                stack += frames
+                if code and stack[-1] in _CODE_FRAMES:
+                    lexer._tail = line
+                depths.append(depth)
+                continue
+
+        states.append(lexer.state)
+        lexer.depth = depth
+        lexer.feed(line)
+        depth = lexer.depth
+        depths.append(depth)
+    return depths, states
+
+# 1 for states whose lines start inside a comment or a string literal
+_IN_LITERAL = bytes(state in (STRING, TEMPLATE, COMMENT) for state in range(256))
+
+class LiteralLines:
+    """Lazy lookup: does line i start inside a comment or string literal?
+
+    Only a line after one that opens a template literal, a block comment
+    or a continued string can, so the file is lexed the first time a line
+    past that point is asked about, and not at all for most files.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.first = next((i for i, line in enumerate(lines)
+                           if '`' in line or '/*' in line or line.endswith('\\')),
+                          len(lines))
+        self._in_literal = None
+
+    def __getitem__(self, i):
+        if i <= self.first:
+            return 0
+        if self._in_literal is None:
+            _, states = scan_lines(self.lines)
+            self._in_literal = states.translate(_IN_LITERAL)
+        return self._in_literal[i]
+
+def literal_flags(lines):
+    """Yield (line, in_literal) for lines, lexing each one as it is consumed
+
+    The streaming counterpart of LiteralLines, for input that is not held
+    in memory: in_literal is 1 if the line starts inside a comment or
+    string literal. Every line is lexed, since there is no going back.
+    """
+    lexer = Lexer()
+    for line in lines:
+        yield line, _IN_LITERAL[lexer.state]
+        lexer.feed(line)
+
+def mask_literal_lines(kinds, states, other):
+    """Set kinds[i] to other for lines that start inside a comment or literal
+
+    Such lines are text, not code, whatever they look like: a '}' or
+    'export default' in a template literal must not trigger a rule.
+    """
+    in_literal = states.translate(_IN_LITERAL)
+    i = in_literal.find(1)
+    while i >= 0:
+        kinds[i] = other
+        i = in_literal.find(1, i + 1)
+    return kinds
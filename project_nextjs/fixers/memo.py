@@ -0,0 +1,165 @@
+"""
+Content-addressed memo of fixer results (--memo, --memo-store)
+
+Copy-pasted pages and components share byte-identical content, broken
+tails included, and each copy used to go through the rules again. The memo
+keys the rules' result on the sha1 of the file text: the first copy runs
+the rules, and every later copy gets the fixed text (or "no change") and
+the messages the rules printed, replayed so the output is the same.
+
+In a run the memo is an LRU bounded by the bytes it holds; unchanged files
+cost only their key. With a store directory (.fixer-memo next to src) the
+results are also written there, one small file per content hash, so later
+runs and pool workers share them. Results are kept apart per fixer and per
+version of the rule sources, like the fixer cache, and the store drops a
+fixer's older versions when it is opened.
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+
+from fixers import chain
+
+MEMO_NAME = '.fixer-memo'
+
+# Default in-run LRU bound
+LIMIT_BYTES = 64 << 20
+
+# Memos of this process by their arguments, so the copies a process pool
+# unpickles share one LRU per worker
+_memos = {}
+
+def _shared(*args):
+    memo = _memos.get(args)
+    if memo is None:
+        memo = _memos[args] = Memo(*args)
+    return memo
+
+# Where a result came from
+COMPUTED = 'computed'
+MEMORY = 'memory'
+STORE = 'store'
+
+class Memo:
+    """Memoised form of a fix_lines function, keyed by content hash"""
+
+    def __init__(self, fix_lines, fixer, version, limit=LIMIT_BYTES, store=None):
+        self._args = (fix_lines, fixer, version, limit, store)
+        self._fix_lines = fix_lines
+        self.limit = limit
+        self.size = 0
+        # Source of the last result, for Recalling
+        self.last = None
+        # sha1 -> (new text or None if unchanged, printed messages)
+        self._entries = OrderedDict()
+        self.store = None
+        if store is not None:
+            fixer_dir = Path(store) / hashlib.sha1(fixer.encode('utf-8')).hexdigest()[:12]
+            self.store = fixer_dir / version[:16]
+            if fixer_dir.is_dir():
+                for old in fixer_dir.iterdir():
+                    if old != self.store:
+                        shutil.rmtree(old, ignore_errors=True)
+            self.store.mkdir(parents=True, exist_ok=True)
+
+    def __reduce__(self):
+        return _shared, self._args
+
+    def _remember(self, key, entry):
+        size = _size(key, entry)
+        if size > self.limit:
+            return
+        self._entries[key] = entry
+        self.size += size
+        while self.size > self.limit:
+            self.size -= _size(*self._entries.popitem(last=False))
+
+    def _store_path(self, key):
+        return self.store / key[:2] / key
+
+    def _load(self, key):
+        try:
+            with open(self._store_path(key), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data['text'], data['messages']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save(self, key, entry):
+        path = self._store_path(key)
+        tmp_path = path.with_name(f'{key}.{os.getpid()}.tmp')
+        try:
+            path.parent.mkdir(exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'text': entry[0], 'messages': entry[1]}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def fix_lines(self, lines):
+        """Return what fix_lines(lines) returns, reusing the result for known content"""
+        content = '\n'.join(lines)
+        key = hashlib.sha1(content.encode('utf-8', 'surrogatepass')).hexdigest()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.last = MEMORY
+        elif self.store is not None and (entry := self._load(key)) is not None:
+            self._remember(key, entry)
+            self.last = STORE
+        else:
+            buf = io.StringIO()
+            with contextlib.redirect_stdout(buf):
+                new_lines = self._fix_lines(lines)
+            new_content = '\n'.join(new_lines)
+            entry = (None if new_content == content else new_content, buf.getvalue())
+            self._remember(key, entry)
+            if self.store is not None:
+                self._save(key, entry)
+            self.last = COMPUTED
+
+        new_content, messages = entry
+        if messages:
+            print(messages, end='')
+        return lines if new_content is None else new_content.split('\n')
+
+def _size(key, entry):
+    text, messages = entry
+    return len(key) + len(messages) + (len(text) if text is not None else 0)
+
+class Recalling(chain.Stage):
+    """Notes whether the memo answered for each file"""
+
+    def __init__(self, memo):
+        self.memo = memo
+
+    def around(self, result, file_path, content, proceed):
+        self.memo.last = None
+        new_content = proceed()
+        result.source = self.memo.last
+        return new_content
+
+class Stats:
+    """Counts where the results of a run came from"""
+
+    def __init__(self):
+        self.files = 0
+        self.sources = dict.fromkeys((COMPUTED, MEMORY, STORE), 0)
+
+    def add(self, file_path, result):
+        """Count one fixers.chain.Result"""
+        self.files += 1
+        if result.source is not None:
+            self.sources[result.source] += 1
+
+    def report(self):
+        deduplicated = self.sources[MEMORY] + self.sources[STORE]
+        print(f"Memo: {deduplicated} of {self.files} files deduplicated "
+              f"({self.sources[MEMORY]} in this run, {self.sources[STORE]} from the store), "
+              f"{self.sources[COMPUTED]} computed")
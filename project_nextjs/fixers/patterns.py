@@ -0,0 +1,163 @@
+"""
+Linear-time equivalents of the whole-file regular expressions
+
+fix_comprehensive and fix_all_fast used to finish with re.sub patterns
+such as (\\}\\s*\\n)(\\s*(?:value=|...)[^\\n]*\\n)+ over the file text. The
+backtracking engine retries \\s* and [^\\n]+ at every position, so a long
+run of blank lines after a brace, a line with many 'export default's, or
+a '<' with no '>' after it takes quadratic time. Each function here
+gives the same result and count as the re.subn call in its docstring,
+using str.find, one anchored \\s* match and prefix tests, each of which
+moves forward through the text.
+
+The functions take the alternatives of the original pattern as a tuple
+of literal prefixes, e.g. ('value=', 'color:').
+"""
+
+import re
+
+_EXPORT = 'export default'
+# Skipping \s* never needs to backtrack when what follows cannot start
+# with whitespace, so this matches what the original patterns skip
+_WHITESPACE = re.compile(r'\s*')
+_NEWLINES = re.compile(r'\n*')
+
+def _borders(head, tail):
+    """Yield each length n > 0 with tail[-n:] == head[:n], longest first
+
+    Prefix function of head + '\\n' + tail; neither part contains '\\n'.
+    """
+    text = head + '\n' + tail
+    pi = [0] * len(text)
+    k = 0
+    for i in range(1, len(text)):
+        while k and text[i] != text[k]:
+            k = pi[k - 1]
+        if text[i] == text[k]:
+            k += 1
+        pi[i] = k
+    k = pi[-1]
+    while k:
+        yield k
+        k = pi[k - 1]
+
+def _repeated_length(content, p, eol, q):
+    """Length of the first 'export default...' line suffix repeated at q
+
+    The suffixes start at the 'export default's of the line at or after p
+    and run to eol; 0 if none of them is repeated.
+    """
+    if eol - p <= len(_EXPORT):
+        return 0
+    if content.startswith(content[p:eol], q):
+        return eol - p
+    second = content.find(_EXPORT, p + 1, eol)
+    if second < 0 or eol - second <= len(_EXPORT):
+        return 0
+
+    # Several candidates: testing each would be quadratic in the line
+    # length, so find every suffix that is a prefix at q in one pass
+    end = content.find('\n', q)
+    if end < 0:
+        end = len(content)
+    for length in _borders(content[q:min(end, q + eol - second)], content[second:eol]):
+        if length > len(_EXPORT) and content.startswith(_EXPORT, eol - length):
+            return length
+    return 0
+
+def dedupe_export_lines(content):
+    """re.subn(r'(export default[^\\n]+)\\n\\s*\\1', r'\\1', content)"""
+    out = []
+    pos = 0
+    count = 0
+    p = content.find(_EXPORT)
+    while p >= 0:
+        eol = content.find('\n', p)
+        if eol < 0:
+            break
+        q = _WHITESPACE.match(content, eol + 1).end()
+        length = _repeated_length(content, p, eol, q)
+        if not length:
+            p = content.find(_EXPORT, eol + 1)
+            continue
+        out.append(content[pos:eol])
+        pos = q + length
+        count += 1
+        p = content.find(_EXPORT, pos)
+    out.append(content[pos:])
+    return ''.join(out), count
+
+def drop_after_export(content, attributes, tags=False):
+    """re.subn(r'(export default[^\\n]+)\\n\\s*(?:(?:ALT)[^\\n]*)+\\n*', r'\\1\\n', content)
+
+    ALT is the alternatives in attributes, preceded by <[^>]+> if tags is
+    true.
+    """
+    out = []
+    pos = 0
+    count = 0
+    # First '>' at or after gt_from (-1 if none), reused while queries
+    # stay at or before it
+    gt_from = 0
+    gt = -2
+    p = content.find(_EXPORT)
+    while p >= 0:
+        eol = content.find('\n', p)
+        if eol < 0:
+            break
+        end = -1
+        if eol - p > len(_EXPORT):
+            q = _WHITESPACE.match(content, eol + 1).end()
+            if content.startswith(attributes, q):
+                end = q
+            elif tags and content.startswith('<', q):
+                if gt == -2 or q + 1 < gt_from or 0 <= gt < q + 1:
+                    gt_from = q + 1
+                    gt = content.find('>', gt_from)
+                # [^>]+ needs at least one character
+                if gt > q + 1:
+                    end = gt
+        if end < 0:
+            p = content.find(_EXPORT, eol + 1)
+            continue
+        line_end = content.find('\n', end)
+        end = _NEWLINES.match(content, line_end).end() if line_end >= 0 else len(content)
+        out.append(content[pos:eol])
+        out.append('\n')
+        pos = end
+        count += 1
+        p = content.find(_EXPORT, pos)
+    out.append(content[pos:])
+    return ''.join(out), count
+
+def drop_attributes_after_brace(content, attributes):
+    """re.subn(r'(\\}\\s*\\n)(\\s*(?:ALT)[^\\n]*\\n)+', r'\\1', content)
+
+    ALT is the alternatives in attributes.
+    """
+    out = []
+    pos = 0
+    count = 0
+    p = content.find('}')
+    while p >= 0:
+        q = _WHITESPACE.match(content, p + 1).end()
+        newline = content.rfind('\n', p + 1, q)
+        line_end = content.find('\n', q) if newline >= 0 and content.startswith(attributes, q) else -1
+        if line_end < 0:
+            p = content.find('}', p + 1)
+            continue
+        end = line_end + 1
+        while True:
+            q = _WHITESPACE.match(content, end).end()
+            if not content.startswith(attributes, q):
+                break
+            line_end = content.find('\n', q)
+            if line_end < 0:
+                break
+            end = line_end + 1
+        out.append(content[pos:newline + 1])
+        pos = end
+        count += 1
+        p = content.find('}', pos)
+    out.append(content[pos:])
+    return ''.join(out), count
@@ -0,0 +1,110 @@
+"""
+Pipelined reads and writes for slow filesystems (--pipeline)
+
+On a network volume every open().read() and every rewrite waits on the
+filesystem, and the plain loop waits for each in turn. Here the files go
+through three stages: a pool of reader threads keeps up to depth files
+read ahead, the rules run on them one at a time in the calling thread,
+and a pool of writer threads writes the changed ones back while the next
+files are fixed. Reads, rule work and writes of different files overlap;
+the rules themselves still run serially (they are CPU bound, so threads
+would not help them - that is what --jobs is for).
+
+Both queues are bounded by depth, so at most depth files are held in
+memory waiting to be fixed and at most depth fixed files wait to be
+written. Results come out in the order of the files, and anything the
+rules print for a file is replayed just before its result, so the output
+is the same as a serial run.
+"""
+
+import contextlib
+import io
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from fixers import chain, validate
+
+# Files read ahead, and fixed files waiting to be written
+QUEUE_DEPTH = 8
+
+def _read(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def _write(file_path, content):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+def fix_content(fix_lines, file_path, content):
+    """Pipeline fix function for fix_lines: (fixed, new content or None)"""
+    new_content = '\n'.join(fix_lines(content.split('\n')))
+    if new_content == content or not validate.accepts(file_path, content, new_content):
+        return False, None
+    return True, new_content
+
+def _finish(file_path, result, output, write):
+    """Wait for a file's write and return its final result"""
+    if write is not None:
+        try:
+            write.result()
+        except Exception as e:
+            output += f"Error writing {file_path}: {e}\n"
+            result.fixed = False
+    if output:
+        print(output, end='')
+    return result
+
+def run_pipeline(fix, file_paths, depth=QUEUE_DEPTH, write=True):
+    """Yield the result of fix for each file, in the order given
+
+    fix(file_path, content) is a fixers.chain.Chain: it gets the file's
+    text and returns (result, new_content). new_content is written back if
+    it is not None and write is true, and result is what is yielded for
+    the file once that write has finished, with fixed set to False if it
+    failed. A file that cannot be read yields a Result that is not fixed.
+    """
+    depth = max(1, depth)
+    file_paths = iter(file_paths)
+    reads = deque()         # (file_path, read future), in file order
+    done = deque()          # (file_path, result, output, write future or None)
+    reader = ThreadPoolExecutor(max_workers=depth, thread_name_prefix='fixer-read')
+    writer = ThreadPoolExecutor(max_workers=depth, thread_name_prefix='fixer-write')
+
+    def read_ahead():
+        while len(reads) < depth:
+            file_path = next(file_paths, None)
+            if file_path is None:
+                return
+            reads.append((file_path, reader.submit(_read, file_path)))
+
+    try:
+        read_ahead()
+        while reads:
+            file_path, read = reads.popleft()
+            read_ahead()
+            try:
+                content = read.result()
+            except Exception as e:
+                done.append((file_path, chain.Result(), f"Error reading {file_path}: {e}\n",
+                             None))
+            else:
+                buf = io.StringIO()
+                with contextlib.redirect_stdout(buf):
+                    result, new_content = fix(file_path, content)
+                pending = None
+                if write and new_content is not None:
+                    pending = writer.submit(_write, file_path, new_content)
+                done.append((file_path, result, buf.getvalue(), pending))
+
+            # Hand back finished files; block on the oldest write only when
+            # depth writes are waiting
+            while done and (len(done) > depth or done[0][3] is None or done[0][3].done()):
+                yield _finish(*done.popleft())
+
+        while done:
+            yield _finish(*done.popleft())
+    finally:
+        # Reads not yet used are dropped if the caller stops early, but
+        # writes already queued always complete
+        reader.shutdown(cancel_futures=True)
+        writer.shutdown(wait=True)
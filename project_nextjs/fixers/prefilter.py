@@ -0,0 +1,288 @@
+"""
+Byte-level prefilter that skips files no rule can change (--prefilter)
+
+Most source files have a single export default and none of the orphaned
+attribute lines the rules strip, yet each of them is decoded, split into
+lines and classified before the rules find nothing to do. Every rule only
+fires near certain literal text - a second 'export default', a line that
+starts with 'value=' after a line that ends with '}' - so each fixer
+states, as a list of checks, the byte patterns it cannot change a file
+without. The prefilter looks for them in the raw bytes with bytes.find
+and one compiled bytes pattern per check, and a file with none of them
+is reported unchanged without being decoded or split.
+
+The checks only have to be necessary conditions, so they err on the
+side of running the fixer: whitespace is any byte str.strip() might
+remove, including every byte of a multi-byte character, and a check that
+cannot tell runs the fixer. A file that is not ASCII is checked to be
+valid UTF-8 first, so the fixer still reports the ones it cannot read.
+
+    PREFILTER = prefilter.Prefilter('comprehensive', [
+        prefilter.Repeated(b'export default'),
+        prefilter.LineAfter(prefilter.markers(ATTRIBUTES), trigger_ends=(b'}',)),
+    ])
+
+Rule packs (fixers.rules) get theirs from for_pack().
+"""
+
+import re
+import time
+
+from fixers import chain, classify, rules
+
+# Bytes str.strip() may remove, except the line break: the ASCII
+# whitespace characters and, to stay on the safe side without decoding,
+# every byte of a non-ASCII one
+_SPACE = rb'[\t\x0b-\r\x1c-\x20\x80-\xff]*'
+
+def _any(markers):
+    return b'(?:' + b'|'.join(map(re.escape, markers)) + b')'
+
+def _line_start(starts):
+    """Pattern of a line break and a line whose text starts with one of starts"""
+    return rb'\n' + _SPACE + _any(starts)
+
+def _next_line(starts):
+    """Pattern of a line break, any blank lines and a line starting with one of starts"""
+    return rb'\n(?:' + _SPACE + rb'\n)*' + _SPACE + _any(starts)
+
+class Check:
+    """Base of the check types: true if a file's bytes may let a rule fire
+
+    may_change() gets the file with a '\n' in front, so every line,
+    the first included, follows a line break.
+    """
+
+    def may_change(self, data):
+        # A check that cannot rule a file out lets the rules see it
+        return True
+
+class Present(Check):
+    """The marker occurs anywhere"""
+
+    def __init__(self, marker):
+        self.marker = marker
+
+    def may_change(self, data):
+        return self.marker in data
+
+class Repeated(Check):
+    """The marker occurs at least twice (duplicate declarations)"""
+
+    def __init__(self, marker):
+        self.marker = marker
+
+    def may_change(self, data):
+        first = data.find(self.marker)
+        return first >= 0 and data.find(self.marker, first + 1) >= 0
+
+class LineAfter(Check):
+    """A line starting with one of starts follows a trigger line
+
+    The trigger line is the last non-blank line before it, and is one of
+    trigger_lines (stripped), contains one of trigger_contains or ends
+    with one of trigger_ends. A rule whose trigger line starts with a
+    marker uses trigger_contains: the search then goes from marker to
+    marker instead of trying every line, and a marker in the middle of a
+    line only means the fixer runs.
+    """
+
+    def __init__(self, starts, trigger_lines=(), trigger_contains=(), trigger_ends=()):
+        self.starts = tuple(starts)
+        self.triggers = tuple(trigger_lines) + tuple(trigger_contains) + tuple(trigger_ends)
+        patterns = []
+        if trigger_lines:
+            patterns.append(_line_start(trigger_lines) + _SPACE + _next_line(starts))
+        if trigger_contains:
+            patterns.append(_any(trigger_contains) + rb'[^\n]*' + _next_line(starts))
+        if trigger_ends:
+            patterns.append(_any(trigger_ends) + _SPACE + _next_line(starts))
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+
+    def may_change(self, data):
+        if not any(marker in data for marker in self.starts):
+            return False
+        if not any(marker in data for marker in self.triggers):
+            return False
+        return any(pattern.search(data) for pattern in self.patterns)
+
+class LineWithin(Check):
+    """A line starting with one of starts comes at most lines lines after a trigger line
+
+    The trigger line contains one of triggers.
+    """
+
+    def __init__(self, starts, triggers, lines):
+        self.triggers = tuple(triggers)
+        self.pattern = re.compile(_any(triggers) + rb'[^\n]*(?:\n[^\n]*){0,%d}?'
+                                  % (lines - 1) + _line_start(starts))
+
+    def may_change(self, data):
+        if not any(marker in data for marker in self.triggers):
+            return False
+        return self.pattern.search(data) is not None
+
+class LineFollowing(Check):
+    """A line starting with one of starts comes after the first line with a marker"""
+
+    def __init__(self, starts, markers):
+        self.markers = tuple(markers)
+        self.pattern = re.compile(_line_start(starts))
+
+    def may_change(self, data):
+        found = [pos for pos in map(data.find, self.markers) if pos >= 0]
+        if not found:
+            return False
+        end = data.find(b'\n', min(found))
+        return end >= 0 and self.pattern.search(data, end) is not None
+
+class FirstLine(Check):
+    """The first line starts with one of starts"""
+
+    def __init__(self, starts):
+        self.pattern = re.compile(_line_start(starts))
+
+    def may_change(self, data):
+        return self.pattern.match(data) is not None
+
+class Always(Check):
+    """Nothing is known about the rule, so every file may change"""
+
+    def may_change(self, data):
+        return True
+
+class Prefilter:
+    """The checks of one rule set; a file none of them accepts cannot change"""
+
+    def __init__(self, name, checks):
+        self.name = name
+        self.checks = list(checks)
+
+    def may_change(self, data):
+        """False if the rules are known to leave a file with these bytes unchanged"""
+        if not data.isascii():
+            try:
+                data.decode('utf-8')
+            except UnicodeDecodeError:
+                return True
+        if b'\r' in data:
+            # What text mode reading turns into line breaks
+            data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        data = b'\n' + data
+        return any(check.may_change(data) for check in self.checks)
+
+def markers(prefixes):
+    """Encode str prefixes as the byte markers the checks take"""
+    return tuple(prefix.encode('utf-8') for prefix in prefixes)
+
+def kind_lines(table):
+    """Byte markers of the exact lines of the kinds in a classify.kind_set table"""
+    lines = classify.kind_lines(table)
+    if lines is None:
+        raise ValueError("Lines of these kinds are not one exact line")
+    return markers(lines)
+
+def kind_starts(table):
+    """Byte markers every line of a kind in a classify.kind_set table starts with"""
+    prefixes = classify.kind_prefixes(table)
+    if prefixes is None:
+        raise ValueError("Lines of these kinds have no common prefix")
+    return markers(prefixes)
+
+def for_pack(pack):
+    """Prefilter of a fixers.rules.Pack, from the prefixes of its kinds
+
+    A Dedupe rule needs its trigger prefix twice, a StripNext or StripRun
+    rule a line with a strip prefix after a line with a trigger prefix
+    (or after the trigger line, for kinds such as CLOSE_BRACE that are one
+    exact line).
+    """
+    checks = []
+    for rule in pack.rules:
+        triggers = classify.kind_prefixes(rule.trigger)
+        if isinstance(rule, rules.Dedupe):
+            if triggers is None:
+                checks.append(Always())
+            else:
+                checks.extend(Repeated(marker) for marker in markers(triggers))
+            continue
+        strips = classify.kind_prefixes(rule.strip)
+        if triggers is None or strips is None:
+            checks.append(Always())
+        elif classify.kind_lines(rule.trigger):
+            checks.append(LineAfter(markers(strips), trigger_lines=kind_lines(rule.trigger)))
+        else:
+            checks.append(LineAfter(markers(strips), trigger_contains=markers(triggers)))
+    return Prefilter(pack.name, checks)
+
+def combine(name, prefilters):
+    """Prefilter of rule sets run one after another
+
+    The chain leaves a file unchanged if each rule set does, since each
+    then sees the original text.
+    """
+    return Prefilter(name, [check for prefilter in prefilters for check in prefilter.checks])
+
+class Screening(chain.Stage):
+    """Runs the fix only if the prefilter cannot rule the file out"""
+
+    def __init__(self, prefilter):
+        self.prefilter = prefilter
+
+    def around(self, result, file_path, content, proceed):
+        start = time.perf_counter()
+        if content is not None:
+            data = content.encode('utf-8', 'surrogatepass')
+        else:
+            try:
+                with open(file_path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                # The fix function reports it
+                data = None
+        result.size = 0 if data is None else len(data)
+        if data is not None and not self.prefilter.may_change(data):
+            result.skipped = True
+            result.screen_seconds = time.perf_counter() - start
+            return None
+        checked = time.perf_counter()
+        new_content = proceed()
+        result.screen_seconds = checked - start
+        result.fix_seconds = time.perf_counter() - checked
+        return new_content
+
+class Stats:
+    """Counts the files a run skipped and estimates the time that saved"""
+
+    def __init__(self):
+        self.files = 0
+        self.skipped = 0
+        self.skipped_bytes = 0
+        # Bytes and rule time of the files that were not skipped
+        self.run_bytes = 0
+        self.run_seconds = 0.0
+        self.screen_seconds = 0.0
+
+    def add(self, file_path, result):
+        """Count one fixers.chain.Result"""
+        if result.size is None:
+            # Skipped by the cache before screening
+            return
+        self.files += 1
+        self.screen_seconds += result.screen_seconds
+        if result.skipped:
+            self.skipped += 1
+            self.skipped_bytes += result.size
+        else:
+            self.run_bytes += result.size
+            self.run_seconds += result.fix_seconds
+
+    def report(self):
+        share = self.skipped / self.files if self.files else 0.0
+        line = (f"Prefilter: {self.skipped} of {self.files} files skipped ({share:.0%}), "
+                f"{self.screen_seconds * 1000:.1f} ms screening")
+        if self.run_bytes:
+            # The skipped files would have cost what the others did per byte
+            saved = self.skipped_bytes * self.run_seconds / self.run_bytes - self.screen_seconds
+            line += f", about {saved:.3f} s saved"
+        print(line)
@@ -0,0 +1,164 @@
+"""
+Optional per-rule timing and hit counts for the fixers
+
+A fix_lines_* function asks for a timer at the start:
+
+    timer = profile.timer('comprehensive')
+    ...
+    if timer:
+        timer.lap('duplicate_exports', examined=len(lines))
+
+timer() returns None unless the runner is profiling the file being fixed,
+so an unprofiled run pays one call per file and one test per rule. lap()
+charges the time since the previous lap (or since the timer was made) to
+a rule; hit() counts a match without timing it, for rules that share one
+line loop.
+
+The runner puts a Profiling stage in the file's fixers.chain.Chain, which
+works in pool workers too, and feeds the results to a Profiler that writes
+the JSON report.
+"""
+
+import heapq
+import json
+import time
+
+from fixers import chain
+
+# Files listed in the report, slowest first
+SLOWEST_FILES = 20
+
+class Timer:
+    """Lap timer charging time, lines and matches to the rules of one rule set"""
+
+    def __init__(self, rules, rule_set):
+        self.rules = rules
+        self.rule_set = rule_set
+        self.last = time.perf_counter()
+
+    def _stats(self, rule):
+        key = f'{self.rule_set}.{rule}'
+        stats = self.rules.get(key)
+        if stats is None:
+            # seconds, lines examined, matches, lines removed
+            stats = self.rules[key] = [0.0, 0, 0, 0]
+        return stats
+
+    def lap(self, rule, examined=0, matches=0, removed=0):
+        """Charge the time since the last lap to rule"""
+        now = time.perf_counter()
+        stats = self._stats(rule)
+        stats[0] += now - self.last
+        stats[1] += examined
+        stats[2] += matches
+        stats[3] += removed
+        self.last = now
+
+    def hit(self, rule, removed=0):
+        """Count one match of rule"""
+        stats = self._stats(rule)
+        stats[2] += 1
+        stats[3] += removed
+
+def timer(rule_set):
+    """Return a Timer for rule_set if the current file is being profiled"""
+    result = chain.current()
+    if result is None or result.rules is None:
+        return None
+    return Timer(result.rules, rule_set)
+
+class Profiling(chain.Stage):
+    """Records each file's time and rule stats"""
+
+    def around(self, result, file_path, content, proceed):
+        result.rules = {}
+        start = time.perf_counter()
+        new_content = proceed()
+        result.profile_seconds = time.perf_counter() - start
+        return new_content
+
+class Profiler:
+    """Collects the profiled results of a run into a report"""
+
+    def __init__(self, fixer, base=None):
+        self.fixer = fixer
+        self.base = base
+        self.start = time.perf_counter()
+        self.files = 0
+        self.fixed = 0
+        self.cached = 0
+        self.file_seconds = 0.0
+        # rule -> [seconds, lines examined, matches, lines removed, files matched]
+        self.rules = {}
+        self._slowest = []
+
+    def add(self, file_path, result):
+        """Record one fixers.chain.Result"""
+        self.files += 1
+        if result.rules is None:
+            # Skipped by the cache without running the rules
+            self.cached += 1
+            return
+
+        self.fixed += bool(result.fixed)
+        self.file_seconds += result.profile_seconds
+        for rule, stats in result.rules.items():
+            total = self.rules.get(rule)
+            if total is None:
+                total = self.rules[rule] = [0.0, 0, 0, 0, 0]
+            total[0] += stats[0]
+            total[1] += stats[1]
+            total[2] += stats[2]
+            total[3] += stats[3]
+            total[4] += stats[2] > 0
+
+        entry = (result.profile_seconds, self.files, file_path, bool(result.fixed),
+                 result.rules)
+        if len(self._slowest) < SLOWEST_FILES:
+            heapq.heappush(self._slowest, entry)
+        else:
+            heapq.heappushpop(self._slowest, entry)
+
+    def _name(self, file_path):
+        if self.base is not None:
+            try:
+                file_path = file_path.relative_to(self.base)
+            except ValueError:
+                pass
+        return file_path.as_posix()
+
+    def report(self):
+        """Return the report as a JSON-serialisable dict"""
+        rule_seconds = sum(stats[0] for stats in self.rules.values())
+        rules = [{'rule': rule, 'seconds': round(stats[0], 6),
+                  'share': round(stats[0] / rule_seconds, 4) if rule_seconds else 0.0,
+                  'lines': stats[1], 'matches': stats[2], 'removed': stats[3],
+                  'files_matched': stats[4]}
+                 for rule, stats in sorted(self.rules.items(),
+                                           key=lambda item: (-item[1][0], item[0]))]
+        slowest = [{'path': self._name(file_path), 'seconds': round(seconds, 6),
+                    'fixed': fixed,
+                    'rules': {rule: round(stats[0], 6) for rule, stats in rules_hit.items()
+                              if stats[0]}}
+                   for seconds, _, file_path, fixed, rules_hit in sorted(self._slowest,
+                                                                         reverse=True)]
+        return {
+            'fixer': self.fixer,
+            'files': self.files,
+            'fixed': self.fixed,
+            'cached': self.cached,
+            'wall_seconds': round(time.perf_counter() - self.start, 6),
+            'file_seconds': round(self.file_seconds, 6),
+            'rule_seconds': round(rule_seconds, 6),
+            'rules': rules,
+            'slowest_files': slowest,
+        }
+
+    def write(self, path):
+        """Write the report to path and print a one-line summary"""
+        report = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"Profile: {report['rule_seconds']:.3f} s in rules, "
+              f"{report['file_seconds']:.3f} s per file in total, written to {path}")
@@ -0,0 +1,236 @@
+"""
+Declarative fixer rules, run by one shared line loop
+
+A rule is data: the kind of line that triggers it, the kinds of the lines
+it strips, and (implicitly) the kinds that stop the run - any non-blank
+line the run does not continue over. A Pack is an ordered list of rules
+with a name, run by fix_lines() over a list or by stream_lines() as a
+generator for --stream; both give the same result. Lines are classified
+once by fixers.classify, so a rule costs a table lookup on the lines
+whose kind it names and nothing on the others.
+
+    PACK = rules.Pack('simple_safe', [
+        rules.Dedupe('duplicate_export', classify.EXPORT_DEFAULT, normalized),
+        rules.StripNext('orphaned_after_export', classify.EXPORT_DEFAULT,
+                        (classify.VALUE, classify.COLOR)),
+        rules.StripRun('orphaned_after_function', classify.CLOSE_BRACE,
+                       (classify.VALUE, classify.COLOR)),
+    ])
+
+For each line the Dedupe and StripNext rules are tried in order and the
+first that matches drops it; a line none of them drops is kept, and the
+StripRun rules are then tried on it. Rule sets that track more state
+(brace depth, string literals, whole-file patterns) keep their own loops.
+"""
+
+import re
+
+from fixers import classify, profile, scan, stream
+
+def _table(kinds):
+    """Kind lookup table from a kind code, a sequence of codes or a table"""
+    if isinstance(kinds, int):
+        return classify.kind_set(kinds)
+    if isinstance(kinds, (bytes, bytearray)):
+        return bytes(kinds)
+    return classify.kind_set(*kinds)
+
+def normalized(stripped):
+    """Key under which two lines differing only in whitespace are the same"""
+    return re.sub(r'\s+', ' ', stripped)
+
+class Rule:
+    """Base of the rule types: a name, a trigger kind table and a message
+
+    message is printed when the rule matches, formatted with line, the
+    1-based number of the first non-blank line removed.
+    """
+
+    def __init__(self, name, trigger, message=None):
+        self.name = name
+        self.trigger = _table(trigger)
+        self.message = message
+
+class Dedupe(Rule):
+    """Drop a trigger line whose key(stripped line) was seen on an earlier one
+
+    With blanks, the blank lines after a dropped line go with it.
+    """
+
+    def __init__(self, name, trigger, key, blanks=False, message=None):
+        super().__init__(name, trigger, message)
+        self.key = key
+        self.blanks = blanks
+
+class StripNext(Rule):
+    """Drop a line of a strip kind directly after a trigger line
+
+    With run, the blank lines and lines of run kinds that follow it are
+    dropped too, up to the first other non-blank line.
+    """
+
+    def __init__(self, name, trigger, strip, run=None, message=None):
+        super().__init__(name, trigger, message)
+        self.strip = _table(strip)
+        self.stops = classify.NON_BLANK if run is None else scan.run_stops(_table(run))
+        self.run = run is not None
+
+class StripRun(Rule):
+    """After a trigger line, drop a run of strip lines and the blanks before it
+
+    Fires when the first non-blank line after the trigger line has a strip
+    kind; the trigger line stays and everything up to the first non-blank
+    line of another kind goes. A trigger on the first line is ignored.
+    """
+
+    def __init__(self, name, trigger, strip, message=None):
+        super().__init__(name, trigger, message)
+        self.strip = _table(strip)
+        self.stops = scan.run_stops(self.strip)
+
+class Pack:
+    """A named, ordered list of rules that runs as one rule set"""
+
+    def __init__(self, name, rules):
+        self.name = name
+        self.rules = list(rules)
+        self.drop_rules = [rule for rule in self.rules if not isinstance(rule, StripRun)]
+        self.run_rules = [rule for rule in self.rules if isinstance(rule, StripRun)]
+        # Kinds of the lines any rule has to look at; the rest are kept
+        # with a single lookup
+        active = bytearray(256)
+        for rule in self.rules:
+            table = rule.strip if isinstance(rule, StripNext) else rule.trigger
+            for kind in range(256):
+                active[kind] |= table[kind]
+        self.active = bytes(active)
+
+    def fix_lines(self, lines):
+        """Return lines with the pack's rules applied"""
+        timer = profile.timer(self.name)
+        new_lines = []
+
+        # Kind of every line, and lookahead indexes remembered between
+        # lookups instead of rescanning
+        kinds = classify.classify_lines(lines)
+        next_line = scan.next_nonblank(kinds)
+        run_end = {rule: scan.Lookahead(kinds, rule.stops)
+                   for rule in self.rules if isinstance(rule, StripRun) or
+                   isinstance(rule, StripNext) and rule.run}
+        if timer:
+            timer.lap('scan', examined=len(lines))
+
+        active = self.active
+        seen = {rule: set() for rule in self.rules if isinstance(rule, Dedupe)}
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            kind = kinds[i]
+            if not active[kind]:
+                new_lines.append(line)
+                i += 1
+                continue
+
+            end = None
+            for rule in self.drop_rules:
+                if isinstance(rule, Dedupe):
+                    if rule.trigger[kind]:
+                        key = rule.key(line.strip())
+                        if key in seen[rule]:
+                            end = next_line[i + 1] if rule.blanks else i + 1
+                            break
+                        seen[rule].add(key)
+                elif i > 0 and rule.trigger[kinds[i - 1]] and rule.strip[kind]:
+                    end = run_end[rule][i + 1] if rule.run else i + 1
+                    break
+            if end is not None:
+                if rule.message:
+                    print(rule.message.format(line=i + 1))
+                if timer:
+                    timer.hit(rule.name, removed=end - i)
+                i = end
+                continue
+
+            # The trigger line stays; i moves past it
+            new_lines.append(line)
+            i += 1
+            for rule in self.run_rules:
+                if rule.trigger[kind] and i > 1:
+                    j = next_line[i]
+                    if j < len(lines) and rule.strip[kinds[j]]:
+                        end = run_end[rule][j + 1]
+                        if rule.message:
+                            print(rule.message.format(line=j + 1))
+                        if timer:
+                            timer.hit(rule.name, removed=end - i)
+                        i = end
+                        break
+
+        if timer:
+            timer.lap('line_loop', examined=len(lines))
+
+        return new_lines
+
+    def stream_lines(self, lines):
+        """Yield the lines fix_lines would return, reading ahead only over blanks"""
+        items = stream.classified(lines)
+        active = self.active
+        seen = {rule: set() for rule in self.rules if isinstance(rule, Dedupe)}
+        prev_kind = None        # kind of the previous line read
+        skip_stops = None       # stop table while skipping dropped lines
+        held = None             # a line read ahead, still to be processed
+
+        while True:
+            item = held or next(items, None)
+            held = None
+            if item is None:
+                return
+            i, line, kind = item
+
+            if skip_stops is not None:
+                if not skip_stops[kind]:
+                    prev_kind = kind
+                    continue
+                skip_stops = None
+
+            if not active[kind]:
+                yield line
+                prev_kind = kind
+                continue
+
+            dropped = None
+            for rule in self.drop_rules:
+                if isinstance(rule, Dedupe):
+                    if rule.trigger[kind]:
+                        key = rule.key(line.strip())
+                        if key in seen[rule]:
+                            dropped = rule
+                            if rule.blanks:
+                                skip_stops = classify.NON_BLANK
+                            break
+                        seen[rule].add(key)
+                elif prev_kind is not None and rule.trigger[prev_kind] and rule.strip[kind]:
+                    dropped = rule
+                    if rule.run:
+                        skip_stops = rule.stops
+                    break
+            prev_kind = kind
+            if dropped is not None:
+                if dropped.message:
+                    print(dropped.message.format(line=i + 1))
+                continue
+
+            yield line
+            if i == 0 or not any(rule.trigger[kind] for rule in self.run_rules):
+                continue
+            blanks, held = stream.next_nonblank(items)
+            for rule in self.run_rules:
+                if rule.trigger[kind] and held is not None and rule.strip[held[2]]:
+                    if rule.message:
+                        print(rule.message.format(line=held[0] + 1))
+                    skip_stops = rule.stops
+                    break
+            else:
+                yield from blanks
+                if blanks:
+                    prev_kind = classify.BLANK
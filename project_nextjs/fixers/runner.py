@@ -0,0 +1,556 @@
+"""
+Run a per-file fix function over many files, optionally on several cores
+"""
+
+import argparse
+import contextlib
+import difflib
+import io
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from fixers import exports, journal, memo, pipeline, profile, shard, stream, validate, walk, watch
+from fixers.cache import CACHE_NAME, FixerCache, fixer_name, rules_version
+from fixers.chain import Chain, Result
+from fixers.prefilter import Screening, Stats as PrefilterStats
+
+EXTENSIONS = ['*.ts', '*.tsx']
+SUFFIXES = tuple(ext[1:] for ext in EXTENSIONS)
+
+def parse_args(description, argv=None):
+    """Parse the command line options shared by all fixer scripts"""
+    parser = argparse.ArgumentParser(description=description)
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+def add_arguments(parser):
+    """Add the shared fixer options to an existing parser"""
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes (0 = one per core)')
+    parser.add_argument('--cache', action='store_true',
+                        help=f'skip files recorded as clean in {CACHE_NAME}')
+    changes = parser.add_mutually_exclusive_group()
+    changes.add_argument('--changed-since', metavar='REF',
+                         help='only fix files changed since a git revision, plus untracked files')
+    changes.add_argument('--staged', action='store_true',
+                         help='only fix files staged in the git index')
+    changes.add_argument('--watch', action='store_true',
+                         help='keep running and fix files as they are saved (Ctrl-C stops)')
+    parser.add_argument('--debounce', type=float, default=watch.DEBOUNCE, metavar='SECONDS',
+                        help=f'quiet period that ends a burst of changes in --watch mode '
+                             f'(default {watch.DEBOUNCE})')
+    parser.add_argument('--poll', action='store_true',
+                        help='poll for changes in --watch mode instead of using inotify')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='report the files that would change without writing them')
+    parser.add_argument('--diff', action='store_true',
+                        help='print a unified diff of each change instead of writing it')
+    parser.add_argument('--check', action='store_true',
+                        help='exit with status 1 at the first file that needs fixing')
+    parser.add_argument('--stream', action='store_true',
+                        help='fix each file in bounded memory, reading it in chunks and '
+                             'writing through a temporary file (for very large files)')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='time each rule and write a JSON report of the slowest '
+                             'rules and files to FILE')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='overlap reading and writing files with fixing them, '
+                             'for slow or network filesystems')
+    parser.add_argument('--queue-depth', type=int, default=pipeline.QUEUE_DEPTH, metavar='N',
+                        help=f'files read ahead and waiting to be written in --pipeline '
+                             f'mode (default {pipeline.QUEUE_DEPTH})')
+    parser.add_argument('--memo', action='store_true',
+                        help='fix byte-identical files once and reuse the result for the copies')
+    parser.add_argument('--memo-store', action='store_true',
+                        help=f'--memo, also keeping the results in {memo.MEMO_NAME} for later runs')
+    parser.add_argument('--memo-size', type=int, default=memo.LIMIT_BYTES >> 20, metavar='MB',
+                        help=f'size of the in-run memo (default {memo.LIMIT_BYTES >> 20})')
+    parser.add_argument('--prefilter', action='store_true',
+                        help='skip files whose bytes show no rule can change them, '
+                             'without decoding them')
+    parser.add_argument('--no-validate', dest='validate', action='store_false',
+                        help='write fixed files even if their brackets, JSX tags or default '
+                             'export no longer check out (--stream is never validated)')
+    parser.add_argument('--no-journal', dest='journal', action='store_false',
+                        help=f'do not record the files this run writes in {journal.JOURNAL_NAME} '
+                             f'for --revert')
+    parser.add_argument('--revert', nargs='?', const='', metavar='JOURNAL',
+                        help="undo this script's last journaled run (or the journal given) "
+                             "instead of fixing")
+    parser.add_argument('--revert-file', action='append', default=[], metavar='PATTERN',
+                        help='--revert only the files matching a glob, relative to src '
+                             '(may be repeated)')
+    parser.add_argument('--revert-rule', action='append', default=[], metavar='RULE_SET',
+                        help="--revert only this rule set's edits, keeping the others "
+                             "(may be repeated)")
+    parser.add_argument('--shard', type=shard.parse_shard, metavar='I/N',
+                        help='fix only shard I of N, split by path hash and rebalanced by '
+                             'size (for CI nodes)')
+    parser.add_argument('--report', metavar='FILE',
+                        help='write the per-file results and timings of the run to FILE')
+    parser.add_argument('--merge', nargs='+', metavar='REPORT',
+                        help='print the results of the --report files of all shards '
+                             'as one run, without fixing anything')
+    parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                        help='skip files and directories matching a .gitignore-style '
+                             'pattern, relative to src (may be repeated)')
+    parser.add_argument('--no-gitignore', dest='gitignore', action='store_false',
+                        help='also fix files that .gitignore excludes')
+
+def source_entries(src_dir, exclude=(), gitignore=True):
+    """List (path, os.DirEntry) for the .ts and .tsx files under src_dir
+
+    One fixers.walk pass in the usual order: the .ts files, then the .tsx
+    files. Files and directories matched by exclude, or by .gitignore
+    unless gitignore is false, are left out.
+    """
+    ignore = walk.IgnoreRules(src_dir, exclude, gitignore)
+    found = walk.walk(src_dir, SUFFIXES, ignore)
+    return [item for suffix in SUFFIXES for item in found[suffix]]
+
+def source_files(src_dir, exclude=(), gitignore=True):
+    """List the .ts and .tsx files under src_dir in the usual order"""
+    return [file_path for file_path, _ in source_entries(src_dir, exclude, gitignore)]
+
+def _git_files(src_dir, *git_args):
+    """Run a git listing command in src_dir and return the paths it prints"""
+    try:
+        result = subprocess.run(['git', *git_args, '-z', '--', '.'], cwd=src_dir,
+                                capture_output=True, text=True, encoding='utf-8')
+    except OSError as e:
+        sys.exit(f"Cannot run git: {e}")
+    if result.returncode != 0:
+        sys.exit(f"git {' '.join(git_args)} failed: {result.stderr.strip()}")
+    return [name for name in result.stdout.split('\0') if name]
+
+def changed_files(src_dir, since=None, staged=False, exclude=()):
+    """List the .ts and .tsx files under src_dir that git reports as changed
+
+    With staged, the files added to the index; otherwise the files that
+    differ from revision since in the working tree, plus untracked files
+    that are not ignored. Deleted files and files matched by exclude are
+    left out.
+    """
+    if not src_dir.is_dir():
+        return []
+    if staged:
+        names = _git_files(src_dir, 'diff', '--cached', '--name-only', '--relative',
+                           '--diff-filter=d')
+    else:
+        names = _git_files(src_dir, 'diff', '--name-only', '--relative',
+                           '--diff-filter=d', since)
+        names += _git_files(src_dir, 'ls-files', '--others', '--exclude-standard')
+
+    ignore = walk.IgnoreRules(src_dir, exclude, gitignore=False)
+    files = []
+    for suffix in SUFFIXES:
+        files.extend(src_dir / name for name in sorted(set(names))
+                     if name.endswith(suffix) and (src_dir / name).is_file()
+                     and not ignore.ignored(src_dir / name))
+    return files
+
+def _signature(file_path):
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def watch_files(fix_func, src_dir, args):
+    """Yield (file_path, fixed) for source files as they change, until Ctrl-C
+
+    Each debounced burst of changes is fixed as one batch, followed by a
+    line with the batch time and the latency from the first event. The
+    fixer's own writes also trigger events; a file whose mtime and size
+    still match what was just written is skipped so it is not fixed again.
+    """
+    ignore = walk.IgnoreRules(src_dir, args.exclude, args.gitignore)
+    watcher = watch.open_watcher(src_dir, args.poll)
+    method = 'inotify' if isinstance(watcher, watch.InotifyWatcher) else 'polling'
+    print(f"Watching {src_dir} ({method}), press Ctrl-C to stop")
+
+    written = {}
+    try:
+        for paths, first_event in watch.changes(watcher, args.debounce):
+            start = time.perf_counter()
+            batch = []
+            for file_path in paths:
+                signature = _signature(file_path)
+                if signature is None or not file_path.name.endswith(SUFFIXES):
+                    continue
+                if ignore.ignored(file_path):
+                    continue
+                if written.pop(file_path, None) == signature:
+                    continue
+                batch.append(file_path)
+            if not batch:
+                continue
+
+            fixed_count = 0
+            for file_path, fixed in zip(batch, _map(fix_func, batch, args.jobs or 1, None)):
+                if fixed:
+                    fixed_count += 1
+                    written[file_path] = _signature(file_path)
+                yield file_path, fixed
+
+            end = time.perf_counter()
+            print(f"Watch: {fixed_count} of {len(batch)} changed files fixed in "
+                  f"{(end - start) * 1000:.1f} ms, {(end - first_event) * 1000:.1f} ms "
+                  f"after the first event")
+    except KeyboardInterrupt:
+        print()
+    finally:
+        watcher.close()
+
+def _run_captured(fix_func, file_path):
+    """Run fix_func in a worker, keeping its output for the parent to print"""
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        fixed = fix_func(file_path)
+    return fixed, buf.getvalue()
+
+def unified_diff(name, original, new_content):
+    """Return a git-style unified diff between two versions of a file"""
+    diff = []
+    for line in difflib.unified_diff(original.splitlines(keepends=True),
+                                     new_content.splitlines(keepends=True),
+                                     f'a/{name}', f'b/{name}'):
+        diff.append(line)
+        if not line.endswith('\n'):
+            diff.append('\n\\ No newline at end of file\n')
+    return ''.join(diff)
+
+def fix_file(fix_lines, file_path):
+    """Apply fix_lines to a file, writing it only if it changes"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except Exception as e:
+        print(f"Error reading {file_path}: {e}")
+        return False
+
+    new_content = '\n'.join(fix_lines(content.split('\n')))
+    if new_content == content or not validate.accepts(file_path, content, new_content):
+        return False
+    try:
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(new_content)
+        return True
+    except Exception as e:
+        print(f"Error writing {file_path}: {e}")
+        return False
+
+def preview_file(fix_lines, file_path, base=None, show_diff=False):
+    """Report whether fix_lines would change a file, without writing it
+
+    With show_diff the proposed change is printed as a unified diff, with
+    paths relative to base.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except Exception as e:
+        print(f"Error reading {file_path}: {e}")
+        return False
+    return preview_content(fix_lines, file_path, content, base, show_diff)
+
+def preview_content(fix_lines, file_path, content, base=None, show_diff=False):
+    """preview_file for content already read from file_path"""
+    new_content = '\n'.join(fix_lines(content.split('\n')))
+    if new_content == content or not validate.accepts(file_path, content, new_content):
+        return False
+
+    if show_diff:
+        name = file_path.relative_to(base) if base else file_path
+        print(unified_diff(name.as_posix(), content, new_content), end='')
+    return True
+
+def run(fix_func, src_dir, args, fix_lines=None, stream_lines=None, prefilter=None):
+    """Yield (file_path, fixed) for the source files under src_dir
+
+    This is what the fixer main() loops iterate over; it applies the
+    shared command line options. --changed-since and --staged narrow the
+    files to those git reports as changed, and --watch keeps fixing files
+    as they are saved. --exclude and .gitignore (unless --no-gitignore)
+    leave files out. fix_lines is the line transform behind fix_func;
+    --dry-run, --diff and --check run it instead, so nothing is written,
+    and --check exits at the first file that would change. stream_lines is
+    the generator form of fix_lines that --stream runs through
+    fixers.stream; --pipeline also runs fix_lines, through fixers.pipeline,
+    and --memo runs it through fixers.memo in place of fix_func. prefilter
+    is the fixer's fixers.prefilter.Prefilter; --prefilter skips the files
+    it rules out before anything else looks at them. Unless --no-validate
+    is given, a fixed text is only written if fixers.validate finds it no
+    more broken than the original, and unless --no-journal is given the
+    files written are recorded by fixers.journal for --revert, which
+    undoes a run instead of fixing. If the export index of fixers.exports
+    exists, the files written are rescanned into it. --shard
+    keeps this node's share of the files and --merge replays the --report
+    files of all shards instead of fixing. With --profile or --report the
+    report is written when the run ends, however it ends. What these
+    options do for each file is a stage of one fixers.chain.Chain, the
+    same in every mode.
+    """
+    fixer = fixer_name(fix_func)
+    if args.merge:
+        yield from shard.merged(args.merge, fixer, src_dir.parent)
+        return
+    if args.revert is not None:
+        path = journal.find(src_dir.parent, fixer, args.revert or None)
+        failed = journal.revert(path, src_dir.parent, src_dir, args.revert_file,
+                                args.revert_rule)
+        sys.exit(1 if failed else 0)
+    if args.shard and args.watch:
+        sys.exit("--shard cannot be combined with --watch")
+
+    cache = None
+    if args.cache and not args.watch:
+        cache = FixerCache.for_fixer(src_dir.parent / CACHE_NAME, fix_func, args.validate)
+
+    profiler = None
+    if args.profile:
+        profiler = profile.Profiler(fixer_name(fix_func), base=src_dir.parent)
+
+    memo_stats = None
+    if args.memo or args.memo_store:
+        if fix_lines is None:
+            sys.exit("This fixer does not support --memo")
+        if args.stream:
+            sys.exit("--memo cannot be combined with --stream")
+        store = src_dir.parent / memo.MEMO_NAME if args.memo_store else None
+        memo_lines = memo.Memo(fix_lines, fixer_name(fix_func), rules_version(),
+                               args.memo_size << 20, store)
+        fix_lines = memo_lines.fix_lines
+        fix_func = partial(fix_file, fix_lines)
+        memo_stats = memo.Stats()
+
+    prefilter_stats = None
+    if args.prefilter:
+        if prefilter is None:
+            sys.exit("This fixer does not support --prefilter")
+        if args.stream:
+            sys.exit("--prefilter cannot be combined with --stream")
+        prefilter_stats = PrefilterStats()
+
+    validate_stats = None
+    if args.validate and not args.stream:
+        validate_stats = validate.Stats()
+
+    journal_log = None
+    if args.journal and not (args.stream or args.dry_run or args.diff or args.check):
+        journal_log = journal.Journal(fixer, src_dir.parent)
+        # Edits not recorded per rule set are the script's
+        rule = journal.rule_name(fixer.split('.')[0])
+
+    export_index = None
+    if not (args.dry_run or args.diff or args.check):
+        export_index = exports.for_run(src_dir)
+
+    report = None
+    if args.report:
+        report = shard.Report(fixer, src_dir.parent, args.shard or (1, 1))
+
+    # One chain for every mode, outermost stage first, and the collectors
+    # that take in what the stages leave in each Result
+    stages = []
+    if report is not None:
+        stages.append(shard.Timing())
+    if profiler is not None:
+        stages.append(profile.Profiling())
+    if prefilter_stats is not None:
+        stages.append(Screening(prefilter))
+    if journal_log is not None:
+        stages.append(journal.Journaling(rule))
+    if validate_stats is not None:
+        stages.append(validate.Validating())
+    if memo_stats is not None:
+        stages.append(memo.Recalling(memo_lines))
+    collectors = [collector for collector in (report, profiler, prefilter_stats, journal_log,
+                                              validate_stats, memo_stats, export_index)
+                  if collector is not None]
+
+    map_files = None
+    if args.pipeline:
+        if fix_lines is None:
+            sys.exit("This fixer does not support --pipeline")
+        if args.stream or args.watch or args.jobs != 1:
+            sys.exit("--pipeline cannot be combined with --stream, --watch or --jobs")
+        if args.dry_run or args.diff or args.check:
+            fix = partial(_preview_stage, fix_lines, base=src_dir.parent, show_diff=args.diff)
+        else:
+            fix = partial(pipeline.fix_content, fix_lines)
+        map_files = partial(pipeline.run_pipeline, Chain(fix, stages), depth=args.queue_depth,
+                            write=not (args.dry_run or args.diff or args.check))
+
+    if args.stream:
+        if stream_lines is None:
+            sys.exit("This fixer does not support --stream")
+        if args.diff:
+            sys.exit("--diff cannot be combined with --stream")
+        fix_func = partial(stream.fix_file, stream_lines,
+                           write=not (args.dry_run or args.check))
+    elif args.dry_run or args.diff or args.check:
+        if fix_lines is None:
+            sys.exit("This fixer does not support --dry-run, --diff or --check")
+        fix_func = partial(preview_file, fix_lines, base=src_dir.parent,
+                           show_diff=args.diff)
+    fix_func = Chain(fix_func, stages)
+
+    try:
+        if args.watch:
+            results = watch_files(fix_func, src_dir, args)
+            yield from _collected(results, collectors)
+            return
+
+        entries = None
+        if args.changed_since or args.staged:
+            file_paths = changed_files(src_dir, args.changed_since, args.staged, args.exclude)
+        else:
+            # Keep the walk's DirEntry objects so the cache reuses their stat
+            found = source_entries(src_dir, args.exclude, args.gitignore)
+            file_paths = [file_path for file_path, _ in found]
+            entries = dict(found)
+
+        if args.shard or report is not None:
+            file_paths = _select_shard(src_dir, file_paths, entries, args.shard or (1, 1),
+                                       report)
+
+        results = run_files(fix_func, file_paths, args.jobs, cache=cache, entries=entries,
+                            map_files=map_files)
+        for file_path, fixed in _collected(results, collectors):
+            if fixed and args.check:
+                if cache is not None:
+                    cache.save()
+                print(f"Would fix: {file_path.relative_to(src_dir.parent)}")
+                sys.exit(1)
+            yield file_path, fixed
+        if prefilter_stats is not None:
+            prefilter_stats.report()
+        if validate_stats is not None:
+            validate_stats.report()
+        if memo_stats is not None:
+            memo_stats.report()
+    finally:
+        if profiler is not None:
+            profiler.write(args.profile)
+        if report is not None:
+            report.write(args.report)
+        if journal_log is not None:
+            journal_log.write()
+        if export_index is not None and export_index.dirty:
+            export_index.save()
+
+def _collected(results, collectors):
+    """Hand each (file_path, Result) to the collectors, yielding (file_path, fixed)"""
+    for file_path, result in results:
+        for collector in collectors:
+            collector.add(file_path, result)
+        yield file_path, result.fixed
+
+def _select_shard(src_dir, file_paths, entries, shard_spec, report=None):
+    """Keep the files of one shard, noting their positions in the report
+
+    Paths are hashed relative to src_dir, so nodes with the checkout in
+    different places agree on the split.
+    """
+    index, count = shard_spec
+    sizes = []
+    entries = entries or {}
+    for file_path in file_paths:
+        entry = entries.get(file_path)
+        try:
+            sizes.append((entry.stat() if entry is not None else os.stat(file_path)).st_size)
+        except OSError:
+            sizes.append(0)
+    rels = [os.path.relpath(file_path, src_dir).replace(os.sep, '/') for file_path in file_paths]
+    shards = shard.assign(rels, sizes, count)
+    selected = [k for k, number in enumerate(shards) if number == index]
+    if report is not None:
+        report.total = len(file_paths)
+        report.bytes = sum(sizes[k] for k in selected)
+        report.positions = {file_paths[k]: k for k in selected}
+    return [file_paths[k] for k in selected]
+
+def _map(fix_func, file_paths, jobs, chunksize):
+    """Yield fix_func(file_path) for each file, serially or in a pool"""
+    if jobs <= 1 or len(file_paths) <= 1:
+        for file_path in file_paths:
+            yield fix_func(file_path)
+        return
+
+    if chunksize is None:
+        chunksize = max(1, len(file_paths) // (jobs * 4))
+
+    pool = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        results = pool.map(_run_captured, [fix_func] * len(file_paths),
+                           file_paths, chunksize=chunksize)
+        for fixed, output in results:
+            if output:
+                print(output, end='')
+            yield fixed
+    finally:
+        # Drop queued chunks if the caller stops early (e.g. --check)
+        pool.shutdown(cancel_futures=True)
+
+def _entry_stat(entry):
+    try:
+        return entry.stat()
+    except OSError:
+        return None
+
+def _preview_stage(fix_lines, file_path, content, base=None, show_diff=False):
+    return preview_content(fix_lines, file_path, content, base, show_diff), None
+
+def run_files(fix_func, file_paths, jobs=1, chunksize=None, cache=None, entries=None,
+              map_files=None):
+    """Yield (file_path, fixed) for each file, in the order given
+
+    With jobs > 1 the files are handed to a process pool in chunks. Anything
+    fix_func prints is replayed just before its result is yielded, so the
+    output is the same as a serial run. Files the cache knows to be clean
+    are reported as an unfixed fixers.chain.Result without running
+    fix_func, and a file is only recorded as clean if fix_func (a
+    fixers.chain.Chain) had no new text for it. entries maps file paths to
+    the os.DirEntry objects of the walk, whose stat results the cache
+    check uses instead of calling os.stat again. map_files, if given,
+    replaces the serial or pool loop: it takes the files to fix and yields
+    their results in order (fixers.pipeline.run_pipeline).
+    """
+    file_paths = list(file_paths)
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    if map_files is None:
+        map_files = partial(_map, fix_func, jobs=jobs, chunksize=chunksize)
+
+    if cache is None:
+        yield from zip(file_paths, map_files(file_paths))
+        return
+
+    entries = entries or {}
+    clean = []
+    for file_path in file_paths:
+        entry = entries.get(file_path)
+        clean.append(cache.is_clean(file_path, None if entry is None else _entry_stat(entry)))
+    pending = [file_path for file_path, hit in zip(file_paths, clean) if not hit]
+    results = map_files(pending)
+
+    for file_path, hit in zip(file_paths, clean):
+        if hit:
+            yield file_path, Result()
+            continue
+        result = next(results)
+        if result.changed:
+            # Fixed, or refused by validation, or the write failed
+            cache.forget(file_path)
+        else:
+            cache.mark_clean(file_path)
+        yield file_path, result
+
+    cache.save()
+    print(f"Cache: {cache.hits} hits, {cache.misses} misses")
@@ -0,0 +1,45 @@
+"""
+Memoised lookahead indexes for the fixer line loops
+
+The fixers used to start a fresh forward scan at every closing brace or
+export line, re-classifying the same lines over and over. A Lookahead
+works on the per-line kind codes from fixers.classify and answers "first
+index at or after k where the scan stops". It remembers the span it
+covered: the fixer loops only ever ask about positions at or after the
+current line, so a later question that lands inside that span has the
+same answer and a whole file is processed in O(lines).
+"""
+
+from fixers.classify import NON_BLANK
+
+class Lookahead:
+    """First index >= k whose kind is in stop_kinds (len(kinds) if none)"""
+
+    def __init__(self, kinds, stop_kinds):
+        # One byte per line, 1 where the scan stops
+        self.stops = kinds.translate(stop_kinds)
+        # Every line in [start, end) is known not to stop the scan
+        self.start = 0
+        self.end = -1
+
+    def __getitem__(self, k):
+        if self.start <= k <= self.end:
+            return self.end
+        j = self.stops.find(1, k)
+        if j < 0:
+            j = len(self.stops)
+        self.start = k
+        self.end = j
+        return j
+
+def next_nonblank(kinds):
+    """Index of the first non-blank line at or after each position"""
+    return Lookahead(kinds, NON_BLANK)
+
+def run_stops(run_kinds):
+    """Stop table for a run of orphaned lines, for use with Lookahead
+
+    A run continues over blank lines and lines whose kind is in run_kinds;
+    it ends at the first other line (or at len(lines)).
+    """
+    return bytes(NON_BLANK[kind] and not run_kinds[kind] for kind in range(256))
@@ -0,0 +1,231 @@
+"""
+Long-lived fixer server speaking line-delimited JSON-RPC 2.0 on stdin/stdout
+
+Editor save hooks and lint-staged used to start a fixer script per batch,
+paying interpreter startup, imports and a src walk each time. The server
+(fix_engine.py --serve) loads the rules once and then answers one JSON
+request per line, with one JSON response per line, in order:
+
+    {"jsonrpc": "2.0", "id": 1, "method": "fix_text",
+     "params": {"text": "...", "path": "src/app/page.tsx", "diff": true}}
+    {"jsonrpc": "2.0", "id": 1, "result": {"changed": true, "text": "...",
+     "diff": "--- a/src/app/page.tsx ...", "messages": []}}
+
+Methods:
+
+  fix_text    params text, and optionally rules (profile or rule set
+              names, default those the server was started with), path (the
+              name used in the diff and to tell .ts from .tsx), diff and
+              validate (default true). Returns changed, the fixed text,
+              the diff if asked for, and what the rules printed; a fix
+              that fails validation (fixers.validate) is dropped, and its
+              reason returned as rejected.
+  fix_paths   params paths (relative to the server's working directory),
+              and optionally rules, diff, write (default true) and
+              validate. Fixes the files in place; returns one {path,
+              changed, diff?, error?} per path, and a file that fails
+              validation is left alone with the reason in error.
+  rule_sets   the rule sets and profiles that rules may name.
+  shutdown    answers null, then the server exits (so does end of input).
+
+Requests without an id are notifications and get no response; a JSON
+array is a batch. Errors use the JSON-RPC codes. Anything the rules print
+is returned in messages, never written to stdout.
+"""
+
+import contextlib
+import io
+import json
+import sys
+
+from fixers import runner, validate
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+class RpcError(Exception):
+    """A JSON-RPC error response"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+class Server:
+    """Answers fixer requests with rules that stay loaded between them
+
+    resolve(names) returns the fix_lines function for a list of profile or
+    rule set names, raising ValueError for an unknown name; catalog is
+    what rule_sets returns.
+    """
+
+    def __init__(self, resolve, default_rules, catalog=None):
+        self.resolve = resolve
+        self.default_rules = list(default_rules)
+        self.catalog = catalog or {}
+        self.running = True
+        # Rule names -> fix_lines, so each combination is resolved once
+        self._fixers = {}
+        self._methods = {
+            'fix_text': self.fix_text,
+            'fix_paths': self.fix_paths,
+            'rule_sets': self.rule_sets,
+            'shutdown': self.shutdown,
+        }
+
+    def _fix_lines(self, params):
+        names = params.get('rules', self.default_rules)
+        if isinstance(names, str):
+            names = [names]
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise RpcError(INVALID_PARAMS, "rules must be a list of names")
+        key = tuple(names)
+        fix_lines = self._fixers.get(key)
+        if fix_lines is None:
+            try:
+                fix_lines = self._fixers[key] = self.resolve(names)
+            except ValueError as e:
+                raise RpcError(INVALID_PARAMS, str(e))
+        return fix_lines
+
+    @staticmethod
+    def _run(fix_lines, text):
+        """Fixed text and the lines the rules printed"""
+        buf = io.StringIO()
+        with contextlib.redirect_stdout(buf):
+            new_text = '\n'.join(fix_lines(text.split('\n')))
+        return new_text, buf.getvalue().splitlines()
+
+    @staticmethod
+    def _problem(params, path, text, new_text):
+        """Why new_text must not replace text, or None (also if validate is off)"""
+        if new_text == text or not params.get('validate', True):
+            return None
+        return validate.problem(path, text, new_text)
+
+    def fix_text(self, params):
+        text = params.get('text')
+        if not isinstance(text, str):
+            raise RpcError(INVALID_PARAMS, "text must be a string")
+        fix_lines = self._fix_lines(params)
+        new_text, messages = self._run(fix_lines, text)
+        reason = self._problem(params, params.get('path') or '', text, new_text)
+        if reason is not None:
+            new_text = text
+        result = {'changed': new_text != text, 'text': new_text, 'messages': messages}
+        if reason is not None:
+            result['rejected'] = reason
+        if params.get('diff'):
+            name = params.get('path') or 'buffer'
+            result['diff'] = runner.unified_diff(str(name), text, new_text)
+        return result
+
+    def fix_paths(self, params):
+        paths = params.get('paths')
+        if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+            raise RpcError(INVALID_PARAMS, "paths must be a list of strings")
+        fix_lines = self._fix_lines(params)
+        write = params.get('write', True)
+        files = []
+        for path in paths:
+            entry = {'path': path, 'changed': False}
+            files.append(entry)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except Exception as e:
+                entry['error'] = f"Error reading {path}: {e}"
+                continue
+            new_text, messages = self._run(fix_lines, text)
+            if messages:
+                entry['messages'] = messages
+            if new_text == text:
+                continue
+            reason = self._problem(params, path, text, new_text)
+            if reason is not None:
+                entry['error'] = f"Not written: {path}: {reason}"
+                continue
+            if params.get('diff'):
+                entry['diff'] = runner.unified_diff(path, text, new_text)
+            if write:
+                try:
+                    with open(path, 'w', encoding='utf-8') as f:
+                        f.write(new_text)
+                except Exception as e:
+                    entry['error'] = f"Error writing {path}: {e}"
+                    continue
+            entry['changed'] = True
+        return {'files': files}
+
+    def rule_sets(self, params):
+        return self.catalog
+
+    def shutdown(self, params):
+        self.running = False
+        return None
+
+    def handle(self, request):
+        """Return the response to one decoded request, or None for a notification"""
+        if not isinstance(request, dict) or request.get('jsonrpc') != '2.0' \
+                or not isinstance(request.get('method'), str):
+            return _error(request.get('id') if isinstance(request, dict) else None,
+                          INVALID_REQUEST, "Invalid request")
+        request_id = request.get('id')
+        notification = 'id' not in request
+        params = request.get('params', {})
+        try:
+            method = self._methods.get(request['method'])
+            if method is None:
+                raise RpcError(METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+            if not isinstance(params, dict):
+                raise RpcError(INVALID_PARAMS, "params must be an object")
+            result = method(params)
+        except RpcError as e:
+            response = _error(request_id, e.code, e.message)
+        except Exception as e:
+            response = _error(request_id, INTERNAL_ERROR, f"{type(e).__name__}: {e}")
+        else:
+            response = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        return None if notification else response
+
+    def handle_line(self, line):
+        """Return the JSON response line for one request line, or None"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = _error(None, PARSE_ERROR, f"Parse error: {e}")
+        else:
+            if isinstance(request, list):
+                if not request:
+                    response = _error(None, INVALID_REQUEST, "Empty batch")
+                else:
+                    response = [r for r in map(self.handle, request) if r is not None] or None
+            else:
+                response = self.handle(request)
+        if response is None:
+            return None
+        return json.dumps(response, ensure_ascii=False, separators=(',', ':'))
+
+    def serve(self, stdin=None, stdout=None):
+        """Answer requests from stdin until shutdown or end of input"""
+        if stdin is None:
+            stdin = sys.stdin
+            stdin.reconfigure(encoding='utf-8')
+        if stdout is None:
+            stdout = sys.stdout
+            stdout.reconfigure(encoding='utf-8')
+        for line in stdin:
+            if not line.strip():
+                continue
+            response = self.handle_line(line)
+            if response is not None:
+                stdout.write(response + '\n')
+                stdout.flush()
+            if not self.running:
+                break
+
+def _error(request_id, code, message):
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
@@ -0,0 +1,172 @@
+"""
+Split a fixer run across CI nodes (--shard I/N) and merge the reports
+
+Every node walks the same checkout and keeps only its share of the files.
+A file's shard is a sha1 of its path mod N, so adding, removing or
+editing files moves no other file between shards. File sizes are
+log-normal, so a hash split can leave one shard with far more bytes than
+the rest; as a second step, a shard more than 2% over its share of the
+bytes gives files to the lightest shard, largest first, each only if it
+fits in the excess. Only files of the overloaded shards move. All of it
+depends only on the paths and sizes, so every node computes the same
+split without talking to the others.
+
+With --report a run writes a JSON report: the fixer, the shard, and per
+file its position in the full file list, whether it was fixed, the time
+it took and what the fixer printed for it. --merge reads the reports of
+all N shards and replays them in the order of an unsharded run, so the
+script's main() prints the same lines and summary as a single run would.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+
+from fixers import chain
+
+FORMAT_VERSION = 1
+
+# How far over its share of the bytes a shard may be before files move
+_SLACK = 0.02
+
+def parse_shard(text):
+    """argparse type for I/N, 1 <= I <= N"""
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, got {text!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {index} is not between 1 and {count}")
+    return index, count
+
+def _path_hash(rel):
+    return hashlib.sha1(rel.encode('utf-8', 'surrogatepass')).hexdigest()
+
+def assign(rels, sizes, count):
+    """Shard number (1-based) of each file: its path hash, rebalanced by bytes"""
+    hashes = [_path_hash(rel) for rel in rels]
+    shards = [int(digest, 16) % count + 1 for digest in hashes]
+    loads = [0] * (count + 1)
+    for shard, size in zip(shards, sizes):
+        loads[shard] += size
+    share = sum(sizes) / count
+    limit = share * (1 + _SLACK)
+    if max(loads) <= limit:
+        return shards
+    for k in sorted(range(len(rels)), key=lambda k: (-sizes[k], hashes[k])):
+        source = shards[k]
+        if loads[source] <= limit or sizes[k] > loads[source] - share:
+            continue
+        target = min(range(1, count + 1), key=loads.__getitem__)
+        if loads[target] + sizes[k] > limit:
+            continue
+        shards[k] = target
+        loads[source] -= sizes[k]
+        loads[target] += sizes[k]
+    return shards
+
+class Timing(chain.Stage):
+    """Keeps the time of each file and what the fixer printed for it (--report)"""
+
+    def around(self, result, file_path, content, proceed):
+        buf = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(buf):
+            new_content = proceed()
+        result.seconds = time.perf_counter() - start
+        result.output = buf.getvalue()
+        if result.output:
+            print(result.output, end='')
+        return new_content
+
+class Report:
+    """Per-file results of one (possibly sharded) run"""
+
+    def __init__(self, fixer, base, shard=(1, 1), total=0, positions=None):
+        self.fixer = fixer
+        self.base = base
+        self.shard = shard
+        self.total = total
+        # file_path -> position in the full, unsharded file list
+        self.positions = positions or {}
+        self.start = time.perf_counter()
+        self.files = []
+        self.bytes = 0
+
+    def add(self, file_path, result):
+        """Record one fixers.chain.Result"""
+        self.files.append({
+            'path': os.path.relpath(file_path, self.base).replace(os.sep, '/'),
+            'index': self.positions.get(file_path, len(self.files)),
+            'fixed': bool(result.fixed),
+            'seconds': round(result.seconds, 6),
+            'output': result.output,
+        })
+
+    def write(self, path):
+        """Write the report to path and print a one-line summary"""
+        fixed = sum(entry['fixed'] for entry in self.files)
+        wall = time.perf_counter() - self.start
+        report = {
+            'format': FORMAT_VERSION,
+            'fixer': self.fixer,
+            'shard': list(self.shard),
+            'total_files': self.total,
+            'bytes': self.bytes,
+            'fixed': fixed,
+            'wall_seconds': round(wall, 6),
+            'file_seconds': round(sum(entry['seconds'] for entry in self.files), 6),
+            'files': self.files,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+            f.write('\n')
+        print(f"Report: shard {self.shard[0]}/{self.shard[1]}, {fixed} of {len(self.files)} "
+              f"files fixed in {wall:.3f} s, written to {path}")
+
+def merged(paths, fixer, base):
+    """Yield (file_path, fixed) from the reports of all shards, in run order
+
+    Each file's recorded output is printed just before its result. Exits
+    if the reports are for another fixer or do not cover every shard once.
+    """
+    reports = []
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Cannot read report {path}: {e}")
+        if report.get('format') != FORMAT_VERSION:
+            sys.exit(f"{path} is not a fixer report")
+        if report['fixer'] != fixer:
+            sys.exit(f"{path} is a report for {report['fixer']}, not {fixer}")
+        reports.append(report)
+
+    count = reports[0]['shard'][1]
+    shards = sorted(report['shard'][0] for report in reports)
+    if any(report['shard'][1] != count for report in reports) or \
+            shards != list(range(1, count + 1)):
+        sys.exit(f"Reports cover shards {shards} of {count}, need each of 1..{count} once")
+    total = reports[0]['total_files']
+    if any(report['total_files'] != total for report in reports):
+        sys.exit("Reports come from different file lists")
+
+    entries = sorted((entry for report in reports for entry in report['files']),
+                     key=lambda entry: entry['index'])
+    if [entry['index'] for entry in entries] != list(range(len(entries))) or \
+            len(entries) > total:
+        sys.exit("Reports overlap: the shards were not split from the same tree")
+    for entry in entries:
+        if entry['output']:
+            print(entry['output'], end='')
+        yield base / entry['path'], entry['fixed']
+
+    walls = [report['wall_seconds'] for report in reports]
+    print(f"Merged {count} shard reports: {len(entries)} of {total} files, "
+          f"shard time {min(walls):.3f}-{max(walls):.3f} s")
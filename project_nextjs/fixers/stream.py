@@ -0,0 +1,150 @@
+"""
+Bounded-memory streaming for very large source files
+
+The normal fix path reads a whole file, splits it into lines, builds the
+new list and joins it, so memory peaks at several copies of the file. In
+streaming mode (--stream) the file is decoded in fixed-size chunks and
+the rules run as generators (the stream_lines_* functions of the
+fixers) that only hold the lines they look ahead over: the blank lines
+before the next non-blank one, kept as (line, count) runs. The output is
+compared with the original as it comes out, so a clean file is never
+written; a changed one goes to a temporary file next to it that is then
+renamed over it.
+"""
+
+import os
+import stat
+import tempfile
+from itertools import chain, islice, repeat
+
+from fixers import classify
+from fixers.chain import changing
+
+# Characters decoded per read
+CHUNK_SIZE = 1 << 20
+
+def read_lines(file_path, chunk_size=CHUNK_SIZE):
+    """Yield the lines of a UTF-8 file as content.split('\\n') would
+
+    The file is opened in text mode like the normal path, so line endings
+    are translated the same way.
+    """
+    partial = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            parts = chunk.split('\n')
+            if len(parts) > 1:
+                partial.append(parts[0])
+                yield ''.join(partial)
+                yield from islice(parts, 1, len(parts) - 1)
+                partial = []
+            partial.append(parts[-1])
+            if not chunk:
+                break
+    yield ''.join(partial)
+
+def classified(lines):
+    """Yield (index, line, kind) for each line"""
+    classify_line = classify.classify_line
+    for i, line in enumerate(lines):
+        yield i, line, classify_line(line)
+
+class BlankRun:
+    """Blank lines held back while looking for the next non-blank line
+
+    Stored as [line, count] runs, so a long stretch of identical blank
+    lines takes constant memory.
+    """
+
+    def __init__(self):
+        self._runs = []
+
+    def append(self, line):
+        if self._runs and self._runs[-1][0] == line:
+            self._runs[-1][1] += 1
+        else:
+            self._runs.append([line, 1])
+
+    def drop_first(self):
+        run = self._runs[0]
+        run[1] -= 1
+        if not run[1]:
+            del self._runs[0]
+
+    def __bool__(self):
+        return bool(self._runs)
+
+    def __iter__(self):
+        for line, count in self._runs:
+            yield from repeat(line, count)
+
+def next_nonblank(items):
+    """Read (index, line, kind, ...) items up to the first non-blank line
+
+    Returns (blanks, item): a BlankRun of the blank lines passed over and
+    the item of the non-blank line, or None at the end of the input.
+    """
+    blanks = BlankRun()
+    for item in items:
+        if item[2] != classify.BLANK:
+            return blanks, item
+        blanks.append(item[1])
+    return blanks, None
+
+def _write_lines(f, lines):
+    sep = ''
+    for line in lines:
+        f.write(sep)
+        f.write(line)
+        sep = '\n'
+
+def fix_file(stream_lines, file_path, write=True):
+    """Stream a file through stream_lines; return True if it changed
+
+    Nothing is written while the output matches the original. At the first
+    difference the matching prefix is copied from the original to a
+    temporary file in the same directory, followed by the rest of the
+    output, and the temporary file replaces the original when complete.
+    With write=False the file is only compared.
+    """
+    tmp_path = None
+    try:
+        output = stream_lines(read_lines(file_path))
+        original = read_lines(file_path)
+        same = 0
+        for line in output:
+            if next(original, None) != line:
+                pending = [line]
+                break
+            same += 1
+        else:
+            pending = []
+            if next(original, None) is None:
+                return False
+        original.close()
+        changing()
+
+        if not write:
+            # Run the rules to the end for their messages
+            for _ in output:
+                pass
+            return True
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path),
+                                        prefix=f'.{os.path.basename(file_path)}.',
+                                        suffix='.tmp')
+        with open(fd, 'w', encoding='utf-8') as f:
+            prefix = read_lines(file_path)
+            _write_lines(f, chain(islice(prefix, same), pending, output))
+            prefix.close()
+        os.chmod(tmp_path, stat.S_IMODE(os.stat(file_path).st_mode))
+        os.replace(tmp_path, file_path)
+        tmp_path = None
+        return True
+    except Exception as e:
+        print(f"Error fixing {file_path}: {e}")
+        return False
+    finally:
+        if tmp_path is not None:
+            os.unlink(tmp_path)
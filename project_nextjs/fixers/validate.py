@@ -0,0 +1,402 @@
+"""
+Structural check of a fixer's output before it is written
+
+The rules delete lines and insert 'return (' on line-level evidence, and
+a mistake used to surface minutes later in a full tsc or Next.js build.
+Before a changed file is written, its old and new text are scanned for:
+
+  - ( ) [ ] { } pairs, including ${ } in template literals and { } in
+    JSX, outside strings, comments, template text and regex literals
+  - JSX tags (all but .ts files): every <Tag> closed by </Tag>, in order
+  - default exports: a file that had one still has exactly one, and one
+    that had several keeps them all or goes down to exactly one
+
+The check is relative to the original, because many files the fixers see
+are broken already. The scan counts structural errors, recovering after
+each one the way a reader would (a stray closer is skipped, a closer that
+matches further down closes what was left open), and a new text with more
+errors than the old one is refused, as is one that loses its default
+export or gains one. A refused file keeps its original text (it was never
+overwritten) and counts as not fixed.
+
+The lexing is fixers.lexer's: Lexer.feed_tokens() gives each line's
+brackets and tags, with strings, comments, template text, regex literals
+and JSX text already told apart the way the fixers see them, and its memo
+makes most lines one dict lookup. What is left here is matching the
+tokens up on a stack; a line's tokens are memoised too, without the pairs
+it opens and closes itself, so a line that only opens frames is pushed
+as it is. The old and new text are scanned together: the lines before
+the first change once for both, and after the last change only until
+the two scans are back in step.
+
+The write sites call accepts(); it only checks while the file's
+fixers.chain.Chain has a Validating stage, which the runner adds unless
+--no-validate is given.
+"""
+
+import copy
+import time
+
+from fixers import chain, lexer
+
+# Frames on the checker stack: '' (top level), the brackets '(', '[', '{'
+# and '${' still open, '<name' inside an opening tag and '<>name' among
+# its children
+_ROOT = ''
+_OPENERS = frozenset(['(', '[', '{', '${'])
+_BRACES = frozenset(['{', '${'])
+_CLOSERS = {')': '(', ']': '['}
+# What it means for a text to end in a lexer state
+_UNTERMINATED = {
+    lexer.COMMENT: "unterminated comment",
+    lexer.STRING: "unterminated string",
+    lexer.TEMPLATE: "unterminated template literal",
+}
+
+_EXPORT_DEFAULT = 'export default'
+
+# Memo of a line's tokens -> (the tokens _match() needs, whether they only
+# open frames), one per JSX setting; cleared past this many entries
+_CACHE_LIMIT = 1 << 16
+_reduced = {True: {}, False: {}}
+
+def _is_open_tag(token):
+    return token[:1] == '<' and token[1:2] not in ('>', '/')
+
+def _reduce(tokens, jsx):
+    """tokens without the pairs opened and closed on the line (and without
+    the tags of a .ts file), and whether the rest only opens frames"""
+    reduced = []
+    for token in tokens:
+        if not jsx and token[:1] in ('<', '>', '/') and token != '</*':
+            continue
+        last = reduced[-1] if reduced else _ROOT
+        if last in _OPENERS and (_CLOSERS.get(token) == last
+                                 or token == '}' and last in _BRACES):
+            reduced.pop()
+        elif token == '/>' and _is_open_tag(last):
+            reduced.pop()
+        elif token == '>' and _is_open_tag(last):
+            reduced[-1] = '<>' + last[1:]
+        elif token[1:2] == '/' and token != '</*' and last == '<>' + token[2:]:
+            reduced.pop()
+        else:
+            reduced.append(token)
+    opens = all(token in _OPENERS or token[:1] == '<' and token[1:2] != '/'
+                for token in reduced)
+    return tuple(reduced), opens
+
+def _describe(frame):
+    if frame.startswith('<>'):
+        return f"<{frame[2:]}>"
+    if frame.startswith('<'):
+        return f"tag <{frame[1:]}"
+    return f"'{frame[-1]}'"
+
+class _Checker:
+    """Feed a text's lines in order; errors and first describe what did
+    not balance, exports counts the default exports"""
+
+    def __init__(self, jsx, export_lines):
+        self.jsx = jsx
+        self.lexer = lexer.Lexer()
+        self.frames = [_ROOT]
+        # Line number each frame was opened on
+        self.lines = [0]
+        # Lexer state at the start of the next line, and the line it began on
+        self.state = lexer.CODE
+        self.since = 0
+        self.errors = 0
+        self.first = None
+        self.line_no = 0
+        self.exports = 0
+        # Lines that may hold a default export (_export_lines) and the next one
+        self._export_lines = export_lines
+        self._next_export = 0
+
+    def clone(self, export_lines):
+        """A checker in the same state, for another text from here on"""
+        other = copy.copy(self)
+        other.lexer = self.lexer.copy()
+        other.frames = self.frames[:]
+        other.lines = self.lines[:]
+        other._export_lines = export_lines
+        return other
+
+    def same_state(self, other):
+        """True if the rest of a text would have the same effect on both"""
+        return self.frames == other.frames and self.lexer.same_state(other.lexer)
+
+    def feed_lines(self, lines, start, stop):
+        """Check lines[start:stop], the next lines of the text"""
+        if start >= stop:
+            return
+        first = self.line_no + 1
+        states = bytearray()
+        reduced = _reduced[self.jsx]
+        frames = self.frames
+        frame_lines = self.lines
+        for line_no, tokens in enumerate(
+                self.lexer.feed_lines_tokens(lines, start, stop, states), first):
+            if not tokens:
+                continue
+            effect = reduced.get(tokens)
+            if effect is None:
+                if len(reduced) >= _CACHE_LIMIT:
+                    reduced.clear()
+                effect = reduced[tokens] = _reduce(tokens, self.jsx)
+            tokens, opens = effect
+            if opens:
+                frames += tokens
+                frame_lines += [line_no] * len(tokens)
+            else:
+                self.line_no = line_no
+                self._match(tokens)
+        self.line_no = first + stop - start - 1
+
+        export_lines = self._export_lines
+        k = self._next_export
+        while 0 < export_lines[k] <= self.line_no:
+            # A default export counts if the line starts in code
+            self.exports += states[export_lines[k] - first] == lexer.CODE
+            k += 1
+        self._next_export = k
+
+        # The last line after which the state was not the one it is now
+        state = self.lexer.state
+        states.append(state)
+        changed = len(states.rstrip(bytes([state]))) - 1
+        if changed >= 0:
+            self.since = first + changed
+        self.state = state
+
+    def _error(self, message, line_no):
+        self.errors += 1
+        if self.first is None:
+            self.first = f"{message} on line {line_no}"
+
+    def _unclosed(self, frame, line_no):
+        self._error(f"unclosed {_describe(frame)}", line_no)
+
+    def _close(self, matches, message):
+        """Pop the innermost frame matches() accepts and the frames above it
+
+        Each frame above it was never closed. A closer nothing matches is
+        skipped.
+        """
+        frames = self.frames
+        lines = self.lines
+        for depth in range(len(frames) - 1, 0, -1):
+            if matches(frames[depth]):
+                for k in range(depth + 1, len(frames)):
+                    self._unclosed(frames[k], lines[k])
+                del frames[depth:]
+                del lines[depth:]
+                return
+        self._error(message, self.line_no)
+
+    def _match(self, tokens):
+        """Match up the tokens of line line_no
+
+        A closer met while an element is innermost is that element's text:
+        only a recovery that left the element open puts it there, and the
+        old scanner, which lexed on its own frames, read it as text too.
+        """
+        frames = self.frames
+        lines = self.lines
+        for token in tokens:
+            if token in _OPENERS:
+                frames.append(token)
+                lines.append(self.line_no)
+            elif token == '}':
+                if frames[-1] in _BRACES:
+                    frames.pop()
+                    lines.pop()
+                elif frames[-1][:2] != '<>':
+                    self._close(_BRACES.__contains__, "stray '}'")
+            elif token in _CLOSERS:
+                opener = _CLOSERS[token]
+                if frames[-1] == opener:
+                    frames.pop()
+                    lines.pop()
+                elif frames[-1][:2] != '<>':
+                    self._close(opener.__eq__, f"stray '{token}'")
+            elif token == '"':
+                self._error("unterminated string", self.line_no)
+            elif token == '>':
+                if frames[-1][:1] == '<' and frames[-1][1:2] != '>':
+                    frames[-1] = '<>' + frames[-1][1:]
+            elif token == '/>':
+                if frames[-1][:1] == '<' and frames[-1][1:2] != '>':
+                    frames.pop()
+                    lines.pop()
+            elif token == '</*':
+                # The lexer gave up on the JSX left open. It read the closers
+                # of the ( and [ around it as JSX text, so those go too.
+                while frames[-1][:1] == '<':
+                    self._unclosed(frames.pop(), lines.pop())
+                while frames[-1] in _CLOSERS.values():
+                    frames.pop()
+                    lines.pop()
+            elif token[1:2] == '/':
+                element = '<>' + token[2:]
+                if frames[-1] == element:
+                    frames.pop()
+                    lines.pop()
+                else:
+                    self._close(element.__eq__, f"stray </{token[2:]}>")
+            else:
+                frames.append(token)
+                lines.append(self.line_no)
+
+    def finish(self):
+        """Count what is still open at the end of the text"""
+        message = _UNTERMINATED.get(self.state)
+        if message is not None:
+            self._error(message, self.since)
+        for k in range(len(self.frames) - 1, 0, -1):
+            self._unclosed(self.frames[k], self.lines[k])
+
+def _export_lines(text):
+    """Numbers of the lines that start with 'export default', then a 0"""
+    exports = []
+    pos = text.find(_EXPORT_DEFAULT)
+    line_no, last = 1, 0
+    while pos >= 0:
+        line_no += text.count('\n', last, pos)
+        last = pos
+        if not text[text.rfind('\n', 0, pos) + 1:pos].strip():
+            exports.append(line_no)
+        pos = text.find(_EXPORT_DEFAULT, pos + len(_EXPORT_DEFAULT))
+    exports.append(0)
+    return exports
+
+def scan(text, jsx=True):
+    """Return (errors, first error, default exports) for a file's text
+
+    errors counts the unmatched brackets (and with jsx, JSX tags) and
+    unterminated literals, and first describes the first of them. Default
+    exports are the lines that start with 'export default' in code, not in
+    a comment, string or template literal.
+    """
+    lines = text.split('\n')
+    checker = _Checker(jsx, _export_lines(text))
+    checker.feed_lines(lines, 0, len(lines))
+    checker.finish()
+    return checker.errors, checker.first, checker.exports
+
+def _compare(original, new_content, jsx):
+    """scan() both texts, sharing the work on the lines they have in common
+
+    The lines before the first change are scanned once for both. After
+    the last change the two checkers go on side by side, and once they
+    are in the same state the rest of the text does the same to both, so
+    it is not scanned. Returns the two checkers; their error counts are
+    only good for comparing.
+    """
+    old_lines = original.split('\n')
+    new_lines = new_content.split('\n')
+    shortest = min(len(old_lines), len(new_lines))
+    prefix = 0
+    while prefix < shortest and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < shortest - prefix
+           and old_lines[-1 - suffix] == new_lines[-1 - suffix]):
+        suffix += 1
+
+    old = _Checker(jsx, _export_lines(original))
+    old.feed_lines(old_lines, 0, prefix)
+    new = old.clone(_export_lines(new_content))
+    old_pos = len(old_lines) - suffix
+    new_pos = len(new_lines) - suffix
+    old.feed_lines(old_lines, prefix, old_pos)
+    new.feed_lines(new_lines, prefix, new_pos)
+    # Once in step they stay in step, so checking now and then is enough
+    step = 1
+    while not old.same_state(new):
+        if old_pos == len(old_lines):
+            old.finish()
+            new.finish()
+            return old, new
+        step = min(step, len(old_lines) - old_pos)
+        old.feed_lines(old_lines, old_pos, old_pos + step)
+        new.feed_lines(new_lines, new_pos, new_pos + step)
+        old_pos += step
+        new_pos += step
+        step *= 2
+    if old.exports != new.exports and new._export_lines[new._next_export]:
+        # problem() needs the real export counts, not just their difference,
+        # so scan the rest once and count it for both
+        errors, exports = new.errors, new.exports
+        new.feed_lines(new_lines, new_pos, len(new_lines))
+        new.finish()
+        old.errors += new.errors - errors
+        old.exports += new.exports - exports
+    return old, new
+
+def problem(file_path, original, new_content):
+    """Why new_content must not replace original, or None if it may"""
+    old, new = _compare(original, new_content, not str(file_path).endswith('.ts'))
+    if new.errors > old.errors:
+        return f"{new.first} ({new.errors - old.errors} more structural errors)"
+    # One stays one and none stays none; several stay as they were or go
+    # down to exactly one, never to fewer duplicates
+    if new.exports != old.exports and not (new.exports == 1 < old.exports):
+        return f"{new.exports} default exports, {old.exports} before"
+    return None
+
+def accepts(file_path, original, new_content):
+    """True if new_content may be written over original
+
+    Nothing is checked outside a chain with a Validating stage. A refused
+    file is reported. While journaling, an accepted pair of texts is kept
+    for journal.Journaling, which records it if the write succeeds.
+    """
+    result = chain.current()
+    if result is None:
+        return True
+    result.changed = True
+    if result.validate_seconds is not None:
+        start = time.perf_counter()
+        reason = problem(file_path, original, new_content)
+        result.validate_seconds += time.perf_counter() - start
+        result.validated_bytes += len(new_content)
+        if reason is not None:
+            result.rejected = reason
+            print(f"Not written: {file_path}: {reason}")
+            return False
+    if result.steps is not None:
+        result.images = original, new_content
+    return True
+
+class Validating(chain.Stage):
+    """Has accepts() check what the fix is about to write"""
+
+    def around(self, result, file_path, content, proceed):
+        result.validate_seconds = 0.0
+        return proceed()
+
+class Stats:
+    """Counts the files a run checked and refused to write"""
+
+    def __init__(self):
+        self.checked = 0
+        self.rejected = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def add(self, file_path, result):
+        """Count one fixers.chain.Result"""
+        if result.validated_bytes:
+            self.checked += 1
+            self.bytes += result.validated_bytes
+            self.seconds += result.validate_seconds
+        self.rejected += result.rejected is not None
+
+    def report(self):
+        line = (f"Validate: {self.checked} changed files checked, "
+                f"{self.rejected} not written, {self.seconds * 1000:.1f} ms")
+        if self.seconds:
+            line += f" ({self.bytes / self.seconds / 1e6:.1f} MB/s)"
+        print(line)
@@ -0,0 +1,243 @@
+"""
+One os.scandir walk over the source tree, honoring .gitignore and --exclude
+
+The fixers used to call src_dir.rglob() once per extension, which lists
+every directory twice per pattern, builds a Path for every entry and
+descends into generated or vendored folders. walk() reads each directory
+once, sorts .ts and .tsx files into their own lists as it goes (so the
+result is in the same order as the rglob passes: all .ts files, then all
+.tsx files, each in pre-order), and prunes ignored directories without
+entering them.
+
+Ignore patterns use .gitignore syntax: the .gitignore files from the top
+of the git work tree down to each directory, .git/info/exclude, and the
+--exclude patterns, which are relative to the walked directory and
+override the others. Each file comes with its os.DirEntry, whose cached
+stat() the cache uses instead of calling os.stat again.
+"""
+
+import os
+import re
+from pathlib import Path
+
+IGNORE_FILE = '.gitignore'
+
+def _translate_segment(segment):
+    """Regex for one path segment of a gitignore pattern"""
+    out = []
+    i = 0
+    while i < len(segment):
+        ch = segment[i]
+        i += 1
+        if ch == '\\' and i < len(segment):
+            out.append(re.escape(segment[i]))
+            i += 1
+        elif ch == '*':
+            out.append('[^/]*')
+        elif ch == '?':
+            out.append('[^/]')
+        elif ch == '[':
+            end = segment.find(']', i + 1 if segment[i:i + 1] in ('!', '^') else i)
+            if end < 0:
+                out.append(re.escape(ch))
+                continue
+            body = segment[i:end]
+            negate = body[:1] in ('!', '^')
+            if negate:
+                body = body[1:]
+            body = body.replace('\\', '\\\\')
+            out.append(f'(?!/)[^{body}]' if negate else f'[{body}]')
+            i = end + 1
+        else:
+            out.append(re.escape(ch))
+    return ''.join(out)
+
+def compile_pattern(line):
+    """Parse one gitignore line into (regex, negate, dir_only), or None
+
+    The regex matches paths relative to the directory of the file the
+    pattern came from, with '/' separators.
+    """
+    line = line.rstrip('\r\n')
+    while line.endswith(' ') and not line.endswith('\\ '):
+        line = line[:-1]
+    if not line or line.startswith('#'):
+        return None
+    negate = line.startswith('!')
+    if negate:
+        line = line[1:]
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+    # Without a slash the pattern matches a name at any depth
+    if '/' not in line:
+        line = '**/' + line
+    segments = line.lstrip('/').split('/')
+
+    parts = []
+    for index, segment in enumerate(segments):
+        last = index == len(segments) - 1
+        if segment == '**':
+            parts.append('.*' if last else '(?:.*/)?')
+        else:
+            parts.append(_translate_segment(segment) + ('' if last else '/'))
+    return re.compile(''.join(parts), re.DOTALL), negate, dir_only
+
+def _read_patterns(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.read().split('\n')
+    except OSError:
+        return []
+    return [pattern for pattern in map(compile_pattern, lines) if pattern]
+
+def _work_tree(path):
+    """Top directory of the git work tree containing path, or None"""
+    for directory in (path, *path.parents):
+        if (directory / '.git').exists():
+            return directory
+    return None
+
+def _prefix(path, directory):
+    """Path of path relative to directory, as a prefix ('' or 'a/b/')"""
+    rel = path.relative_to(directory).as_posix()
+    return '' if rel == '.' else rel + '/'
+
+class IgnoreRules:
+    """The ignore patterns that apply to files under root
+
+    Each rule is (regex, negate, dir_only, strip, prefix): the regex is
+    tested on prefix + the path relative to root with its first strip
+    characters removed, which is the path relative to the directory of
+    the rule's .gitignore. The last matching rule decides.
+    """
+
+    def __init__(self, root, exclude=(), gitignore=True):
+        self.root = Path(root)
+        self.gitignore = gitignore
+        self.exclude = [(regex, negate, dir_only, 0, '')
+                        for regex, negate, dir_only in filter(None, map(compile_pattern, exclude))]
+        # Relative directory ('' or 'a/b/') -> rules in force inside it
+        self._dirs = {}
+        # Whether root itself is in an ignored directory
+        self.all_ignored = False
+
+        root_rules = []
+        if gitignore:
+            # Lowest priority first: info/exclude, then the .gitignore files
+            # from the top of the work tree down to root
+            resolved = self.root.resolve()
+            top = _work_tree(resolved)
+            if top is not None and top != resolved:
+                self.all_ignored = IgnoreRules(top).ignored(resolved, is_dir=True)
+            if top is not None:
+                root_rules.extend(self._rules(top / '.git' / 'info' / 'exclude', 0,
+                                              _prefix(resolved, top)))
+                for directory in reversed(resolved.parents):
+                    if directory == top or top in directory.parents:
+                        root_rules.extend(self._rules(directory / IGNORE_FILE, 0,
+                                                      _prefix(resolved, directory)))
+            root_rules.extend(self._rules(self.root / IGNORE_FILE, 0, ''))
+        self._dirs[''] = root_rules
+
+    @staticmethod
+    def _rules(path, strip, prefix):
+        return [(regex, negate, dir_only, strip, prefix)
+                for regex, negate, dir_only in _read_patterns(path)]
+
+    def rules_in(self, rel_dir, parent_rules, has_file=True):
+        """Rules in force inside rel_dir ('a/b/'), given its parent's rules
+
+        has_file=False says the directory is known to have no .gitignore,
+        which saves trying to open one.
+        """
+        rules = self._dirs.get(rel_dir)
+        if rules is None:
+            rules = parent_rules
+            if self.gitignore and has_file:
+                own = self._rules(self.root / rel_dir / IGNORE_FILE, len(rel_dir), '')
+                if own:
+                    rules = parent_rules + own
+            self._dirs[rel_dir] = rules
+        return rules
+
+    def matches(self, rel, is_dir, rules):
+        """True if rel (relative to root) is ignored under rules or --exclude"""
+        if is_dir and self.gitignore and rel.rsplit('/', 1)[-1] == '.git':
+            return True
+        for rule_list in (self.exclude, rules):
+            ignored = False
+            for regex, negate, dir_only, strip, prefix in rule_list:
+                if (not dir_only or is_dir) and regex.fullmatch(prefix + rel[strip:]):
+                    ignored = not negate
+            if ignored:
+                return True
+        return False
+
+    def ignored(self, path, is_dir=False):
+        """True if a path under root is ignored, or inside an ignored directory"""
+        try:
+            rel = Path(os.path.relpath(path, self.root)).as_posix()
+        except ValueError:
+            return False
+        if rel.startswith('../'):
+            return False
+        if self.all_ignored or rel == '.':
+            return self.all_ignored
+        parts = rel.split('/')
+        rules = self._dirs['']
+        rel_dir = ''
+        for name in parts[:-1]:
+            if self.matches(rel_dir + name, True, rules):
+                return True
+            rel_dir += name + '/'
+            rules = self.rules_in(rel_dir, rules)
+        return self.matches(rel, is_dir, rules)
+
+def walk(root, suffixes, ignore=None):
+    """Return a list of (path, entry) per suffix for the files under root
+
+    Files are listed in pre-order, each directory's own files before its
+    subdirectories, in os.scandir order. Symlinks to directories are not
+    followed; ignored directories are not entered.
+    """
+    found = {suffix: [] for suffix in suffixes}
+    if ignore is not None and ignore.all_ignored:
+        return found
+    stack = [(os.fspath(root), '', None)]
+    while stack:
+        directory, rel_dir, parent_rules = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        rules = None
+        if ignore is not None:
+            if rel_dir:
+                has_file = any(entry.name == IGNORE_FILE for entry in entries)
+                rules = ignore.rules_in(rel_dir, parent_rules, has_file)
+            else:
+                rules = ignore._dirs['']
+
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if ignore is None or not ignore.matches(rel_dir + name, True, rules):
+                        subdirs.append(entry)
+                    continue
+                for suffix in suffixes:
+                    if name.endswith(suffix):
+                        if entry.is_file() and (ignore is None or
+                                                not ignore.matches(rel_dir + name, False, rules)):
+                            found[suffix].append((Path(entry.path), entry))
+                        break
+            except OSError:
+                continue
+
+        for entry in reversed(subdirs):
+            stack.append((entry.path, rel_dir + entry.name + '/', rules))
+    return found
@@ -0,0 +1,162 @@
+"""
+Watch a source tree for changed files
+
+On Linux the tree is watched with inotify (through ctypes, one watch per
+directory, added as directories appear); elsewhere, or when inotify is not
+available, the tree is polled for mtime and size changes. Bursts of events
+(an editor saving several files, a git checkout) are debounced into a
+single batch.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+# Quiet period that ends a burst of events, in seconds
+DEBOUNCE = 0.1
+POLL_INTERVAL = 0.5
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+# struct inotify_event: int wd; uint32_t mask, cookie, len; char name[len]
+_EVENT = struct.Struct('iIII')
+
+def _walk_files(directory):
+    for dirpath, _, filenames in os.walk(directory):
+        for name in filenames:
+            yield os.path.join(dirpath, name)
+
+class InotifyWatcher:
+    """Recursive inotify watch on a directory tree"""
+
+    def __init__(self, root):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.root = root
+        self.fd = fd
+        self._libc = libc
+        self._dirs = {}
+        self._add_tree(root)
+
+    def _add_tree(self, directory):
+        """Watch directory and everything below it; return the files found"""
+        found = []
+        for dirpath, _, filenames in os.walk(directory):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), _WATCH_MASK)
+            if wd < 0:
+                continue
+            self._dirs[wd] = Path(dirpath)
+            found.extend(Path(dirpath) / name for name in filenames)
+        return found
+
+    def read(self, timeout=None):
+        """Wait up to timeout seconds for events
+
+        Returns the paths that changed (possibly none, e.g. for a new empty
+        directory), or None if there were no events at all.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return None
+
+        data = os.read(self.fd, 64 * 1024)
+        paths = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            offset += _EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost; treat every file as changed
+                paths.extend(Path(path) for path in _walk_files(self.root))
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                # Files can land in a new directory before its watch exists
+                paths.extend(self._add_tree(path))
+            else:
+                paths.append(path)
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Portable fallback that compares mtime and size snapshots"""
+
+    def __init__(self, root, interval=POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self._seen = self._snapshot()
+
+    def _snapshot(self):
+        snapshot = {}
+        for path in _walk_files(self.root):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def read(self, timeout=None):
+        """Wait up to timeout seconds and return the paths that changed, or None"""
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        current = self._snapshot()
+        changed = [Path(path) for path, signature in current.items()
+                   if self._seen.get(path) != signature]
+        self._seen = current
+        return changed or None
+
+    def close(self):
+        pass
+
+def open_watcher(root, poll=False):
+    """Return an inotify watcher for root, or a polling one if unavailable"""
+    if not poll:
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root)
+
+def changes(watcher, debounce=DEBOUNCE):
+    """Yield (paths, first_event) for each debounced burst of changes
+
+    first_event is the time.perf_counter() value when the burst started,
+    for measuring how long after an edit its fix landed.
+    """
+    while True:
+        paths = watcher.read()
+        if not paths:
+            continue
+        first_event = time.perf_counter()
+        pending = set(paths)
+        while True:
+            more = watcher.read(debounce)
+            if more is None:
+                break
+            pending.update(more)
+        yield sorted(pending), first_event